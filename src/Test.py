@@ -24,7 +24,7 @@ class Test:
     ticker.stopTicker()
 
   def tickerListener(tick):
-    logging.info('tickerLister: onNewTick %s', vars(tick));
+    logging.info('tickerLister: onNewTick %s', tick);
 
   def testOrders():
     orderManager = ZerodhaOrderManager()
@@ -76,6 +76,6 @@ class Test:
     orderManager = ZerodhaOrderManager()
     sampleOrder = Order(orderInputParams=None)
     sampleOrder.orderId='210505200078243'
-    orders = []
-    orders.append(sampleOrder)
+    orders = {}
+    orders[sampleOrder.orderId] = sampleOrder
     orderManager.fetchAndUpdateAllOrderDetails(orders)
\ No newline at end of file
@@ -0,0 +1,104 @@
+import os
+import sys
+import json
+import time
+import random
+import tempfile
+from datetime import date, timedelta
+
+from instruments.Instruments import Instruments
+from instruments.InstrumentCache import InstrumentCache
+
+# Compares startup load time of the instruments json file (json parsing + instruments.InstrumentStore)
+# against opening the memory mapped binary cache (instruments.InstrumentCache), and lookups on both.
+# Run from src directory:
+#   python -m benchmarks.InstrumentsLoadBenchmark [instrumentsFile]
+# instrumentsFile if given should be the instruments.json saved by Instruments.saveInstruments().
+# Otherwise about 100k instruments similar to NSE + NFO instruments are generated.
+
+def generateInstruments():
+  instruments = []
+  token = 100000
+  for i in range(10000):
+    token += 1
+    instruments.append({'instrument_token': token * 256 + 1, 'exchange_token': str(token), 'tradingsymbol': 'EQ' + str(i),
+      'name': 'EQUITY ' + str(i), 'last_price': 0.0, 'expiry': '', 'strike': 0.0, 'tick_size': 0.05, 'lot_size': 1,
+      'instrument_type': 'EQ', 'segment': 'NSE', 'exchange': 'NSE'})
+  firstExpiry = date(2021, 8, 26)
+  for u in range(180):
+    underlying = 'STOCK' + str(u)
+    for e in range(6 if u < 2 else 3):
+      expiry = firstExpiry + timedelta(days=7 * e)
+      for s in range(90):
+        strike = 1000 + s * 20
+        for optionType in ['CE', 'PE']:
+          token += 1
+          instruments.append({'instrument_token': token * 256 + 2, 'exchange_token': str(token),
+            'tradingsymbol': underlying + expiry.strftime('%y') + str(expiry.month) + expiry.strftime('%d') + str(strike) + optionType, 'name': underlying,
+            'last_price': 0.0, 'expiry': str(expiry), 'strike': float(strike), 'tick_size': 0.05, 'lot_size': 50,
+            'instrument_type': optionType, 'segment': 'NFO-OPT', 'exchange': 'NFO'})
+  return instruments
+
+def runJsonPath(instrumentsFilepath):
+  start = time.perf_counter()
+  with open(instrumentsFilepath, 'r') as isdFile:
+    instruments = json.loads(isdFile.read())
+  Instruments.setInstruments(instruments)
+  return time.perf_counter() - start
+
+def runCachePath(cacheFilepath):
+  Instruments.setInstrumentStore(None) # free the json path store outside of the measurement
+  start = time.perf_counter()
+  Instruments.setInstrumentStore(InstrumentCache(cacheFilepath))
+  return time.perf_counter() - start
+
+def runLookups(symbols, tokens):
+  start = time.perf_counter()
+  for symbol in symbols:
+    Instruments.getInstrumentDataBySymbol(symbol)
+  for token in tokens:
+    Instruments.getInstrumentDataByToken(token)
+  return time.perf_counter() - start
+
+def main():
+  tmpDir = tempfile.mkdtemp()
+  instrumentsFilepath = os.path.join(tmpDir, 'instruments.json')
+  cacheFilepath = os.path.join(tmpDir, 'instruments.bin')
+  if len(sys.argv) > 1:
+    with open(sys.argv[1], 'r') as isdFile:
+      instruments = json.load(isdFile)
+  else:
+    instruments = generateInstruments()
+  with open(instrumentsFilepath, 'w') as isdFile:
+    json.dump(instruments, isdFile, indent=2, default=str)
+  start = time.perf_counter()
+  InstrumentCache.write(cacheFilepath, instruments)
+  writeSeconds = time.perf_counter() - start
+
+  sample = random.sample(instruments, min(10000, len(instruments)))
+  symbols = [isd['tradingsymbol'] for isd in sample]
+  tokens = [isd['instrument_token'] for isd in sample]
+  del instruments
+
+  jsonSeconds = runJsonPath(instrumentsFilepath)
+  jsonLookupSeconds = runLookups(symbols, tokens)
+  numInstruments = Instruments.getNumInstruments()
+  cacheSeconds = runCachePath(cacheFilepath)
+  cacheLookupSeconds = runLookups(symbols, tokens) # first lookups create the dicts
+  cacheRepeatLookupSeconds = runLookups(symbols, tokens)
+  Instruments.instrumentStore.close()
+
+  print('Instruments = %d, json file = %.1f MB, cache file = %.1f MB (written in %.3f seconds)' % (numInstruments,
+    os.path.getsize(instrumentsFilepath) / 1e6, os.path.getsize(cacheFilepath) / 1e6, writeSeconds))
+  print('Json load : %.1f ms' % (jsonSeconds * 1000))
+  print('Cache load: %.1f ms' % (cacheSeconds * 1000))
+  print('Speedup   : %.0fx' % (jsonSeconds / cacheSeconds))
+  numLookups = len(symbols) + len(tokens)
+  print('Lookups (%d): json %.1f ms, cache %.1f ms, cache repeated %.1f ms' % (numLookups, jsonLookupSeconds * 1000,
+    cacheLookupSeconds * 1000, cacheRepeatLookupSeconds * 1000))
+  os.remove(instrumentsFilepath)
+  os.remove(cacheFilepath)
+  os.rmdir(tmpDir)
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,106 @@
+import os
+import sys
+import gc
+import json
+import time
+import tempfile
+import ctypes
+import subprocess
+from datetime import date
+
+# Compares resident memory (RSS) of holding instruments as dicts (instruments list + symbol and token maps
+# of dicts, as done before instruments.InstrumentStore) against instruments.InstrumentStore and
+# instruments.InstrumentCache. Each way is measured in a fresh python process. For the store and cache, RSS growth
+# of building instruments.OptionLadder over all the listed contracts is measured as well.
+# Run from src directory (Linux, RSS is read from /proc):
+#   python -m benchmarks.InstrumentsMemoryBenchmark [instrumentsFile]
+# instrumentsFile if given should be the instruments.json saved by Instruments.saveInstruments().
+# Otherwise instruments are generated by benchmarks.InstrumentsLoadBenchmark.
+
+def getRSSMB():
+  with open('/proc/self/statm', 'r') as statmFile:
+    residentPages = int(statmFile.read().split()[1])
+  return residentPages * os.sysconf('SC_PAGE_SIZE') / 1e6
+
+def releaseFreeMemory():
+  # Return memory freed by python (Ex: dicts of parsed json) to the OS, so that RSS shows what is still held (glibc only)
+  gc.collect()
+  try:
+    ctypes.CDLL('libc.so.6').malloc_trim(0)
+  except Exception as e:
+    pass
+
+def measure(mode, instrumentsFilepath):
+  # Runs in the child process, prints RSS growth in MB, a few lookups per second and RSS growth of ladder build in MB
+  from instruments.Instruments import Instruments
+  from instruments.InstrumentCache import InstrumentCache
+  from instruments.OptionLadder import OptionLadder
+  releaseFreeMemory()
+  baseRSS = getRSSMB()
+  if mode == 'cache':
+    instrumentCache = InstrumentCache(instrumentsFilepath)
+    getBySymbol = instrumentCache.getInstrumentDataBySymbol
+    symbols = [isd['tradingsymbol'] for isd in instrumentCache.getInstruments(['CE'])][0:10000]
+  else:
+    with open(instrumentsFilepath, 'r') as isdFile:
+      instruments = json.loads(isdFile.read())
+    symbols = [isd['tradingsymbol'] for isd in instruments[0:10000]]
+    if mode == 'dicts':
+      symbolToInstrumentMap = {}
+      tokenToInstrumentMap = {}
+      for isd in instruments:
+        symbolToInstrumentMap[isd['tradingsymbol']] = isd
+        tokenToInstrumentMap[isd['instrument_token']] = isd
+      getBySymbol = symbolToInstrumentMap.__getitem__
+    else:
+      Instruments.setInstruments(instruments)
+      getBySymbol = Instruments.getInstrumentDataBySymbol
+    del instruments
+  releaseFreeMemory()
+  rss = getRSSMB() - baseRSS
+  start = time.perf_counter()
+  for symbol in symbols:
+    getBySymbol(symbol)['lot_size']
+  seconds = time.perf_counter() - start
+  ladderRSS = '-'
+  if mode == 'cache':
+    Instruments.setInstrumentStore(instrumentCache)
+  if mode != 'dicts':
+    # Ladders hold the instrument data of all the contracts not yet expired, so build them from the earliest date
+    releaseFreeMemory()
+    ladderBaseRSS = getRSSMB()
+    OptionLadder.build(date.min)
+    releaseFreeMemory()
+    ladderRSS = '%.1f' % (getRSSMB() - ladderBaseRSS)
+  print('%.1f %d %s' % (rss, len(symbols) / seconds, ladderRSS))
+
+def main():
+  if len(sys.argv) > 2:
+    measure(sys.argv[1], sys.argv[2])
+    return
+  from benchmarks.InstrumentsLoadBenchmark import generateInstruments
+  from instruments.InstrumentCache import InstrumentCache
+  tmpDir = tempfile.mkdtemp()
+  instrumentsFilepath = os.path.join(tmpDir, 'instruments.json')
+  cacheFilepath = os.path.join(tmpDir, 'instruments.bin')
+  if len(sys.argv) > 1:
+    with open(sys.argv[1], 'r') as isdFile:
+      instruments = json.load(isdFile)
+  else:
+    instruments = generateInstruments()
+  with open(instrumentsFilepath, 'w') as isdFile:
+    json.dump(instruments, isdFile, indent=2, default=str)
+  InstrumentCache.write(cacheFilepath, instruments)
+  print('Instruments = %d' % len(instruments))
+  del instruments
+
+  for (mode, filepath) in [('dicts', instrumentsFilepath), ('store', instrumentsFilepath), ('cache', cacheFilepath)]:
+    output = subprocess.check_output([sys.executable, '-m', 'benchmarks.InstrumentsMemoryBenchmark', mode, filepath])
+    rss, lookupsPerSecond, ladderRSS = output.decode().split()
+    print('%-6s: RSS %7s MB, %s lookups/sec, ladder build RSS %s MB' % (mode, rss, lookupsPerSecond, ladderRSS))
+  os.remove(instrumentsFilepath)
+  os.remove(cacheFilepath)
+  os.rmdir(tmpDir)
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,97 @@
+import sys
+import time
+import struct
+import random
+
+from kiteconnect import KiteTicker
+
+from instruments.InstrumentRegistry import InstrumentRegistry
+from ticker.ZerodhaTicker import ZerodhaTicker
+from ticker.ZerodhaTickDecoder import ZerodhaTickDecoder
+
+# Compares ticks per second of the default tick path (KiteTicker dict parsing + conversion to TickData)
+# against the fast decode path (ZerodhaTickDecoder) on the same binary frames.
+# Run from src directory:
+#   python -m benchmarks.TickDecodeBenchmark [framesFile]
+# framesFile if given should contain recorded frames, each one prefixed by its 4 bytes big endian length.
+# Otherwise frames of full mode packets are generated for 500 instruments.
+
+def loadFrames(framesFilepath):
+  frames = []
+  with open(framesFilepath, 'rb') as fFile:
+    data = fFile.read()
+  offset = 0
+  while offset + 4 <= len(data):
+    frameLength = struct.unpack_from('>I', data, offset)[0]
+    offset += 4
+    frames.append(data[offset:offset + frameLength])
+    offset += frameLength
+  return frames
+
+def generateFrames(numFrames = 2000, numInstruments = 500, packetsPerFrame = 50):
+  tokens = [(12000 + i) * 256 + 2 for i in range(numInstruments)] # NFO segment tokens
+  quoteStruct = struct.Struct('>IIIIIIIIIII')
+  frames = []
+  for f in range(numFrames):
+    packets = []
+    for p in range(packetsPerFrame):
+      token = tokens[random.randrange(numInstruments)]
+      price = random.randint(10000, 50000)
+      quote = quoteStruct.pack(token, price, 25, price, random.randint(0, 10000000), 5000, 6000,
+        price - 100, price + 200, price - 300, price + 50)
+      packet = quote + bytes(184 - len(quote)) # full mode packet with empty depth
+      packets.append(struct.pack('>H', len(packet)) + packet)
+    frames.append(struct.pack('>H', len(packets)) + b''.join(packets))
+  return frames
+
+def registerTokens(frames):
+  # Register every token seen in frames so that both paths resolve symbols without instruments file
+  for frame in frames:
+    numPackets = struct.unpack_from('>H', frame, 0)[0]
+    offset = 2
+    for i in range(numPackets):
+      packetLength = struct.unpack_from('>H', frame, offset)[0]
+      token = struct.unpack_from('>I', frame, offset + 2)[0]
+      InstrumentRegistry.register('TOKEN' + str(token), token)
+      offset += 2 + packetLength
+
+def countTicks(frames):
+  count = 0
+  for frame in frames:
+    count += struct.unpack_from('>H', frame, 0)[0]
+  return count
+
+def runDefaultPath(zerodhaTicker, kiteTicker, frames):
+  start = time.perf_counter()
+  for frame in frames:
+    zerodhaTicker.on_ticks(kiteTicker, kiteTicker._parse_binary(frame))
+  return time.perf_counter() - start
+
+def runFastPath(zerodhaTicker, frames):
+  start = time.perf_counter()
+  for frame in frames:
+    zerodhaTicker.on_message(None, frame, True)
+  return time.perf_counter() - start
+
+def main():
+  frames = loadFrames(sys.argv[1]) if len(sys.argv) > 1 else generateFrames()
+  numTicks = countTicks(frames)
+  registerTokens(frames)
+
+  zerodhaTicker = ZerodhaTicker()
+  zerodhaTicker.tickDecoder = ZerodhaTickDecoder()
+  kiteTicker = KiteTicker('benchmark', 'benchmark')
+
+  # warm up
+  runDefaultPath(zerodhaTicker, kiteTicker, frames[0:100])
+  runFastPath(zerodhaTicker, frames[0:100])
+
+  defaultSeconds = runDefaultPath(zerodhaTicker, kiteTicker, frames)
+  fastSeconds = runFastPath(zerodhaTicker, frames)
+  print('Frames = %d, ticks = %d' % (len(frames), numTicks))
+  print('Default path: %.3f seconds, %d ticks/sec' % (defaultSeconds, numTicks / defaultSeconds))
+  print('Fast decode : %.3f seconds, %d ticks/sec' % (fastSeconds, numTicks / fastSeconds))
+  print('Speedup     : %.2fx' % (defaultSeconds / fastSeconds))
+
+if __name__ == '__main__':
+  main()
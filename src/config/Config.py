@@ -1,25 +1,29 @@
 import json
 import os
 
+from config.ConfigRegistry import ConfigRegistry
+
+# Configs are parsed once and reloaded only when modified (see config.ConfigRegistry).
+# Returned configs are shared, do not modify them.
+
 def getServerConfig():
-  with open('../config/server.json', 'r') as server:
-    jsonServerData = json.load(server)
-    return jsonServerData
+  return ConfigRegistry.get('server')
+
+def getServerConfigValue(path, default = None):
+  # Ex: getServerConfigValue('tickDispatcher.numConsumers', 1)
+  return ConfigRegistry.getValue('server', path, default)
 
 def getSystemConfig():
-  with open('../config/system.json', 'r') as system:
-    jsonSystemData = json.load(system)
-    return jsonSystemData
+  return ConfigRegistry.get('system')
 
 def getBrokerAppConfig():
-  with open('../config/brokerapp.json', 'r') as brokerapp:
-    jsonUserData = json.load(brokerapp)
-    return jsonUserData
+  return ConfigRegistry.get('brokerapp')
+
+def getHolidaysFilepath():
+  return ConfigRegistry.getFilepath('holidays')
 
 def getHolidays():
-  with open('../config/holidays.json', 'r') as holidays:
-    holidaysData = json.load(holidays)
-    return holidaysData
+  return ConfigRegistry.get('holidays')
 
 def getTimestampsData():
   serverConfig = getServerConfig()
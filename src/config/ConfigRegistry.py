@@ -0,0 +1,144 @@
+import os
+import json
+import time
+import logging
+import threading
+
+class ConfigRegistry:
+  # Config files parsed once and kept in memory. A file is parsed again only when its modification time changes,
+  # which is checked at most once in reloadCheckIntervalSeconds, and subscribers of the file are then called
+  # with the new config. A file which fails validation is rejected: an exception on first load, and on reload
+  # the old config is kept. Configs returned are shared, callers must not modify them.
+  reloadCheckIntervalSeconds = 1
+  nameToFilepathMap = {
+    'server': '../config/server.json',
+    'system': '../config/system.json',
+    'brokerapp': '../config/brokerapp.json',
+    'holidays': '../config/holidays.json'
+  }
+  # name -> key -> (type, required). Keys not listed here are not validated.
+  nameToSchemaMap = {
+    'server': {
+      'port': (int, True),
+      'enableSSL': (bool, False),
+      'sslPort': (int, False),
+      'deployDir': (str, True),
+      'logFileDir': (str, True),
+      'orderReconcileIntervalSeconds': ((int, float), False),
+      'tradesJournal': (dict, False),
+      'tickDispatcher': (dict, False),
+      'fastTickDecode': (bool, False),
+      'tickRecorder': (dict, False),
+      'paperTrading': (dict, False),
+      'instrumentsCache': (bool, False),
+      'brokerHttpPool': (dict, False),
+      'orderGateway': (dict, False),
+      'brokerRateLimits': (dict, False)
+    },
+    'system': {
+      'homeUrl': (str, True)
+    },
+    'brokerapp': {
+      'broker': (str, True),
+      'clientID': (str, True),
+      'appKey': (str, True),
+      'appSecret': (str, True),
+      'redirectUrl': (str, False)
+    }
+  }
+  nameToEntryMap = {} # name -> [config, mtime, lastCheckedAt (time.monotonic())]
+  nameToSubscribersMap = {}
+  lock = threading.Lock()
+
+  @staticmethod
+  def getFilepath(name):
+    return ConfigRegistry.nameToFilepathMap[name]
+
+  @staticmethod
+  def get(name):
+    entry = ConfigRegistry.nameToEntryMap.get(name)
+    if entry != None and time.monotonic() - entry[2] < ConfigRegistry.reloadCheckIntervalSeconds:
+      return entry[0]
+    return ConfigRegistry.checkReload(name)
+
+  @staticmethod
+  def checkReload(name):
+    # Returns the current config of the given name after parsing the file again if it is modified
+    subscribers = []
+    with ConfigRegistry.lock:
+      entry = ConfigRegistry.nameToEntryMap.get(name)
+      filepath = ConfigRegistry.getFilepath(name)
+      mtime = os.path.getmtime(filepath)
+      if entry != None:
+        entry[2] = time.monotonic()
+        if mtime == entry[1]:
+          return entry[0]
+      with open(filepath, 'r') as configFile:
+        try:
+          config = json.load(configFile)
+          ConfigRegistry.validate(name, config)
+        except Exception as e:
+          if entry == None:
+            raise
+          logging.error('ConfigRegistry: Ignoring modified %s as it is invalid: %s', filepath, str(e))
+          entry[1] = mtime
+          return entry[0]
+      ConfigRegistry.nameToEntryMap[name] = [config, mtime, time.monotonic()]
+      if entry != None:
+        logging.info('ConfigRegistry: Reloaded modified %s', filepath)
+        subscribers = list(ConfigRegistry.nameToSubscribersMap.get(name, []))
+    # Subscribers are called outside of the lock as they may read configs again
+    for subscriber in subscribers:
+      try:
+        subscriber(config)
+      except Exception as e:
+        logging.exception('ConfigRegistry: Exception in subscriber of %s', name)
+    return config
+
+  @staticmethod
+  def validate(name, config):
+    schema = ConfigRegistry.nameToSchemaMap.get(name)
+    if schema == None:
+      return
+    if isinstance(config, dict) == False:
+      raise Exception(name + ' config should be a json object')
+    for key, (valueType, required) in schema.items():
+      if key not in config:
+        if required:
+          raise Exception(name + ' config is missing ' + key)
+        continue
+      value = config[key]
+      # bool is an int in python, do not accept it for int values
+      if isinstance(value, valueType) == False or (isinstance(value, bool) and valueType != bool):
+        raise Exception(name + ' config has invalid value ' + str(value) + ' for ' + key)
+
+  @staticmethod
+  def getValue(name, path, default = None):
+    # Value at the given dot separated path, Ex: getValue('server', 'tickDispatcher.numConsumers', 1).
+    # Default is returned if the value is missing or is not of the same type as default (int accepted for float).
+    value = ConfigRegistry.get(name)
+    for key in path.split('.'):
+      if isinstance(value, dict) == False or key not in value:
+        return default
+      value = value[key]
+    if default != None:
+      sameType = type(value) == type(default) or (type(default) == float and type(value) == int)
+      if sameType == False:
+        logging.warn('ConfigRegistry: Invalid value %s for %s in %s config, using %s', value, path, name, default)
+        return default
+    return value
+
+  @staticmethod
+  def subscribe(name, subscriber):
+    # subscriber gets called with the new config whenever the file of the given name is reloaded
+    with ConfigRegistry.lock:
+      ConfigRegistry.nameToSubscribersMap.setdefault(name, []).append(subscriber)
+
+  @staticmethod
+  def checkForChanges():
+    # Reloads modified files of all the loaded configs so that subscribers get notified without waiting for a read
+    for name in list(ConfigRegistry.nameToEntryMap.keys()):
+      try:
+        ConfigRegistry.checkReload(name)
+      except Exception as e:
+        logging.exception('ConfigRegistry: Exception while checking %s for changes', name)
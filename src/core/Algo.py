@@ -1,9 +1,10 @@
 import logging
 import threading
-import time
 
 from instruments.Instruments import Instruments
+from instruments.OptionLadder import OptionLadder
 from trademgmt.TradeManager import TradeManager
+from utils.Clock import Clock
 
 from strategies.SampleStrategy import SampleStrategy
 from strategies.BNFORB30Min import BNFORB30Min
@@ -23,6 +24,7 @@ class Algo:
       return
     
     logging.info("Starting Algo...")
+    Instruments.registerChangeListener(OptionLadder.onInstrumentsChanged)
     Instruments.fetchInstruments()
 
     # start trade manager in a separate thread
@@ -30,7 +32,7 @@ class Algo:
     tm.start()
 
     # sleep for 2 seconds for TradeManager to get initialized
-    time.sleep(2)
+    Clock.sleep(2)
 
     # start running strategies: Run each strategy in a separate thread
     #threading.Thread(target=SampleStrategy.getInstance().run).start()
@@ -0,0 +1,74 @@
+import logging
+import threading
+
+from config.Config import getServerConfigValue
+from models.RequestPriority import RequestPriority
+from utils.LatencyStats import LatencyStats
+from utils.TokenBucket import TokenBucket
+
+class BrokerRateLimiter:
+  # Keeps all broker REST calls within the broker per second limits. Each endpoint class (orders, quote, default)
+  # has its own token bucket configured by brokerRateLimits in server config, and a call waits for a token of its class.
+  # Waiting calls go by models.RequestPriority lanes so that exits get the tokens before new entries and data requests.
+  endpointClassToDefaultLimitsMap = {
+    'orders': (10, 10), # (ratePerSecond, burst) place/modify/cancel orders
+    'quote': (1, 1),
+    'default': (10, 10) # everything else Ex: order book, positions, profile
+  }
+  endpointClassToBucketMap = {}
+  laneToWaitStatsMap = {}
+  lock = threading.Lock()
+
+  @staticmethod
+  def getBucket(endpointClass):
+    bucket = BrokerRateLimiter.endpointClassToBucketMap.get(endpointClass)
+    if bucket != None:
+      return bucket
+    with BrokerRateLimiter.lock:
+      if endpointClass not in BrokerRateLimiter.endpointClassToBucketMap:
+        ratePerSecond, burst = BrokerRateLimiter.getLimits(endpointClass)
+        BrokerRateLimiter.endpointClassToBucketMap[endpointClass] = TokenBucket(endpointClass, ratePerSecond, burst, len(RequestPriority.names))
+      return BrokerRateLimiter.endpointClassToBucketMap[endpointClass]
+
+  @staticmethod
+  def getLimits(endpointClass):
+    defaultRatePerSecond, defaultBurst = BrokerRateLimiter.endpointClassToDefaultLimitsMap.get(endpointClass,
+      BrokerRateLimiter.endpointClassToDefaultLimitsMap['default'])
+    ratePerSecond = getServerConfigValue('brokerRateLimits.' + endpointClass + '.ratePerSecond', float(defaultRatePerSecond))
+    burst = getServerConfigValue('brokerRateLimits.' + endpointClass + '.burst', defaultBurst)
+    if ratePerSecond <= 0 or burst < 1:
+      logging.warn('BrokerRateLimiter: Invalid limits %s/%s for %s, using defaults', ratePerSecond, burst, endpointClass)
+      return (defaultRatePerSecond, defaultBurst)
+    return (ratePerSecond, burst)
+
+  @staticmethod
+  def acquire(endpointClass, priority):
+    # Blocks till the call is allowed
+    waitSeconds = BrokerRateLimiter.getBucket(endpointClass).acquire(priority)
+    BrokerRateLimiter.getWaitStats(priority).record(waitSeconds)
+
+  @staticmethod
+  def getWaitStats(priority):
+    waitStats = BrokerRateLimiter.laneToWaitStatsMap.get(priority)
+    if waitStats == None:
+      with BrokerRateLimiter.lock:
+        waitStats = BrokerRateLimiter.laneToWaitStatsMap.setdefault(priority, LatencyStats(RequestPriority.names[priority]))
+    return waitStats
+
+  @staticmethod
+  def applyConfig():
+    # Called when server config is modified
+    for endpointClass, bucket in list(BrokerRateLimiter.endpointClassToBucketMap.items()):
+      ratePerSecond, burst = BrokerRateLimiter.getLimits(endpointClass)
+      if (ratePerSecond, burst) != (bucket.ratePerSecond, bucket.burst):
+        bucket.setRate(ratePerSecond, burst)
+        logging.info('BrokerRateLimiter: %s limits changed to %s per second with burst of %d', endpointClass, ratePerSecond, burst)
+
+  @staticmethod
+  def getStats():
+    stats = {'waiting': {}, 'queueWait': {}}
+    for endpointClass, bucket in list(BrokerRateLimiter.endpointClassToBucketMap.items()):
+      stats['waiting'][endpointClass] = bucket.getNumWaiting()
+    for priority, waitStats in sorted(BrokerRateLimiter.laneToWaitStatsMap.items()):
+      stats['queueWait'][RequestPriority.names[priority]] = waitStats.getStats()
+    return stats
@@ -0,0 +1,41 @@
+from array import array
+
+class MarketDataTable:
+  # Latest market data of subscribed instruments kept in preallocated arrays indexed by the
+  # dense instrument id assigned by instruments.InstrumentRegistry
+  capacity = 0
+  lastTradedPrices = array('d')
+  volumes = array('d')
+  highs = array('d')
+  lows = array('d')
+
+  @staticmethod
+  def ensureCapacity(numInstruments):
+    if numInstruments <= MarketDataTable.capacity:
+      return
+    newCapacity = max(1024, MarketDataTable.capacity)
+    while newCapacity < numInstruments:
+      newCapacity *= 2
+    zeros = array('d', bytes(8 * (newCapacity - MarketDataTable.capacity)))
+    MarketDataTable.lastTradedPrices.extend(zeros)
+    MarketDataTable.volumes.extend(zeros)
+    MarketDataTable.highs.extend(zeros)
+    MarketDataTable.lows.extend(zeros)
+    MarketDataTable.capacity = newCapacity
+
+  @staticmethod
+  def update(tick):
+    instrumentId = tick.instrumentId
+    MarketDataTable.lastTradedPrices[instrumentId] = tick.lastTradedPrice
+    MarketDataTable.volumes[instrumentId] = tick.volume
+    MarketDataTable.highs[instrumentId] = tick.high
+    MarketDataTable.lows[instrumentId] = tick.low
+
+  @staticmethod
+  def getLastTradedPrice(instrumentId):
+    return MarketDataTable.lastTradedPrices[instrumentId]
+
+  @staticmethod
+  def getAllLastTradedPrices(numInstruments):
+    # Returns a copy of last traded prices of the first numInstruments ids in one go
+    return MarketDataTable.lastTradedPrices[0:numInstruments]
@@ -1,16 +1,23 @@
 import logging
 
 from core.Controller import Controller
+from core.BrokerRateLimiter import BrokerRateLimiter
+from models.RequestPriority import RequestPriority
 from models.Quote import Quote
 
 class Quotes:
+  quoteProvider = None # when set, quotes are served by this function instead of broker (Ex: replay)
+
   @staticmethod
   def getQuote(tradingSymbol, isFnO = False):
+    if Quotes.quoteProvider != None:
+      return Quotes.quoteProvider(tradingSymbol, isFnO)
     broker = Controller.getBrokerName()
     brokerHandle = Controller.getBrokerLogin().getBrokerHandle()
     quote = None
     if broker == "zerodha":
       key = ('NFO:' + tradingSymbol) if isFnO == True else ('NSE:' + tradingSymbol)
+      BrokerRateLimiter.acquire('quote', RequestPriority.DATA)
       bQuoteResp = brokerHandle.quote(key) 
       bQuote = bQuoteResp[key]
       # convert broker quote to our system quote
@@ -0,0 +1,249 @@
+import os
+import mmap
+import zlib
+import array
+import bisect
+from datetime import date
+
+from instruments.InstrumentView import InstrumentView
+
+class InstrumentCache:
+  # Memory mapped binary copy of the instruments file (<deployDir>/instruments.bin) which serves instrument data
+  # lookups without parsing json and without creating a dict per instrument at startup.
+  # Layout: 64 bytes header (magic, numRows, numSlots, stringTableSize) followed by fixed width (8 bytes) columns
+  # of numRows each, then tokens sorted with their row numbers (token index), then a hash table of numSlots
+  # (symbol index) and at last the string table. String columns hold (offset << 16 | length) into the string table.
+  # Instrument data dicts are created only for the looked up rows, in the same form as loaded from the json file.
+  # Listing all the rows yields instruments.InstrumentView of each row instead, which are not cached.
+  magic = b'INSTCAC1'
+  headerSize = 64
+  numberColumns = [('instrument_token', 'q'), ('last_price', 'd'), ('strike', 'd'), ('tick_size', 'd'),
+    ('lot_size', 'q'), ('expiry', 'q')] # expiry is date ordinal, 0 when not applicable
+  stringColumns = ['tradingsymbol', 'name', 'instrument_type', 'segment', 'exchange', 'exchange_token']
+  fields = ['instrument_token', 'exchange_token', 'tradingsymbol', 'name', 'last_price', 'expiry', 'strike', 'tick_size',
+    'lot_size', 'instrument_type', 'segment', 'exchange']
+
+  def __init__(self, filepath):
+    self.filepath = filepath
+    with open(filepath, 'rb') as cFile:
+      self.mm = mmap.mmap(cFile.fileno(), 0, access=mmap.ACCESS_READ)
+    if self.mm[0:8] != InstrumentCache.magic:
+      self.mm.close()
+      raise Exception('Invalid instrument cache file ' + filepath)
+    header = memoryview(self.mm)[8:32].cast('q')
+    self.numRows, self.numSlots, stringTableSize = header[0], header[1], header[2]
+    header.release()
+    self.columnViews = {}
+    offset = InstrumentCache.headerSize
+    for (name, typeCode) in InstrumentCache.numberColumns:
+      self.columnViews[name] = self.view(offset, self.numRows, typeCode)
+      offset += self.numRows * 8
+    for name in InstrumentCache.stringColumns:
+      self.columnViews[name] = self.view(offset, self.numRows, 'q')
+      offset += self.numRows * 8
+    self.sortedTokens = self.view(offset, self.numRows, 'q')
+    offset += self.numRows * 8
+    self.sortedTokenRows = self.view(offset, self.numRows, 'q')
+    offset += self.numRows * 8
+    self.symbolSlots = self.view(offset, self.numSlots, 'q') # row + 1, 0 when empty
+    offset += self.numSlots * 8
+    self.stringTableOffset = offset
+    self.rowToInstrumentMap = {} # instrument data dicts created so far by symbol/token lookups
+    self.symbolToInstrumentMap = {} # looked up so far, so that repeated lookups are plain dict lookups
+    self.tokenToInstrumentMap = {}
+
+  def view(self, offset, count, typeCode):
+    return memoryview(self.mm)[offset:offset + count * 8].cast(typeCode)
+
+  def getString(self, ref):
+    offset = self.stringTableOffset + (ref >> 16)
+    return self.mm[offset:offset + (ref & 0xFFFF)].decode('utf-8')
+
+  def findRowBySymbol(self, tradingSymbol):
+    symbolBytes = tradingSymbol.encode('utf-8')
+    symbolRefs = self.columnViews['tradingsymbol']
+    mask = self.numSlots - 1
+    slot = zlib.crc32(symbolBytes) & mask
+    while True:
+      row = self.symbolSlots[slot] - 1
+      if row < 0:
+        return None
+      ref = symbolRefs[row]
+      if (ref & 0xFFFF) == len(symbolBytes):
+        offset = self.stringTableOffset + (ref >> 16)
+        if self.mm[offset:offset + len(symbolBytes)] == symbolBytes:
+          return row
+      slot = (slot + 1) & mask
+
+  def findRowByToken(self, instrumentToken):
+    # Like a dict, the last row of a repeated token wins (rows of a token are sorted by row)
+    index = bisect.bisect_right(self.sortedTokens, instrumentToken) - 1
+    if index >= 0 and self.sortedTokens[index] == instrumentToken:
+      return self.sortedTokenRows[index]
+    return None
+
+  def getInstrument(self, row):
+    isd = self.rowToInstrumentMap.get(row)
+    if isd != None:
+      return isd
+    c = self.columnViews
+    expiryOrdinal = c['expiry'][row]
+    isd = {
+      'instrument_token': c['instrument_token'][row],
+      'exchange_token': self.getString(c['exchange_token'][row]),
+      'tradingsymbol': self.getString(c['tradingsymbol'][row]),
+      'name': self.getString(c['name'][row]),
+      'last_price': c['last_price'][row],
+      'expiry': str(date.fromordinal(expiryOrdinal)) if expiryOrdinal > 0 else '',
+      'strike': c['strike'][row],
+      'tick_size': c['tick_size'][row],
+      'lot_size': c['lot_size'][row],
+      'instrument_type': self.getString(c['instrument_type'][row]),
+      'segment': self.getString(c['segment'][row]),
+      'exchange': self.getString(c['exchange'][row])
+    }
+    # setdefault so that concurrent lookups of the same row end up with the same dict
+    return self.rowToInstrumentMap.setdefault(row, isd)
+
+  def getValue(self, row, field):
+    # Value of a single field of the row, read by instruments.InstrumentView
+    if field == 'expiry':
+      expiryOrdinal = self.columnViews['expiry'][row]
+      return str(date.fromordinal(expiryOrdinal)) if expiryOrdinal > 0 else ''
+    column = self.columnViews.get(field)
+    if column == None:
+      raise KeyError(field)
+    if field in InstrumentCache.stringColumns:
+      return self.getString(column[row])
+    return column[row]
+
+  def getInstrumentDataBySymbol(self, tradingSymbol):
+    isd = self.symbolToInstrumentMap.get(tradingSymbol)
+    if isd != None:
+      return isd
+    row = self.findRowBySymbol(tradingSymbol)
+    if row == None:
+      raise KeyError(tradingSymbol)
+    isd = self.getInstrument(row)
+    self.symbolToInstrumentMap[tradingSymbol] = isd
+    return isd
+
+  def getInstrumentDataByToken(self, instrumentToken):
+    isd = self.tokenToInstrumentMap.get(instrumentToken)
+    if isd != None:
+      return isd
+    row = self.findRowByToken(instrumentToken)
+    if row == None:
+      raise KeyError(instrumentToken)
+    isd = self.getInstrument(row)
+    self.tokenToInstrumentMap[instrumentToken] = isd
+    return isd
+
+  def getInstruments(self, instrumentTypes = None):
+    # Yields views of all rows, or only of the rows having one of the given instrument types (Ex: ['CE', 'PE', 'FUT']).
+    # Views are not cached, so listing does not keep a dict per row alive.
+    typeRefs = self.columnViews['instrument_type']
+    refToWantedMap = {} # strings are stored once, so each instrument type has one ref
+    for row in range(self.numRows):
+      if instrumentTypes != None:
+        ref = typeRefs[row]
+        wanted = refToWantedMap.get(ref)
+        if wanted == None:
+          wanted = self.getString(ref) in instrumentTypes
+          refToWantedMap[ref] = wanted
+        if wanted == False:
+          continue
+      yield InstrumentView(self, row)
+
+  def getContractKeys(self):
+    # Set of (instrument_token, lot_size, tick_size) of all rows, used to find the changes on refresh
+    c = self.columnViews
+    return set(zip(c['instrument_token'], c['lot_size'], c['tick_size']))
+
+  def getNumInstruments(self):
+    return self.numRows
+
+  def close(self):
+    for columnView in self.columnViews.values():
+      columnView.release()
+    self.columnViews = {}
+    self.sortedTokens.release()
+    self.sortedTokenRows.release()
+    self.symbolSlots.release()
+    self.mm.close()
+
+  @staticmethod
+  def write(filepath, instruments):
+    # Writes the given instruments (as fetched from broker or loaded from json file) to a temporary file
+    # which then replaces the cache file, so a reader never maps a partially written file
+    numRows = len(instruments)
+    numSlots = 1
+    while numSlots < numRows * 2:
+      numSlots *= 2
+    stringTable = bytearray()
+    stringToRefMap = {}
+    def addString(value):
+      value = '' if value == None else str(value)
+      ref = stringToRefMap.get(value)
+      if ref == None:
+        valueBytes = value.encode('utf-8')
+        ref = (len(stringTable) << 16) | len(valueBytes)
+        stringTable.extend(valueBytes)
+        stringToRefMap[value] = ref
+      return ref
+
+    columns = {}
+    for (name, typeCode) in InstrumentCache.numberColumns:
+      columns[name] = array.array(typeCode)
+    for name in InstrumentCache.stringColumns:
+      columns[name] = array.array('q')
+    symbolSlots = array.array('q', bytes(numSlots * 8))
+    mask = numSlots - 1
+    symbolToSlotMap = {}
+    for row in range(numRows):
+      isd = instruments[row]
+      columns['instrument_token'].append(int(isd['instrument_token']))
+      columns['last_price'].append(float(isd.get('last_price') or 0))
+      columns['strike'].append(float(isd.get('strike') or 0))
+      columns['tick_size'].append(float(isd.get('tick_size') or 0))
+      columns['lot_size'].append(int(isd.get('lot_size') or 0))
+      columns['expiry'].append(InstrumentCache.toOrdinal(isd.get('expiry')))
+      for name in InstrumentCache.stringColumns:
+        columns[name].append(addString(isd.get(name)))
+      # Symbol index, linear probing. Like a dict, the last row of a repeated symbol wins
+      tradingSymbol = str(isd['tradingsymbol'])
+      slot = symbolToSlotMap.get(tradingSymbol)
+      if slot == None:
+        slot = zlib.crc32(tradingSymbol.encode('utf-8')) & mask
+        while symbolSlots[slot] != 0:
+          slot = (slot + 1) & mask
+        symbolToSlotMap[tradingSymbol] = slot
+      symbolSlots[slot] = row + 1
+    tokens = columns['instrument_token']
+    sortedTokenRows = array.array('q', sorted(range(numRows), key=lambda r: tokens[r]))
+    sortedTokens = array.array('q', [tokens[r] for r in sortedTokenRows])
+
+    header = bytearray(InstrumentCache.headerSize)
+    header[0:8] = InstrumentCache.magic
+    header[8:32] = array.array('q', [numRows, numSlots, len(stringTable)]).tobytes()
+    tmpFilepath = filepath + '.tmp'
+    with open(tmpFilepath, 'wb') as cFile:
+      cFile.write(header)
+      for (name, typeCode) in InstrumentCache.numberColumns:
+        cFile.write(columns[name].tobytes())
+      for name in InstrumentCache.stringColumns:
+        cFile.write(columns[name].tobytes())
+      cFile.write(sortedTokens.tobytes())
+      cFile.write(sortedTokenRows.tobytes())
+      cFile.write(symbolSlots.tobytes())
+      cFile.write(stringTable)
+    os.replace(tmpFilepath, filepath)
+
+  @staticmethod
+  def toOrdinal(expiry):
+    # Expiry is a date when fetched from broker and a string (or empty) when loaded from json file
+    if expiry == None or expiry == '':
+      return 0
+    if isinstance(expiry, date):
+      return expiry.toordinal()
+    return date.fromisoformat(str(expiry)[0:10]).toordinal()
@@ -0,0 +1,56 @@
+import threading
+
+from core.MarketDataTable import MarketDataTable
+
+class InstrumentRegistry:
+  # Assigns dense integer ids (0, 1, 2, ..) to the instruments seen on tick path so that
+  # their market data can be kept in arrays (core.MarketDataTable) indexed by id
+  tokenToIdMap = {}
+  symbolToIdMap = {}
+  idToSymbolList = []
+  idToTokenList = []
+  lock = threading.Lock()
+
+  @staticmethod
+  def register(tradingSymbol, instrumentToken = None):
+    # Returns the id of the instrument, assigns a new one if not registered already
+    instrumentId = InstrumentRegistry.symbolToIdMap.get(tradingSymbol)
+    if instrumentId != None and (instrumentToken == None or InstrumentRegistry.idToTokenList[instrumentId] != None):
+      return instrumentId
+    with InstrumentRegistry.lock:
+      instrumentId = InstrumentRegistry.symbolToIdMap.get(tradingSymbol)
+      if instrumentId != None:
+        if instrumentToken != None and InstrumentRegistry.idToTokenList[instrumentId] == None:
+          # registered earlier by symbol alone
+          InstrumentRegistry.idToTokenList[instrumentId] = instrumentToken
+          InstrumentRegistry.tokenToIdMap[instrumentToken] = instrumentId
+        return instrumentId
+      instrumentId = len(InstrumentRegistry.idToSymbolList)
+      # Make sure arrays can hold this id before anyone gets to see it
+      MarketDataTable.ensureCapacity(instrumentId + 1)
+      InstrumentRegistry.idToSymbolList.append(tradingSymbol)
+      InstrumentRegistry.idToTokenList.append(instrumentToken)
+      if instrumentToken != None:
+        InstrumentRegistry.tokenToIdMap[instrumentToken] = instrumentId
+      InstrumentRegistry.symbolToIdMap[tradingSymbol] = instrumentId
+      return instrumentId
+
+  @staticmethod
+  def getIdByToken(instrumentToken):
+    return InstrumentRegistry.tokenToIdMap.get(instrumentToken)
+
+  @staticmethod
+  def getIdBySymbol(tradingSymbol):
+    return InstrumentRegistry.symbolToIdMap.get(tradingSymbol)
+
+  @staticmethod
+  def getSymbol(instrumentId):
+    return InstrumentRegistry.idToSymbolList[instrumentId]
+
+  @staticmethod
+  def getToken(instrumentId):
+    return InstrumentRegistry.idToTokenList[instrumentId]
+
+  @staticmethod
+  def getNumInstruments():
+    return len(InstrumentRegistry.idToSymbolList)
@@ -0,0 +1,160 @@
+import array
+import bisect
+from datetime import date
+
+from instruments.InstrumentView import InstrumentView
+
+class InstrumentStore:
+  # Instruments kept column wise in typed arrays instead of one dict per instrument, without any python object per row:
+  # rows are sorted by trading symbol and all symbols are kept in one string (symbol index is a binary search over it),
+  # tokens are indexed by a sorted array, and repeated strings (name, instrument type, segment, exchange) are integer
+  # codes into one table of distinct strings. Lookups return instruments.InstrumentView which reads the row on access.
+  # Expiry is kept as date ordinal (0 when not applicable) and returned as 'YYYY-MM-DD' string, same as loaded from json file.
+  fields = ['instrument_token', 'exchange_token', 'tradingsymbol', 'name', 'last_price', 'expiry', 'strike',
+    'tick_size', 'lot_size', 'instrument_type', 'segment', 'exchange']
+
+  def __init__(self, instrumentsList):
+    self.numRows = len(instrumentsList)
+    self.tokens = array.array('q')
+    self.exchangeTokens = array.array('q') # -1 when not numeric
+    self.lastPrices = array.array('d')
+    self.expiryDays = array.array('l')
+    self.strikes = array.array('d')
+    self.tickSizes = array.array('d')
+    self.lotSizes = array.array('l')
+    self.nameCodes = array.array('l')
+    self.instrumentTypeCodes = array.array('l')
+    self.segmentCodes = array.array('l')
+    self.exchangeCodes = array.array('l')
+    self.symbolOffsets = array.array('l', [0]) # symbol of row i is symbols[symbolOffsets[i]:symbolOffsets[i + 1]]
+    self.codeToStringList = [] # shared by all code columns
+    stringToCodeMap = {}
+    def getCode(value):
+      value = str(value or '')
+      code = stringToCodeMap.get(value)
+      if code == None:
+        code = len(self.codeToStringList)
+        # Copied so that the table does not keep the memory of the given instruments list alive
+        self.codeToStringList.append(value.encode('utf-8').decode('utf-8'))
+        stringToCodeMap[value] = code
+      return code
+
+    # Stable sort, so rows of a repeated symbol stay in the given order and the last one is found like in a dict
+    sortedIndexes = sorted(range(self.numRows), key=lambda i: str(instrumentsList[i]['tradingsymbol']))
+    symbolList = []
+    symbolsLength = 0
+    for i in sortedIndexes:
+      isd = instrumentsList[i]
+      tradingSymbol = str(isd['tradingsymbol'])
+      exchangeToken = str(isd.get('exchange_token', ''))
+      self.tokens.append(int(isd['instrument_token']))
+      self.exchangeTokens.append(int(exchangeToken) if exchangeToken.isdigit() else -1)
+      self.lastPrices.append(float(isd.get('last_price') or 0))
+      self.expiryDays.append(InstrumentStore.toOrdinal(isd.get('expiry')))
+      self.strikes.append(float(isd.get('strike') or 0))
+      self.tickSizes.append(float(isd.get('tick_size') or 0))
+      self.lotSizes.append(int(isd.get('lot_size') or 0))
+      self.nameCodes.append(getCode(isd.get('name')))
+      self.instrumentTypeCodes.append(getCode(isd.get('instrument_type')))
+      self.segmentCodes.append(getCode(isd.get('segment')))
+      self.exchangeCodes.append(getCode(isd.get('exchange')))
+      symbolList.append(tradingSymbol)
+      symbolsLength += len(tradingSymbol)
+      self.symbolOffsets.append(symbolsLength)
+    self.symbols = ''.join(symbolList)
+    # Token index, rows of a repeated token are sorted in the given order so that the last one is found like in a dict
+    tokenRows = sorted(range(self.numRows), key=lambda row: (self.tokens[row], sortedIndexes[row]))
+    self.sortedTokenRows = array.array('l', tokenRows)
+    self.sortedTokens = array.array('q', [self.tokens[row] for row in tokenRows])
+    self.instrumentTypeToCodeMap = {self.codeToStringList[code]: code for code in set(self.instrumentTypeCodes)}
+
+  def getSymbol(self, row):
+    return self.symbols[self.symbolOffsets[row]:self.symbolOffsets[row + 1]]
+
+  def findRowBySymbol(self, tradingSymbol):
+    # Binary search for the last row with the symbol
+    low = 0
+    high = self.numRows
+    while low < high:
+      mid = (low + high) // 2
+      if tradingSymbol < self.getSymbol(mid):
+        high = mid
+      else:
+        low = mid + 1
+    if low > 0 and self.getSymbol(low - 1) == tradingSymbol:
+      return low - 1
+    return None
+
+  def findRowByToken(self, instrumentToken):
+    index = bisect.bisect_right(self.sortedTokens, instrumentToken) - 1
+    if index >= 0 and self.sortedTokens[index] == instrumentToken:
+      return self.sortedTokenRows[index]
+    return None
+
+  def getValue(self, row, field):
+    if field == 'tradingsymbol':
+      return self.getSymbol(row)
+    if field == 'instrument_token':
+      return self.tokens[row]
+    if field == 'lot_size':
+      return self.lotSizes[row]
+    if field == 'instrument_type':
+      return self.codeToStringList[self.instrumentTypeCodes[row]]
+    if field == 'name':
+      return self.codeToStringList[self.nameCodes[row]]
+    if field == 'expiry':
+      expiryDays = self.expiryDays[row]
+      return str(date.fromordinal(expiryDays)) if expiryDays > 0 else ''
+    if field == 'strike':
+      return self.strikes[row]
+    if field == 'tick_size':
+      return self.tickSizes[row]
+    if field == 'segment':
+      return self.codeToStringList[self.segmentCodes[row]]
+    if field == 'exchange':
+      return self.codeToStringList[self.exchangeCodes[row]]
+    if field == 'exchange_token':
+      exchangeToken = self.exchangeTokens[row]
+      return str(exchangeToken) if exchangeToken >= 0 else ''
+    if field == 'last_price':
+      return self.lastPrices[row]
+    raise KeyError(field)
+
+  def getInstrumentDataBySymbol(self, tradingSymbol):
+    row = self.findRowBySymbol(tradingSymbol)
+    if row == None:
+      raise KeyError(tradingSymbol)
+    return InstrumentView(self, row)
+
+  def getInstrumentDataByToken(self, instrumentToken):
+    row = self.findRowByToken(instrumentToken)
+    if row == None:
+      raise KeyError(instrumentToken)
+    return InstrumentView(self, row)
+
+  def getInstruments(self, instrumentTypes = None):
+    # Yields views (in trading symbol order) of all rows, or only of the rows having one of the given
+    # instrument types Ex: ['CE', 'PE', 'FUT']
+    wantedCodes = None
+    if instrumentTypes != None:
+      wantedCodes = set(self.instrumentTypeToCodeMap[t] for t in instrumentTypes if t in self.instrumentTypeToCodeMap)
+    instrumentTypeCodes = self.instrumentTypeCodes
+    for row in range(self.numRows):
+      if wantedCodes == None or instrumentTypeCodes[row] in wantedCodes:
+        yield InstrumentView(self, row)
+
+  def getContractKeys(self):
+    # Set of (instrument_token, lot_size, tick_size) of all rows, used to find the changes on refresh
+    return set(zip(self.tokens, self.lotSizes, self.tickSizes))
+
+  def getNumInstruments(self):
+    return self.numRows
+
+  @staticmethod
+  def toOrdinal(expiry):
+    # Expiry is a date when fetched from broker and a string (or empty) when loaded from json file
+    if expiry == None or expiry == '':
+      return 0
+    if isinstance(expiry, date):
+      return expiry.toordinal()
+    return date.fromisoformat(str(expiry)[0:10]).toordinal()
@@ -0,0 +1,40 @@
+class InstrumentView:
+  # Read only dict like view of one instrument of instruments.InstrumentStore, Ex: isd['lot_size'], isd.get('expiry').
+  # Holds only the store and row number, values are read from the store columns on access.
+  __slots__ = ['store', 'row']
+
+  def __init__(self, store, row):
+    self.store = store
+    self.row = row
+
+  def __getitem__(self, field):
+    return self.store.getValue(self.row, field)
+
+  def get(self, field, default = None):
+    try:
+      return self.store.getValue(self.row, field)
+    except KeyError:
+      return default
+
+  def __contains__(self, field):
+    return field in self.store.fields
+
+  def keys(self):
+    return list(self.store.fields)
+
+  def toDict(self):
+    return {field: self.store.getValue(self.row, field) for field in self.store.fields}
+
+  def __eq__(self, other):
+    if isinstance(other, InstrumentView):
+      return self.store is other.store and self.row == other.row
+    return NotImplemented
+
+  def __hash__(self):
+    return hash((id(self.store), self.row))
+
+  def __str__(self):
+    return str(self.toDict())
+
+  def __repr__(self):
+    return 'InstrumentView(' + str(self.toDict()) + ')'
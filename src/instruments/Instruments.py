@@ -1,15 +1,48 @@
 import os
 import logging
 import json
+import threading
+from datetime import timedelta
 
-from config.Config import getServerConfig, getTimestampsData, saveTimestampsData
+from config.Config import getServerConfig, getServerConfigValue, getTimestampsData, saveTimestampsData
 from core.Controller import Controller
+from instruments.InstrumentCache import InstrumentCache
+from instruments.InstrumentStore import InstrumentStore
+from instruments.ZerodhaInstrumentsFetcher import ZerodhaInstrumentsFetcher
 from utils.Utils import Utils
+from utils.Clock import Clock
 
 class Instruments:
-  instrumentsList = None
-  symbolToInstrumentMap = None
-  tokenToInstrumentMap = None
+  # instruments.InstrumentStore built from the instruments list, or instruments.InstrumentCache when
+  # loaded from cache file. Both serve instrument data lookups and iteration.
+  instrumentStore = None
+  generation = 0 # incremented whenever instruments are replaced
+  # Replaced cache is unmapped only on the next replacement, as other threads may still be reading it (Ex: a lookup
+  # started before the swap, or instrument views of ladders which are being built again)
+  retiredInstrumentCache = None
+  changeListeners = [] # called with (addedTokens, removedTokens) after instruments are replaced by a refresh
+  refreshThread = None
+  refreshLock = threading.Lock()
+
+  @staticmethod
+  def isCacheEnabled():
+    return getServerConfigValue('instrumentsCache', False) == True
+
+  @staticmethod
+  def getInstrumentsFilepath():
+    return os.path.join(getServerConfig()['deployDir'], 'instruments.json')
+
+  @staticmethod
+  def getCacheFilepath():
+    return os.path.join(getServerConfig()['deployDir'], 'instruments.bin')
+
+  @staticmethod
+  def getLastPublishTime():
+    # Broker publishes the instruments of the day every morning at this time
+    publishTime = Utils.getTimeOfToDay(8, 30, 0)
+    if Clock.now() < publishTime:
+      publishTime = publishTime - timedelta(days=1)
+    return publishTime
 
   @staticmethod
   def shouldFetchFromServer():
@@ -17,9 +50,8 @@ class Instruments:
     if 'instrumentsLastSavedAt' not in timestamps:
       return True
     lastSavedTimestamp = timestamps['instrumentsLastSavedAt']
-    nowEpoch = Utils.getEpoch()
-    if nowEpoch - lastSavedTimestamp >= 24 * 60* 60:
-      logging.info("Instruments: shouldFetchFromServer() returning True as its been 24 hours since last fetch.")
+    if lastSavedTimestamp < Utils.getEpoch(Instruments.getLastPublishTime()):
+      logging.info("Instruments: shouldFetchFromServer() returning True as instruments are saved before they were last published.")
       return True
     return False
 
@@ -31,8 +63,7 @@ class Instruments:
 
   @staticmethod
   def loadInstruments():
-    serverConfig = getServerConfig()
-    instrumentsFilepath = os.path.join(serverConfig['deployDir'], 'instruments.json')
+    instrumentsFilepath = Instruments.getInstrumentsFilepath()
     if os.path.exists(instrumentsFilepath) == False:
       logging.warn('Instruments: instrumentsFilepath %s does not exist', instrumentsFilepath)
       return [] # returns empty list
@@ -42,13 +73,38 @@ class Instruments:
     logging.info('Instruments: loaded %d instruments from file %s', len(instruments), instrumentsFilepath)
     return instruments
 
+  @staticmethod
+  def loadInstrumentCache():
+    # Returns None if cache file does not exist or is older than the instruments file
+    cacheFilepath = Instruments.getCacheFilepath()
+    instrumentsFilepath = Instruments.getInstrumentsFilepath()
+    if os.path.exists(cacheFilepath) == False or os.path.exists(instrumentsFilepath) == False:
+      return None
+    if os.path.getmtime(cacheFilepath) < os.path.getmtime(instrumentsFilepath):
+      logging.warn('Instruments: cache file %s is older than instruments file, hence not using it', cacheFilepath)
+      return None
+    try:
+      instrumentCache = InstrumentCache(cacheFilepath)
+    except Exception as e:
+      logging.exception('Instruments: Exception while loading cache file %s', cacheFilepath)
+      return None
+    logging.info('Instruments: loaded %d instruments from cache file %s', instrumentCache.getNumInstruments(), cacheFilepath)
+    return instrumentCache
+
   @staticmethod
   def saveInstruments(instruments = []):
-    serverConfig = getServerConfig()
-    instrumentsFilepath = os.path.join(serverConfig['deployDir'], 'instruments.json')
+    instrumentsFilepath = Instruments.getInstrumentsFilepath()
     with open(instrumentsFilepath, 'w') as isdFile:
       json.dump(instruments, isdFile, indent=2, default=str)
     logging.info('Instruments: Saved %d instruments to file %s', len(instruments), instrumentsFilepath)
+    if Instruments.isCacheEnabled():
+      # Cache is written after json file so that it is not older than json file
+      cacheFilepath = Instruments.getCacheFilepath()
+      try:
+        InstrumentCache.write(cacheFilepath, instruments)
+        logging.info('Instruments: Saved %d instruments to cache file %s', len(instruments), cacheFilepath)
+      except Exception as e:
+        logging.exception('Instruments: Exception while saving cache file %s', cacheFilepath)
     # Update last save timestamp
     Instruments.updateLastSavedTimestamp()
 
@@ -58,10 +114,8 @@ class Instruments:
     try:
       brokerHandle = Controller.getBrokerLogin().getBrokerHandle()
       logging.info('Going to fetch instruments from server...')
-      instrumentsList = brokerHandle.instruments('NSE')
-      instrumentsListFnO = brokerHandle.instruments('NFO')
-      # Add FnO instrument list to the main list
-      instrumentsList.extend(instrumentsListFnO)
+      # NSE and FnO instruments are downloaded concurrently
+      instrumentsList = ZerodhaInstrumentsFetcher(brokerHandle).fetch(['NSE', 'NFO'])
       logging.info('Fetched %d instruments from server.', len(instrumentsList))
     except Exception as e:
       logging.exception("Exception while fetching instruments from server")
@@ -69,39 +123,142 @@ class Instruments:
 
   @staticmethod
   def fetchInstruments():
-    if Instruments.instrumentsList:
-      return Instruments.instrumentsList
+    # Instruments saved locally are used right away even if they are old, they get refreshed from server
+    # in background. Waits for the download only when there are no instruments saved locally.
+    if Instruments.instrumentStore != None:
+      return Instruments.instrumentStore
 
-    instrumentsList = Instruments.loadInstruments()
-    if len(instrumentsList) == 0 or Instruments.shouldFetchFromServer() == True:
+    instrumentCache = Instruments.loadInstrumentCache() if Instruments.isCacheEnabled() else None
+    if instrumentCache != None:
+      Instruments.setInstrumentStore(instrumentCache)
+    else:
+      instrumentsList = Instruments.loadInstruments()
+      if len(instrumentsList) > 0:
+        Instruments.setInstruments(instrumentsList)
+        del instrumentsList
+
+    if Instruments.isLoaded() == False:
       instrumentsList = Instruments.fetchInstrumentsFromServer()
+      if len(instrumentsList) == 0:
+        print("Could not fetch/load instruments data. Hence exiting the app.")
+        logging.error("Could not fetch/load instruments data. Hence exiting the app.");
+        exit(-2)
       # Save instruments to file locally
-      if len(instrumentsList) > 0:
-        Instruments.saveInstruments(instrumentsList)
+      Instruments.saveInstruments(instrumentsList)
+      Instruments.setInstruments(instrumentsList)
+    elif Instruments.shouldFetchFromServer() == True:
+      Instruments.startBackgroundRefresh()
+
+    logging.info('Fetching instruments done. Instruments count = %d', Instruments.getNumInstruments())
+    return Instruments.instrumentStore
+
+  @staticmethod
+  def startBackgroundRefresh():
+    with Instruments.refreshLock:
+      if Instruments.refreshThread != None and Instruments.refreshThread.is_alive():
+        return
+      Instruments.refreshThread = threading.Thread(target=Instruments.runBackgroundRefresh, daemon=True)
+      Instruments.refreshThread.start()
+
+  @staticmethod
+  def runBackgroundRefresh():
+    # Refreshes now if instruments are old and once more when today's instruments get published, if that is yet to happen
+    try:
+      if Instruments.shouldFetchFromServer() == True:
+        Instruments.refreshInstruments()
+      publishTime = Utils.getTimeOfToDay(8, 30, 0)
+      waitSeconds = (publishTime - Clock.now()).total_seconds()
+      if waitSeconds > 0:
+        logging.info('Instruments: Will refresh instruments again at %s', publishTime)
+        Clock.sleep(waitSeconds)
+        Instruments.refreshInstruments()
+    except Exception as e:
+      logging.exception('Instruments: Exception while refreshing instruments in background')
 
+  @staticmethod
+  def refreshInstruments():
+    instrumentsList = Instruments.fetchInstrumentsFromServer()
     if len(instrumentsList) == 0:
-      print("Could not fetch/load instruments data. Hence exiting the app.")
-      logging.error("Could not fetch/load instruments data. Hence exiting the app.");
-      exit(-2)
-    
-    Instruments.symbolToInstrumentMap = {}
-    Instruments.tokenToInstrumentMap = {}
+      logging.error('Instruments: Could not refresh instruments, continuing with the loaded instruments')
+      return
+    Instruments.applyInstruments(instrumentsList)
+
+  @staticmethod
+  def applyInstruments(instrumentsList):
+    # Replaces the loaded instruments only when contracts are added/removed (Ex: expiry rollover) or changed,
+    # then lets the listeners update their indexes with the difference
+    addedTokens, removedTokens = Instruments.getDifference(Instruments.instrumentStore, instrumentsList)
+    if len(addedTokens) > 0 or len(removedTokens) > 0:
+      Instruments.setInstruments(instrumentsList)
+      logging.info('Instruments: Refreshed instruments, %d added and %d removed', len(addedTokens), len(removedTokens))
+      for listener in Instruments.changeListeners:
+        try:
+          listener(addedTokens, removedTokens)
+        except Exception as e:
+          logging.exception('Instruments: Exception in instruments change listener')
+      # Saved after replacing as the replaced cache file gets unmapped then (a mapped file cannot be replaced on Windows)
+      Instruments.saveInstruments(instrumentsList)
+    else:
+      logging.info('Instruments: Refreshed instruments, no changes')
+      # Saved files are still up to date, only remember that they are checked against today's instruments
+      Instruments.updateLastSavedTimestamp()
+
+  @staticmethod
+  def getDifference(instrumentStore, instrumentsList):
+    # Returns (addedTokens, removedTokens) sets of the given list compared to the store. A contract whose
+    # lot size or tick size changed is counted as removed and added.
+    oldKeys = instrumentStore.getContractKeys() if instrumentStore != None else set()
+    newKeys = set()
     for isd in instrumentsList:
-      tradingSymbol = isd['tradingsymbol']
-      instrumentToken = isd['instrument_token']
-      # logging.info('%s = %d', tradingSymbol, instrumentToken)
-      Instruments.symbolToInstrumentMap[tradingSymbol] = isd
-      Instruments.tokenToInstrumentMap[instrumentToken] = isd
-    
-    logging.info('Fetching instruments done. Instruments count = %d', len(instrumentsList))
-    Instruments.instrumentsList = instrumentsList # assign the list to static variable
-    return instrumentsList
+      newKeys.add((int(isd['instrument_token']), int(isd['lot_size']), float(isd['tick_size'])))
+    addedTokens = set(key[0] for key in newKeys - oldKeys)
+    removedTokens = set(key[0] for key in oldKeys - newKeys)
+    return (addedTokens, removedTokens)
+
+  @staticmethod
+  def registerChangeListener(listener):
+    Instruments.changeListeners.append(listener)
+
+  @staticmethod
+  def setInstruments(instrumentsList):
+    # Also used directly to provide instruments without broker (Ex: replay).
+    # The list itself is not kept, its dicts are freed once the caller drops it.
+    Instruments.setInstrumentStore(InstrumentStore(instrumentsList))
+
+  @staticmethod
+  def setInstrumentStore(instrumentStore):
+    oldInstrumentStore = Instruments.instrumentStore
+    Instruments.instrumentStore = instrumentStore
+    Instruments.generation += 1
+    if oldInstrumentStore is instrumentStore:
+      return
+    retiredInstrumentCache = Instruments.retiredInstrumentCache
+    Instruments.retiredInstrumentCache = oldInstrumentStore if isinstance(oldInstrumentStore, InstrumentCache) else None
+    if retiredInstrumentCache != None and retiredInstrumentCache is not instrumentStore:
+      # Unmap the cache file replaced before, instrument data dicts already handed out stay valid
+      retiredInstrumentCache.close()
+
+  @staticmethod
+  def isLoaded():
+    return Instruments.instrumentStore != None
+
+  @staticmethod
+  def getNumInstruments():
+    return Instruments.instrumentStore.getNumInstruments() if Instruments.instrumentStore != None else 0
 
   @staticmethod
   def getInstrumentDataBySymbol(tradingSymbol):
-    return Instruments.symbolToInstrumentMap[tradingSymbol]
+    # Raises KeyError if the symbol is not found
+    return Instruments.instrumentStore.getInstrumentDataBySymbol(tradingSymbol)
 
   @staticmethod
   def getInstrumentDataByToken(instrumentToken):
-    return Instruments.tokenToInstrumentMap[instrumentToken]
-    
\ No newline at end of file
+    # Raises KeyError if the token is not found
+    return Instruments.instrumentStore.getInstrumentDataByToken(instrumentToken)
+
+  @staticmethod
+  def getInstruments(instrumentTypes = None):
+    # Iterates instrument data of all instruments or only of the given instrument types Ex: ['CE', 'PE', 'FUT']
+    if Instruments.instrumentStore == None:
+      return iter([])
+    return Instruments.instrumentStore.getInstruments(instrumentTypes)
@@ -0,0 +1,88 @@
+import bisect
+
+class OptionChain:
+  # Listed strikes of one underlying and expiry in sorted order with their CE/PE instruments, built by
+  # instruments.UnderlyingLadder. Strike queries are binary searches over the sorted strikes, Ex: nearest listed strike
+  # to the future price, N strikes around ATM, strikes within a price band.
+  def __init__(self, underlying, expiry):
+    self.underlying = underlying
+    self.expiry = expiry # datetime.date
+    self.strikes = [] # sorted
+    self.ceInstruments = [] # instrument data at the same index as strike, None if CE of the strike is not listed
+    self.peInstruments = []
+    self.ceTokens = [] # 0 if not listed
+    self.peTokens = []
+    self.strikeToIndexMap = {}
+    self.strikeToOptionsMap = {} # strike -> [CE isd, PE isd] while building
+
+  def addOption(self, strike, optionType, isd):
+    options = self.strikeToOptionsMap.get(strike)
+    if options == None:
+      options = [None, None]
+      self.strikeToOptionsMap[strike] = options
+    options[0 if optionType == 'CE' else 1] = isd
+
+  def finalize(self):
+    # Called once all the options of the expiry are added
+    self.strikes = sorted(self.strikeToOptionsMap.keys())
+    for index in range(len(self.strikes)):
+      strike = self.strikes[index]
+      ceIsd, peIsd = self.strikeToOptionsMap[strike]
+      self.ceInstruments.append(ceIsd)
+      self.peInstruments.append(peIsd)
+      self.ceTokens.append(ceIsd['instrument_token'] if ceIsd != None else 0)
+      self.peTokens.append(peIsd['instrument_token'] if peIsd != None else 0)
+      self.strikeToIndexMap[strike] = index
+    self.strikeToOptionsMap = {}
+
+  def getInstrument(self, strike, optionType):
+    # Returns instrument data (tradingsymbol, instrument_token, lot_size etc.) or None if not listed
+    index = self.strikeToIndexMap.get(strike)
+    if index == None:
+      return None
+    return self.ceInstruments[index] if optionType == 'CE' else self.peInstruments[index]
+
+  def getSymbol(self, strike, optionType):
+    isd = self.getInstrument(strike, optionType)
+    return isd['tradingsymbol'] if isd != None else None
+
+  def getToken(self, strike, optionType):
+    isd = self.getInstrument(strike, optionType)
+    return isd['instrument_token'] if isd != None else None
+
+  def isStrikeListed(self, strike):
+    return strike in self.strikeToIndexMap
+
+  def getNearestStrikeIndex(self, price):
+    strikes = self.strikes
+    if len(strikes) == 0:
+      return None
+    index = bisect.bisect_left(strikes, price)
+    if index == len(strikes):
+      return index - 1
+    if index > 0 and price - strikes[index - 1] < strikes[index] - price:
+      return index - 1
+    return index # exactly in the middle goes to the upper strike like Utils.getNearestStrikePrice()
+
+  def getNearestStrike(self, price):
+    # Listed strike nearest to the given price (ATM strike), None if no strikes are listed
+    index = self.getNearestStrikeIndex(price)
+    return self.strikes[index] if index != None else None
+
+  def getStrikeAtOffset(self, strike, numStrikes):
+    # Listed strike numStrikes above (positive) or below (negative) the given listed strike, None if there is no such strike
+    index = self.strikeToIndexMap.get(strike)
+    if index == None or index + numStrikes < 0 or index + numStrikes >= len(self.strikes):
+      return None
+    return self.strikes[index + numStrikes]
+
+  def getStrikesAround(self, price, numStrikes):
+    # Strike nearest to the given price along with up to numStrikes listed strikes on each side of it
+    index = self.getNearestStrikeIndex(price)
+    if index == None:
+      return []
+    return self.strikes[max(0, index - numStrikes):index + numStrikes + 1]
+
+  def getStrikesInRange(self, lowPrice, highPrice):
+    # All listed strikes with lowPrice <= strike <= highPrice
+    return self.strikes[bisect.bisect_left(self.strikes, lowPrice):bisect.bisect_right(self.strikes, highPrice)]
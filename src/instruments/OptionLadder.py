@@ -0,0 +1,84 @@
+import logging
+import threading
+from datetime import datetime, date
+
+from instruments.Instruments import Instruments
+from instruments.UnderlyingLadder import UnderlyingLadder
+from utils.Clock import Clock
+
+class OptionLadder:
+  # Per day ladders (instruments.UnderlyingLadder) of listed futures and options of all underlyings built in one pass
+  # over the instruments list. Symbols come from the listed instruments instead of being constructed from expiry dates,
+  # so a contract which is not listed is reported as missing instead of getting a wrong symbol.
+  ladderDate = None
+  ladderGeneration = None # instruments generation the ladders are built from
+  underlyingToLadderMap = {}
+  lock = threading.Lock()
+
+  @staticmethod
+  def getLadder(underlying):
+    today = Clock.now().date()
+    if OptionLadder.ladderDate != today or OptionLadder.ladderGeneration != Instruments.generation:
+      with OptionLadder.lock:
+        if OptionLadder.ladderDate != today or OptionLadder.ladderGeneration != Instruments.generation:
+          OptionLadder.build(today)
+    return OptionLadder.underlyingToLadderMap.get(underlying)
+
+  @staticmethod
+  def onInstrumentsChanged(addedTokens, removedTokens):
+    # Registered as instruments change listener. Ladders are built again right away on the refreshing thread
+    # so that strategies do not have to wait for it.
+    with OptionLadder.lock:
+      OptionLadder.build(Clock.now().date())
+
+  @staticmethod
+  def getOptionChain(underlying, expiry = None):
+    # Returns instruments.OptionChain of the given expiry (datetime.date), nearest weekly expiry if not given.
+    # None if the underlying or expiry has no listed options.
+    ladder = OptionLadder.getLadder(underlying)
+    if ladder == None:
+      return None
+    return ladder.getOptionChain(expiry if expiry != None else ladder.weeklyExpiry)
+
+  @staticmethod
+  def build(today):
+    if Instruments.isLoaded() == False:
+      logging.error('OptionLadder: Instruments are not loaded yet')
+      return
+    generation = Instruments.generation
+    underlyingToLadderMap = {}
+    numOptions = 0
+    for isd in Instruments.getInstruments(['CE', 'PE', 'FUT']):
+      instrumentType = isd['instrument_type']
+      expiry = OptionLadder.toDate(isd.get('expiry'))
+      if expiry == None or expiry < today:
+        continue
+      underlying = isd['name']
+      ladder = underlyingToLadderMap.get(underlying)
+      if ladder == None:
+        ladder = UnderlyingLadder(underlying)
+        underlyingToLadderMap[underlying] = ladder
+      if instrumentType == 'FUT':
+        ladder.addFuture(expiry, isd)
+      else:
+        strike = isd['strike']
+        # Strikes are floats in instruments list, keep whole number strikes as int
+        ladder.addOption(expiry, int(strike) if strike == int(strike) else strike, instrumentType, isd)
+        numOptions += 1
+    for ladder in underlyingToLadderMap.values():
+      ladder.finalize()
+    OptionLadder.underlyingToLadderMap = underlyingToLadderMap
+    OptionLadder.ladderGeneration = generation
+    OptionLadder.ladderDate = today
+    logging.info('OptionLadder: Built ladders of %d underlyings with %d options for %s', len(underlyingToLadderMap), numOptions, today)
+
+  @staticmethod
+  def toDate(expiry):
+    # Expiry is a date when instruments are fetched from broker and a string when loaded from the saved json file
+    if expiry == None or expiry == '':
+      return None
+    if isinstance(expiry, datetime):
+      return expiry.date()
+    if isinstance(expiry, date):
+      return expiry
+    return datetime.strptime(str(expiry)[0:10], '%Y-%m-%d').date()
@@ -0,0 +1,57 @@
+from instruments.OptionChain import OptionChain
+
+class UnderlyingLadder:
+  # Listed futures and options of one underlying for a day, built by instruments.OptionLadder from the instruments list.
+  # Options are kept in one instruments.OptionChain per expiry, where expiry is a datetime.date and optionType is CE/PE.
+  def __init__(self, underlying):
+    self.underlying = underlying
+    self.futures = [] # (expiry, isd) sorted by expiry
+    self.expiries = [] # option expiries sorted
+    self.expiryToChainMap = {} # expiry -> OptionChain
+    self.futureSymbol = None # nearest expiry future
+    self.futureExpiry = None
+    self.weeklyExpiry = None # nearest option expiry
+    self.nextWeeklyExpiry = None
+
+  def addFuture(self, expiry, isd):
+    self.futures.append((expiry, isd))
+
+  def addOption(self, expiry, strike, optionType, isd):
+    optionChain = self.expiryToChainMap.get(expiry)
+    if optionChain == None:
+      optionChain = OptionChain(self.underlying, expiry)
+      self.expiryToChainMap[expiry] = optionChain
+    optionChain.addOption(strike, optionType, isd)
+
+  def finalize(self):
+    # Called once all the instruments (of not yet expired contracts) are added
+    self.futures.sort(key=lambda f: f[0])
+    if len(self.futures) > 0:
+      self.futureExpiry = self.futures[0][0]
+      self.futureSymbol = self.futures[0][1]['tradingsymbol']
+    self.expiries = sorted(self.expiryToChainMap.keys())
+    for optionChain in self.expiryToChainMap.values():
+      optionChain.finalize()
+    self.weeklyExpiry = self.expiries[0] if len(self.expiries) > 0 else None
+    self.nextWeeklyExpiry = self.expiries[1] if len(self.expiries) > 1 else None
+
+  def getOptionChain(self, expiry):
+    # Returns None if no options are listed for the expiry
+    return self.expiryToChainMap.get(expiry)
+
+  def getOption(self, expiry, strike, optionType):
+    # Returns instrument data (tradingsymbol, instrument_token, lot_size etc.) or None if not listed
+    optionChain = self.expiryToChainMap.get(expiry)
+    return optionChain.getInstrument(strike, optionType) if optionChain != None else None
+
+  def getOptionSymbol(self, expiry, strike, optionType):
+    optionChain = self.expiryToChainMap.get(expiry)
+    return optionChain.getSymbol(strike, optionType) if optionChain != None else None
+
+  def getStrikes(self, expiry):
+    optionChain = self.expiryToChainMap.get(expiry)
+    return optionChain.strikes if optionChain != None else []
+
+  def isStrikeListed(self, expiry, strike):
+    optionChain = self.expiryToChainMap.get(expiry)
+    return optionChain != None and optionChain.isStrikeListed(strike)
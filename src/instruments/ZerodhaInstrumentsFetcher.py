@@ -0,0 +1,60 @@
+import csv
+import logging
+import time
+from datetime import date
+from concurrent.futures import ThreadPoolExecutor
+
+class ZerodhaInstrumentsFetcher:
+  # Downloads instruments of the given exchanges (segments) concurrently. Each instruments csv dump is parsed
+  # while it is being received instead of after downloading it fully, rows are converted the same way
+  # as KiteConnect.instruments() does. Falls back to KiteConnect.instruments() if streaming fails.
+  def __init__(self, brokerHandle):
+    self.brokerHandle = brokerHandle
+
+  def fetch(self, exchanges):
+    # Returns the instruments of all the given exchanges in the given order
+    with ThreadPoolExecutor(max_workers=len(exchanges)) as executor:
+      exchangeInstrumentsLists = list(executor.map(self.fetchExchange, exchanges))
+    instrumentsList = []
+    for exchangeInstrumentsList in exchangeInstrumentsLists:
+      instrumentsList.extend(exchangeInstrumentsList)
+    return instrumentsList
+
+  def fetchExchange(self, exchange):
+    start = time.perf_counter()
+    try:
+      instrumentsList = self.streamExchange(exchange)
+    except Exception as e:
+      logging.exception('ZerodhaInstrumentsFetcher: Exception while streaming %s instruments, fetching them in one go', exchange)
+      instrumentsList = self.brokerHandle.instruments(exchange)
+    logging.info('ZerodhaInstrumentsFetcher: Fetched %d %s instruments in %.2f seconds', len(instrumentsList), exchange, time.perf_counter() - start)
+    return instrumentsList
+
+  def streamExchange(self, exchange):
+    kite = self.brokerHandle
+    url = kite.root + kite._routes['market.instruments'].format(exchange=exchange)
+    headers = {'X-Kite-Version': '3'}
+    if kite.api_key and kite.access_token:
+      headers['Authorization'] = 'token ' + kite.api_key + ':' + kite.access_token
+    response = kite.reqsession.request('GET', url, headers=headers, stream=True, timeout=kite.timeout,
+      proxies=kite.proxies, verify=not kite.disable_ssl)
+    try:
+      response.raise_for_status()
+      lines = (line.decode('utf-8') for line in response.iter_lines() if line)
+      instrumentsList = []
+      for row in csv.DictReader(lines):
+        instrumentsList.append(ZerodhaInstrumentsFetcher.convertRow(row))
+      return instrumentsList
+    finally:
+      response.close()
+
+  @staticmethod
+  def convertRow(row):
+    row['instrument_token'] = int(row['instrument_token'])
+    row['last_price'] = float(row['last_price'])
+    row['strike'] = float(row['strike'])
+    row['tick_size'] = float(row['tick_size'])
+    row['lot_size'] = int(row['lot_size'])
+    if len(row['expiry']) == 10:
+      row['expiry'] = date.fromisoformat(row['expiry'])
+    return row
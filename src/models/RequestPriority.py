@@ -0,0 +1,7 @@
+
+class RequestPriority:
+  # Lanes of broker requests, lower value goes first
+  EXIT = 0 # exits, SL order placement/modification and cancellations
+  ENTRY = 1 # new entries
+  DATA = 2 # quotes, positions, order book etc.
+  names = ['EXIT', 'ENTRY', 'DATA']
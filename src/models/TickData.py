@@ -1,7 +1,12 @@
 
 class TickData:
+  # __slots__ as a tick object gets created for every tick received from broker
+  __slots__ = ('tradingSymbol', 'instrumentId', 'lastTradedPrice', 'lastTradedQuantity', 'avgTradedPrice', 'volume',
+    'totalBuyQuantity', 'totalSellQuantity', 'open', 'high', 'low', 'close', 'change')
+
   def __init__(self, tradingSymbol):
     self.tradingSymbol = tradingSymbol
+    self.instrumentId = None # dense id assigned by instruments.InstrumentRegistry
     self.lastTradedPrice = 0
     self.lastTradedQuantity = 0
     self.avgTradedPrice = 0
@@ -13,3 +18,11 @@ class TickData:
     self.low = 0
     self.close = 0
     self.change = 0
+
+  def __str__(self):
+    return "symbol=" + str(self.tradingSymbol) + ", ltp=" + str(self.lastTradedPrice) \
+      + ", ltq=" + str(self.lastTradedQuantity) + ", atp=" + str(self.avgTradedPrice) \
+      + ", volume=" + str(self.volume) + ", buyQty=" + str(self.totalBuyQuantity) \
+      + ", sellQty=" + str(self.totalSellQuantity) + ", open=" + str(self.open) \
+      + ", high=" + str(self.high) + ", low=" + str(self.low) + ", close=" + str(self.close) \
+      + ", change=" + str(self.change)
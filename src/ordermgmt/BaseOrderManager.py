@@ -4,7 +4,9 @@ from core.Controller import Controller
 class BaseOrderManager:
   def __init__(self, broker):
     self.broker = broker
-    self.brokerHandle = Controller.getBrokerLogin().getBrokerHandle()
+    brokerLogin = Controller.getBrokerLogin()
+    # There is no broker login for simulated order managers (Ex: replay)
+    self.brokerHandle = brokerLogin.getBrokerHandle() if brokerLogin != None else None
 
   def placeOrder(self, orderInputParams):
     pass
@@ -19,8 +21,21 @@ class BaseOrderManager:
     pass
 
   def fetchAndUpdateAllOrderDetails(self, orders):
+    # orders is orderId -> Order map. Should return the list of orders changed
+    return []
+
+  def prewarm(self):
+    # Called before trading starts to open the connections to broker
+    pass
+
+  def keepWarm(self):
+    # Called periodically to keep the connections to broker open when idle
     pass
 
+  def getStats(self):
+    # Order manager specific stats to be logged periodically, None if there are none
+    return None
+
   def convertToBrokerProductType(self, productType):
     return productType
 
@@ -1,3 +1,4 @@
+from models.OrderStatus import OrderStatus
 
 class Order:
   def __init__(self, orderInputParams = None):
@@ -16,6 +17,28 @@ class Order:
     self.orderPlaceTimestamp = None # Timestamp when the order is placed
     self.lastOrderUpdateTimestamp = None # Applicable if you modify the order Ex: Trailing SL
     self.message = None # In case any order rejection or any other error save the response from broker in this field
+
+  def applyUpdate(self, orderUpdate):
+    # Updates the order with details received from broker (ordermgmt.OrderUpdate)
+    # Returns True if order status, filled quantity or average price has changed
+    orderStatus = orderUpdate.orderStatus if orderUpdate.orderStatus != None else self.orderStatus
+    if orderStatus == OrderStatus.CANCELLED and orderUpdate.filledQty > 0:
+      # Consider this case as completed in our system as we cancel the order with pending qty when strategy stop timestamp reaches
+      orderStatus = OrderStatus.COMPLETE
+    changed = orderStatus != self.orderStatus or orderUpdate.filledQty != self.filledQty \
+      or orderUpdate.averagePrice != self.averagePrice
+    self.orderStatus = orderStatus
+    self.qty = orderUpdate.qty
+    self.filledQty = orderUpdate.filledQty
+    self.pendingQty = orderUpdate.pendingQty
+    self.price = orderUpdate.price
+    self.triggerPrice = orderUpdate.triggerPrice
+    self.averagePrice = orderUpdate.averagePrice
+    if orderUpdate.message != None:
+      self.message = orderUpdate.message
+    if orderUpdate.updateTimestamp != None:
+      self.lastOrderUpdateTimestamp = orderUpdate.updateTimestamp
+    return changed
     
   def __str__(self):
     return "orderId=" + str(self.orderId) + ", orderStatus=" + str(self.orderStatus) \
@@ -0,0 +1,121 @@
+import heapq
+import logging
+import threading
+import time
+
+from models.RequestPriority import RequestPriority
+from utils.LatencyStats import LatencyStats
+
+class OrderGateway:
+  # Sends order requests (place/modify/cancel) to the order manager on a pool of worker threads so that
+  # the calling threads (tick dispatcher, order updates, trade tracking) do not wait for the broker.
+  # A request is a function calling the order manager, its result or exception is passed to the callback
+  # which is called on the worker thread while holding callbackLock. Each request has a key and a request
+  # is dropped while another request with the same key is still in flight (Ex: SL order of a trade getting placed
+  # again by next tracking cycle before the first one got acknowledged). Queued requests are picked by their
+  # models.RequestPriority lane (exits before entries) and in submit order within a lane.
+  # With numWorkers = 0 requests are executed on the calling thread (used in replay to keep runs deterministic).
+  def __init__(self, numWorkers = 0, callbackLock = None):
+    self.numWorkers = numWorkers
+    self.callbackLock = callbackLock if callbackLock != None else threading.RLock()
+    self.inFlightKeys = set()
+    self.queue = [] # heap of (priority, sequence, key, request, callback, submittedAt)
+    self.sequence = 0
+    self.lock = threading.Lock()
+    self.condition = threading.Condition(self.lock)
+    self.running = True
+    self.queueWaitLatency = LatencyStats('queueWait') # from submit to start of execution on worker
+    self.requestLatency = LatencyStats('request') # execution of request by order manager
+    # counters
+    self.numSubmitted = 0
+    self.numDuplicates = 0
+    self.numFailed = 0
+    self.maxInFlight = 0
+    self.workers = []
+    for i in range(numWorkers):
+      worker = threading.Thread(target=self.runWorker, name='OrderGateway-' + str(i), daemon=True)
+      worker.start()
+      self.workers.append(worker)
+
+  def submit(self, key, request, callback = None, priority = RequestPriority.ENTRY):
+    # Returns False if the request is dropped as a request with the same key is in flight
+    submittedAt = time.perf_counter()
+    with self.lock:
+      if key in self.inFlightKeys:
+        self.numDuplicates += 1
+        return False
+      self.inFlightKeys.add(key)
+      self.numSubmitted += 1
+      if len(self.inFlightKeys) > self.maxInFlight:
+        self.maxInFlight = len(self.inFlightKeys)
+      if len(self.workers) > 0:
+        self.sequence += 1
+        heapq.heappush(self.queue, (priority, self.sequence, key, request, callback, submittedAt))
+        self.condition.notify()
+        return True
+    self.execute(key, request, callback, submittedAt)
+    return True
+
+  def runWorker(self):
+    while True:
+      with self.lock:
+        while self.running and len(self.queue) == 0:
+          self.condition.wait()
+        if len(self.queue) == 0:
+          return # stopped and nothing left to send
+        priority, sequence, key, request, callback, submittedAt = heapq.heappop(self.queue)
+      self.execute(key, request, callback, submittedAt)
+
+  def execute(self, key, request, callback, submittedAt):
+    self.queueWaitLatency.recordSince(submittedAt)
+    result = None
+    error = None
+    start = time.perf_counter()
+    try:
+      result = request()
+    except Exception as e:
+      error = e
+      with self.lock:
+        self.numFailed += 1
+    self.requestLatency.recordSince(start)
+    try:
+      if callback != None:
+        with self.callbackLock:
+          callback(result, error)
+    except Exception as e:
+      logging.exception('OrderGateway: Exception in callback of %s', key)
+    finally:
+      # Removed after the callback so that a repeated request can see the state updated by the callback
+      with self.lock:
+        self.inFlightKeys.discard(key)
+
+  def isInFlight(self, key):
+    with self.lock:
+      return key in self.inFlightKeys
+
+  def getNumInFlight(self):
+    with self.lock:
+      return len(self.inFlightKeys)
+
+  def stop(self):
+    # Waits for the queued and in flight requests to complete
+    with self.lock:
+      self.running = False
+      self.condition.notify_all()
+    for worker in self.workers:
+      worker.join()
+
+  def getStats(self):
+    with self.lock:
+      stats = {
+        'numWorkers': self.numWorkers,
+        'submitted': self.numSubmitted,
+        'duplicates': self.numDuplicates,
+        'failed': self.numFailed,
+        'inFlight': len(self.inFlightKeys),
+        'queued': len(self.queue),
+        'maxInFlight': self.maxInFlight
+      }
+    stats['queueWait'] = self.queueWaitLatency.getStats()
+    stats['request'] = self.requestLatency.getStats()
+    return stats
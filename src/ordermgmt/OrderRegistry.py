@@ -0,0 +1,43 @@
+import threading
+
+class OrderRegistry:
+  # orderId indexed registry of the orders placed by algo along with the trade each order belongs to
+  maxUnmatchedUpdates = 1000
+
+  def __init__(self):
+    self.orderIdToOrderMap = {}
+    self.orderIdToTradeMap = {}
+    # Order updates can arrive before the placeOrder() call returns the orderId, keep them till the order gets registered
+    self.unmatchedUpdates = {}
+    self.lock = threading.RLock()
+
+  def registerOrder(self, order, trade):
+    # Returns the order update received before registration if any
+    if order == None or order.orderId == None:
+      return None
+    with self.lock:
+      self.orderIdToOrderMap[order.orderId] = order
+      self.orderIdToTradeMap[order.orderId] = trade
+      return self.unmatchedUpdates.pop(order.orderId, None)
+
+  def addUnmatchedUpdate(self, orderUpdate):
+    with self.lock:
+      if len(self.unmatchedUpdates) >= OrderRegistry.maxUnmatchedUpdates:
+        # drop the oldest one
+        self.unmatchedUpdates.pop(next(iter(self.unmatchedUpdates)))
+      self.unmatchedUpdates[orderUpdate.orderId] = orderUpdate
+
+  def getOrder(self, orderId):
+    return self.orderIdToOrderMap.get(orderId)
+
+  def getTrade(self, orderId):
+    return self.orderIdToTradeMap.get(orderId)
+
+  def getOrdersMap(self):
+    return self.orderIdToOrderMap
+
+  def clear(self):
+    with self.lock:
+      self.orderIdToOrderMap = {}
+      self.orderIdToTradeMap = {}
+      self.unmatchedUpdates = {}
@@ -0,0 +1,20 @@
+
+class OrderUpdate:
+  # Broker independent order details received either from order update stream or order book
+  def __init__(self, orderId):
+    self.orderId = orderId
+    self.orderStatus = None # One of the status defined in models.OrderStatus. None means status not changed
+    self.qty = 0
+    self.filledQty = 0
+    self.pendingQty = 0
+    self.price = 0
+    self.triggerPrice = 0
+    self.averagePrice = 0
+    self.message = None
+    self.updateTimestamp = None # epoch seconds of the update at exchange/broker, None if not known
+
+  def __str__(self):
+    return "orderId=" + str(self.orderId) + ", orderStatus=" + str(self.orderStatus) \
+      + ", qty=" + str(self.qty) + ", filledQty=" + str(self.filledQty) \
+      + ", pendingQty=" + str(self.pendingQty) + ", price=" + str(self.price) \
+      + ", triggerPrice=" + str(self.triggerPrice) + ", averagePrice=" + str(self.averagePrice)
@@ -0,0 +1,182 @@
+import logging
+import threading
+import time
+
+from ordermgmt.BaseOrderManager import BaseOrderManager
+from ordermgmt.Order import Order
+from ordermgmt.OrderUpdate import OrderUpdate
+from models.OrderType import OrderType
+from models.OrderStatus import OrderStatus
+from models.Direction import Direction
+
+from utils.Utils import Utils
+from utils.Clock import Clock
+from utils.LatencyStats import LatencyStats
+
+class PaperOrderManager(BaseOrderManager):
+  # Paper trading order manager matching orders locally against live or replayed ticks instead of sending them to broker.
+  # Registered as raw ticks listener of the ticker, an open order is matched with the ticks of its symbol received
+  # latencyMillis after the order is placed:
+  #   MARKET orders fill at LTP with slippage, SL_MARKET orders trigger when LTP crosses trigger price and fill like MARKET,
+  #   LIMIT orders fill at limit price when touched, SL_LIMIT orders become LIMIT orders when triggered.
+  # Fills and cancellations are sent as ordermgmt.OrderUpdate through the given listener like broker order updates.
+  def __init__(self, orderUpdateListener, slippagePercentage = 0, latencyMillis = 0):
+    super().__init__("paper")
+    self.orderUpdateListener = orderUpdateListener
+    self.slippagePercentage = slippagePercentage # applied against the order direction on MARKET and SL_MARKET fills
+    self.latencyMillis = latencyMillis # orders are not matched with the ticks received before this delay
+    self.lastOrderNumber = 0
+    # Session prefix keeps order ids unique across restarts as orders of the earlier sessions are reloaded from trades file
+    self.orderIdPrefix = 'PAPER' + str(Utils.getEpoch()) + '-'
+    self.symbolToOpenOrdersMap = {} # symbol -> list of [order, direction, orderType, price, triggerPrice, matchAfterEpochMillis]
+    self.orderIdToOpenOrderMap = {}
+    self.pendingOrderUpdates = [] # updates to be sent with the next ticks as broker sends them asynchronously
+    self.symbolToTicksReceivedAtMap = {} # symbol -> time.perf_counter() when its last tick was received
+    self.lock = threading.Lock() # orders are placed from tick dispatcher/main threads and matched on ticker thread
+    self.tickToOrderLatency = LatencyStats('tickToOrder') # from receiving a tick to placing the order in reaction to it
+    self.numFills = 0
+
+  def placeOrder(self, orderInputParams):
+    with self.lock:
+      ticksReceivedAt = self.symbolToTicksReceivedAtMap.get(orderInputParams.tradingSymbol)
+      if ticksReceivedAt != None:
+        self.tickToOrderLatency.recordSince(ticksReceivedAt)
+      self.lastOrderNumber += 1
+      order = Order(orderInputParams)
+      order.orderId = self.orderIdPrefix + str(self.lastOrderNumber)
+      isSLOrder = orderInputParams.orderType == OrderType.SL_MARKET or orderInputParams.orderType == OrderType.SL_LIMIT
+      order.orderStatus = OrderStatus.TRIGGER_PENDING if isSLOrder else OrderStatus.OPEN
+      order.pendingQty = order.qty
+      order.orderPlaceTimestamp = Utils.getEpoch()
+      order.lastOrderUpdateTimestamp = order.orderPlaceTimestamp
+      matchAfterEpochMillis = PaperOrderManager.getEpochMillis() + self.latencyMillis
+      openOrder = [order, orderInputParams.direction, orderInputParams.orderType, orderInputParams.price,
+        orderInputParams.triggerPrice, matchAfterEpochMillis]
+      self.symbolToOpenOrdersMap.setdefault(order.tradingSymbol, []).append(openOrder)
+      self.orderIdToOpenOrderMap[order.orderId] = openOrder
+    logging.info('%s: Order placed %s', self.broker, order)
+    return order
+
+  def modifyOrder(self, order, orderModifyParams):
+    with self.lock:
+      openOrder = self.getOpenOrder(order)
+      if orderModifyParams.newPrice > 0:
+        openOrder[3] = orderModifyParams.newPrice
+      if orderModifyParams.newTriggerPrice > 0:
+        openOrder[4] = orderModifyParams.newTriggerPrice
+      if orderModifyParams.newOrderType != None:
+        openOrder[2] = orderModifyParams.newOrderType
+      if orderModifyParams.newQty > 0:
+        order.qty = orderModifyParams.newQty
+        order.pendingQty = order.qty
+      order.lastOrderUpdateTimestamp = Utils.getEpoch()
+    return order
+
+  def modifyOrderToMarket(self, order):
+    with self.lock:
+      openOrder = self.getOpenOrder(order)
+      openOrder[2] = OrderType.MARKET
+      order.lastOrderUpdateTimestamp = Utils.getEpoch()
+    return order
+
+  def cancelOrder(self, order):
+    with self.lock:
+      openOrder = self.getOpenOrder(order)
+      self.removeOpenOrder(openOrder)
+      order.lastOrderUpdateTimestamp = Utils.getEpoch()
+      self.pendingOrderUpdates.append(self.createOrderUpdate(order, OrderStatus.CANCELLED, 0, 0))
+    return order
+
+  def fetchAndUpdateAllOrderDetails(self, orders):
+    # All fills are already sent as order updates
+    return []
+
+  def getOpenOrder(self, order):
+    openOrder = self.orderIdToOpenOrderMap.get(order.orderId)
+    if openOrder == None:
+      raise Exception('Order ' + str(order.orderId) + ' is not open')
+    return openOrder
+
+  def removeOpenOrder(self, openOrder):
+    order = openOrder[0]
+    del self.orderIdToOpenOrderMap[order.orderId]
+    openOrders = self.symbolToOpenOrdersMap[order.tradingSymbol]
+    openOrders.remove(openOrder)
+    if len(openOrders) == 0:
+      del self.symbolToOpenOrdersMap[order.tradingSymbol]
+
+  def onTicks(self, ticks):
+    # Registered as raw ticks listener of the ticker
+    ticksReceivedAt = time.perf_counter()
+    orderUpdates = []
+    with self.lock:
+      if len(self.pendingOrderUpdates) > 0:
+        orderUpdates = self.pendingOrderUpdates
+        self.pendingOrderUpdates = []
+      symbolToTicksReceivedAtMap = self.symbolToTicksReceivedAtMap
+      symbolToOpenOrdersMap = self.symbolToOpenOrdersMap
+      nowEpochMillis = None
+      for tick in ticks:
+        symbolToTicksReceivedAtMap[tick.tradingSymbol] = ticksReceivedAt
+        openOrders = symbolToOpenOrdersMap.get(tick.tradingSymbol)
+        if openOrders == None:
+          continue
+        if nowEpochMillis == None:
+          nowEpochMillis = PaperOrderManager.getEpochMillis()
+        for openOrder in list(openOrders):
+          if nowEpochMillis < openOrder[5]:
+            continue
+          fillPrice = self.matchOrder(openOrder, tick.lastTradedPrice)
+          if fillPrice != None:
+            self.removeOpenOrder(openOrder)
+            self.numFills += 1
+            orderUpdates.append(self.createOrderUpdate(openOrder[0], OrderStatus.COMPLETE, openOrder[0].qty, fillPrice))
+    # Listener is called outside of the lock as it can place/cancel orders again
+    for orderUpdate in orderUpdates:
+      self.orderUpdateListener(orderUpdate)
+
+  def matchOrder(self, openOrder, ltp):
+    # Returns fill price if the order gets filled at the given LTP otherwise None
+    order, direction, orderType, price, triggerPrice, matchAfterEpochMillis = openOrder
+    isBuy = direction == Direction.LONG
+    if orderType == OrderType.SL_MARKET or orderType == OrderType.SL_LIMIT:
+      triggered = ltp >= triggerPrice if isBuy else ltp <= triggerPrice
+      if triggered == False:
+        return None
+      if orderType == OrderType.SL_LIMIT:
+        # Triggered SL_LIMIT order becomes a LIMIT order
+        openOrder[2] = orderType = OrderType.LIMIT
+    if orderType == OrderType.MARKET or orderType == OrderType.SL_MARKET:
+      slippage = ltp * self.slippagePercentage / 100
+      return Utils.roundToNSEPrice(ltp + slippage if isBuy else ltp - slippage)
+    if isBuy and ltp <= price:
+      return price
+    if isBuy == False and ltp >= price:
+      return price
+    return None
+
+  def createOrderUpdate(self, order, orderStatus, filledQty, averagePrice):
+    orderUpdate = OrderUpdate(order.orderId)
+    orderUpdate.orderStatus = orderStatus
+    orderUpdate.qty = order.qty
+    orderUpdate.filledQty = filledQty
+    orderUpdate.pendingQty = 0
+    orderUpdate.price = order.price
+    orderUpdate.triggerPrice = order.triggerPrice
+    orderUpdate.averagePrice = averagePrice
+    orderUpdate.updateTimestamp = Clock.now().timestamp() # time of the matched tick as exchange time
+    return orderUpdate
+
+  def getStats(self):
+    with self.lock:
+      numOpenOrders = len(self.orderIdToOpenOrderMap)
+    return {
+      'ordersPlaced': self.lastOrderNumber,
+      'fills': self.numFills,
+      'openOrders': numOpenOrders,
+      'tickToOrderLatency': self.tickToOrderLatency.getStats()
+    }
+
+  @staticmethod
+  def getEpochMillis():
+    return int(Clock.now().timestamp() * 1000)
@@ -1,24 +1,108 @@
 import logging
+import time
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from kiteconnect import KiteConnect
 
+from config.Config import getServerConfigValue
+from core.Controller import Controller
+from core.BrokerRateLimiter import BrokerRateLimiter
 from ordermgmt.BaseOrderManager import BaseOrderManager
 from ordermgmt.Order import Order
+from ordermgmt.OrderUpdate import OrderUpdate
 
 from models.ProductType import ProductType
 from models.OrderType import OrderType
 from models.Direction import Direction
-from models.OrderStatus import OrderStatus
+from models.RequestPriority import RequestPriority
 
 from utils.Utils import Utils
+from utils.LatencyStats import LatencyStats
 
 class ZerodhaOrderManager(BaseOrderManager):
+  # Long lived (one per app, see TradeManager.getOrderManager()) order manager with its own KiteConnect handle
+  # keeping a pool of keep-alive connections to broker REST API, so that order calls do not pay connection setup.
+  # Connections are opened before they are needed (prewarm) and kept warm when idle (keepWarm).
+  # Latency of each broker call is recorded per endpoint. Calls wait for core.BrokerRateLimiter before they are sent.
+  endpoints = ['placeOrder', 'modifyOrder', 'cancelOrder', 'orders', 'prewarm']
+  endpointToRateLimitClassMap = {'placeOrder': 'orders', 'modifyOrder': 'orders', 'cancelOrder': 'orders'} # others are 'default'
+
   def __init__(self):
     super().__init__("zerodha")
+    self.poolSize = getServerConfigValue('brokerHttpPool.poolSize', 4)
+    # keepWarm() is called every 30 seconds by TradeManager, so an idle connection gets one request every other cycle
+    self.keepWarmSeconds = getServerConfigValue('brokerHttpPool.keepWarmSeconds', 60)
+    brokerLogin = Controller.getBrokerLogin()
+    self.accessToken = None # access token the broker handle is using
+    if brokerLogin != None:
+      self.accessToken = brokerLogin.getAccessToken()
+      self.brokerHandle = KiteConnect(api_key=brokerLogin.getBrokerAppDetails().appKey,
+        access_token=self.accessToken,
+        timeout=getServerConfigValue('brokerHttpPool.timeoutSeconds', 7),
+        pool={'pool_connections': 1, 'pool_maxsize': self.poolSize, 'pool_block': False})
+    self.endpointToLatencyStatsMap = {}
+    for endpoint in ZerodhaOrderManager.endpoints:
+      self.endpointToLatencyStatsMap[endpoint] = LatencyStats(endpoint)
+    self.lastCallAt = 0 # time.monotonic() of last broker call
+
+  def callBroker(self, endpoint, priority, brokerFunction, **kwargs):
+    self.checkAccessToken()
+    BrokerRateLimiter.acquire(ZerodhaOrderManager.endpointToRateLimitClassMap.get(endpoint, 'default'), priority)
+    start = time.perf_counter()
+    try:
+      return brokerFunction(**kwargs)
+    finally:
+      self.endpointToLatencyStatsMap[endpoint].recordSince(start)
+      self.lastCallAt = time.monotonic()
+
+  def checkAccessToken(self):
+    # Broker handle outlives the login, so it is switched to the new access token after a re-login
+    # (core.Controller replaces the broker login). Connection pool of the handle is kept.
+    brokerLogin = Controller.getBrokerLogin()
+    accessToken = brokerLogin.getAccessToken() if brokerLogin != None else None
+    if accessToken == None or accessToken == self.accessToken:
+      return
+    self.brokerHandle.set_access_token(accessToken)
+    self.accessToken = accessToken
+    logging.info('%s: Switched broker handle to the access token of new login', self.broker)
+
+  def prewarm(self):
+    # Opens poolSize connections by sending as many light weight requests concurrently
+    start = time.perf_counter()
+    kite = self.brokerHandle
+    def sendRequest(i):
+      try:
+        self.callBroker('prewarm', RequestPriority.DATA, kite.profile)
+        return True
+      except Exception as e:
+        logging.error('%s: Prewarm request failed: %s', self.broker, str(e))
+        return False
+    with ThreadPoolExecutor(max_workers=self.poolSize) as executor:
+      numSucceeded = sum(1 for result in executor.map(sendRequest, range(self.poolSize)) if result)
+    logging.info('%s: Prewarmed %d/%d broker connections in %.3f seconds', self.broker, numSucceeded, self.poolSize, time.perf_counter() - start)
+
+  def keepWarm(self):
+    # Called periodically, connections idle for long get closed by the other end. A single light weight
+    # request keeps the most recently used connection open, which is the one the next request goes out on.
+    if time.monotonic() - self.lastCallAt < self.keepWarmSeconds:
+      return
+    try:
+      self.callBroker('prewarm', RequestPriority.DATA, self.brokerHandle.profile)
+    except Exception as e:
+      logging.error('%s: Keep warm request failed: %s', self.broker, str(e))
+
+  def getStats(self):
+    stats = {}
+    for endpoint, latencyStats in self.endpointToLatencyStatsMap.items():
+      stats[endpoint] = latencyStats.getStats()
+    return stats
 
   def placeOrder(self, orderInputParams):
     logging.info('%s: Going to place order with params %s', self.broker, orderInputParams)
     kite = self.brokerHandle
     try:
-      orderId = kite.place_order(
+      priority = RequestPriority.EXIT if orderInputParams.isExit == True else RequestPriority.ENTRY
+      orderId = self.callBroker('placeOrder', priority, kite.place_order,
         variety=kite.VARIETY_REGULAR,
         exchange=kite.EXCHANGE_NFO if orderInputParams.isFnO == True else kite.EXCHANGE_NSE,
         tradingsymbol=orderInputParams.tradingSymbol,
@@ -43,7 +127,7 @@ class ZerodhaOrderManager(BaseOrderManager):
     logging.info('%s: Going to modify order with params %s', self.broker, orderModifyParams)
     kite = self.brokerHandle
     try:
-      orderId = kite.modify_order(
+      orderId = self.callBroker('modifyOrder', RequestPriority.EXIT, kite.modify_order,
         variety=kite.VARIETY_REGULAR,
         order_id=order.orderId,
         quantity=orderModifyParams.newQty if orderModifyParams.newQty > 0 else None,
@@ -62,7 +146,7 @@ class ZerodhaOrderManager(BaseOrderManager):
     logging.info('%s: Going to modify order with params %s', self.broker)
     kite = self.brokerHandle
     try:
-      orderId = kite.modify_order(
+      orderId = self.callBroker('modifyOrder', RequestPriority.EXIT, kite.modify_order,
         variety=kite.VARIETY_REGULAR,
         order_id=order.orderId,
         order_type=kite.ORDER_TYPE_MARKET)
@@ -78,7 +162,7 @@ class ZerodhaOrderManager(BaseOrderManager):
     logging.info('%s Going to cancel order %s', self.broker, order.orderId)
     kite = self.brokerHandle
     try:
-      orderId = kite.cancel_order(
+      orderId = self.callBroker('cancelOrder', RequestPriority.EXIT, kite.cancel_order,
         variety=kite.VARIETY_REGULAR,
         order_id=order.orderId)
 
@@ -90,40 +174,60 @@ class ZerodhaOrderManager(BaseOrderManager):
       raise Exception(str(e))
 
   def fetchAndUpdateAllOrderDetails(self, orders):
+    # orders: orderId -> Order map of the orders to be reconciled with broker order book
+    # Returns the list of orders whose status, filled quantity or average price changed
     logging.info('%s Going to fetch order book', self.broker)
     kite = self.brokerHandle
     orderBook = None
     try:
-      orderBook = kite.orders()
+      orderBook = self.callBroker('orders', RequestPriority.DATA, kite.orders)
     except Exception as e:
       logging.error('%s Failed to fetch order book', self.broker)
-      return
+      return []
 
     logging.info('%s Order book length = %d', self.broker, len(orderBook))
-    numOrdersUpdated = 0
+    changedOrders = []
     for bOrder in orderBook:
-      foundOrder = None
-      for order in orders:
-        if order.orderId == bOrder['order_id']:
-          foundOrder = order
-          break
-      
-      if foundOrder != None:
-        logging.info('Found order for orderId %s', foundOrder.orderId)
-        foundOrder.qty = bOrder['quantity']
-        foundOrder.filledQty = bOrder['filled_quantity']
-        foundOrder.pendingQty = bOrder['pending_quantity']
-        foundOrder.orderStatus = bOrder['status']
-        if foundOrder.orderStatus == OrderStatus.CANCELLED and foundOrder.filledQty > 0:
-          # Consider this case as completed in our system as we cancel the order with pending qty when strategy stop timestamp reaches
-          foundOrder.orderStatus = OrderStatus.COMPLETED
-        foundOrder.price = bOrder['price']
-        foundOrder.triggerPrice = bOrder['trigger_price']
-        foundOrder.averagePrice = bOrder['average_price']
-        logging.info('%s Updated order %s', self.broker, foundOrder)
-        numOrdersUpdated += 1
-
-    logging.info('%s: %d orders updated with broker order details', self.broker, numOrdersUpdated)
+      foundOrder = orders.get(bOrder['order_id'])
+      if foundOrder == None:
+        continue
+      if foundOrder.applyUpdate(ZerodhaOrderManager.convertToOrderUpdate(bOrder)) == True:
+        logging.debug('%s Updated order %s', self.broker, foundOrder)
+        changedOrders.append(foundOrder)
+
+    logging.info('%s: %d orders changed after reconciling with broker order book', self.broker, len(changedOrders))
+    return changedOrders
+
+  @staticmethod
+  def convertToOrderUpdate(bOrder):
+    # Converts zerodha order (order book entry or order update postback) to our system OrderUpdate
+    orderUpdate = OrderUpdate(bOrder['order_id'])
+    # Zerodha sends status UPDATE for modifications and partial fills, order status remains as it is in that case
+    orderUpdate.orderStatus = bOrder['status'] if bOrder['status'] != 'UPDATE' else None
+    orderUpdate.qty = bOrder['quantity']
+    orderUpdate.filledQty = bOrder['filled_quantity']
+    orderUpdate.pendingQty = bOrder['pending_quantity']
+    orderUpdate.price = bOrder['price']
+    orderUpdate.triggerPrice = bOrder['trigger_price']
+    orderUpdate.averagePrice = bOrder['average_price']
+    orderUpdate.message = bOrder.get('status_message')
+    orderUpdate.updateTimestamp = ZerodhaOrderManager.getUpdateTimestamp(bOrder)
+    return orderUpdate
+
+  @staticmethod
+  def getUpdateTimestamp(bOrder):
+    # Exchange time of the last update of the order, order book has datetimes and order update postbacks have strings
+    for key in ['exchange_update_timestamp', 'exchange_timestamp', 'order_timestamp']:
+      value = bOrder.get(key)
+      if value == None or value == '':
+        continue
+      try:
+        if isinstance(value, str):
+          value = datetime.strptime(value, '%Y-%m-%d %H:%M:%S')
+        return datetime.timestamp(value)
+      except Exception as e:
+        logging.debug('ZerodhaOrderManager: Could not parse %s %s', key, value)
+    return None
 
   def convertToBrokerProductType(self, productType):
     kite = self.brokerHandle
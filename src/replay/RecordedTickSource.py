@@ -0,0 +1,70 @@
+import heapq
+from datetime import datetime
+
+from models.TickData import TickData
+from ticker.TickRecorder import TickRecorder
+
+class RecordedTickSource:
+  # Ticks of a session recorded by ticker.TickRecorder. Ticks of all symbols are merged in time order
+  # and the ticks recorded at the same timestamp are replayed together as one batch like they were received.
+  # Recorded files stay mapped till close().
+  def __init__(self, ticksDir, symbols = None):
+    self.ticksDir = ticksDir
+    self.symbols = symbols if symbols != None else TickRecorder.getRecordedSymbols(ticksDir)
+    self.symbolToTickRangeMap = {}
+    self.symbolToColumnsMap = {}
+    for symbol in self.symbols:
+      tickRange = TickRecorder.readRange(ticksDir, symbol)
+      self.symbolToTickRangeMap[symbol] = tickRange
+      self.symbolToColumnsMap[symbol] = tickRange.columns
+
+  def close(self):
+    self.symbolToColumnsMap = {}
+    for tickRange in self.symbolToTickRangeMap.values():
+      tickRange.close()
+    self.symbolToTickRangeMap = {}
+
+  def getInstruments(self):
+    # Only symbol and token are known from recorded ticks
+    instruments = []
+    for symbol in self.symbols:
+      tokens = self.symbolToColumnsMap[symbol]['token']
+      instruments.append({
+        'instrument_token': tokens[0] if len(tokens) > 0 else 0,
+        'tradingsymbol': symbol,
+        'lot_size': 1
+      })
+    return instruments
+
+  def iterateSymbol(self, symbol):
+    timestamps = self.symbolToColumnsMap[symbol]['timestamp']
+    for row in range(len(timestamps)):
+      yield (timestamps[row], symbol, row)
+
+  def createTick(self, symbol, row):
+    columns = self.symbolToColumnsMap[symbol]
+    tick = TickData(symbol)
+    tick.lastTradedPrice = columns['lastTradedPrice'][row]
+    tick.volume = columns['volume'][row]
+    tick.totalBuyQuantity = columns['totalBuyQuantity'][row]
+    tick.totalSellQuantity = columns['totalSellQuantity'][row]
+    tick.open = columns['open'][row]
+    tick.high = columns['high'][row]
+    tick.low = columns['low'][row]
+    tick.close = columns['close'][row]
+    if tick.close != 0:
+      tick.change = (tick.lastTradedPrice - tick.close) * 100 / tick.close
+    return tick
+
+  def getBatches(self):
+    # Yields (datetime, ticks) in recorded time order
+    batchTimestamp = None
+    ticks = []
+    for (timestamp, symbol, row) in heapq.merge(*[self.iterateSymbol(symbol) for symbol in self.symbols]):
+      if timestamp != batchTimestamp and len(ticks) > 0:
+        yield (datetime.fromtimestamp(batchTimestamp / 1000), ticks)
+        ticks = []
+      batchTimestamp = timestamp
+      ticks.append(self.createTick(symbol, row))
+    if len(ticks) > 0:
+      yield (datetime.fromtimestamp(batchTimestamp / 1000), ticks)
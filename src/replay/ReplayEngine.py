@@ -0,0 +1,235 @@
+import logging
+import argparse
+import importlib
+import json
+import time
+from datetime import datetime, timedelta
+
+from core.Quotes import Quotes
+from instruments.Instruments import Instruments
+from models.Quote import Quote
+from ordermgmt.PaperOrderManager import PaperOrderManager
+from ordermgmt.OrderGateway import OrderGateway
+from replay.ReplayTicker import ReplayTicker
+from replay.SyntheticTickSource import SyntheticTickSource
+from replay.RecordedTickSource import RecordedTickSource
+from trademgmt.TradeManager import TradeManager
+from trademgmt.TradeState import TradeState
+from strategies.BaseStrategy import BaseStrategy
+from utils.Utils import Utils
+from utils.Clock import Clock
+from utils.SimulatedClock import SimulatedClock
+from utils.LatencyStats import LatencyStats
+from utils.DeadlineScheduler import DeadlineScheduler
+
+# Replays a session of recorded or synthetic ticks through the real ticker -> TradeManager -> strategy path
+# under a simulated clock and ordermgmt.PaperOrderManager, as fast as the CPU allows.
+# Strategies are processed and trades are tracked every 30 seconds of simulated time like in live run.
+# Run from src directory:
+#   python -m replay.ReplayEngine --date 2021-08-26 --strategies ShortStraddleBNF,BNFORB30Min
+#   python -m replay.ReplayEngine --date 2021-08-26 --strategies ShortStraddleBNF --ticksDir <deployDir>/ticks/2021-08-26 --instrumentsFile <deployDir>/instruments.json
+
+class ReplayEngine:
+  def __init__(self, sessionDate, intervalSeconds = 30, slippagePercentage = 0, latencyMillis = 0):
+    # Clock is set first as strategies and tick sources derive timestamps and symbols from today's date
+    self.clock = SimulatedClock(Utils.getMarketStartTime(sessionDate))
+    Clock.setSource(self.clock)
+    self.intervalSeconds = intervalSeconds
+    self.slippagePercentage = slippagePercentage
+    self.latencyMillis = latencyMillis
+    self.ticker = None
+    self.orderManager = None
+    self.strategies = []
+    self.symbolToLastTickMap = {}
+    self.numTicks = 0
+    self.numCycles = 0
+    self.elapsedSeconds = 0
+
+  def setInstruments(self, instrumentsList):
+    Instruments.setInstruments(instrumentsList)
+
+  def resetTradeManager(self):
+    TradeManager.trades = []
+    TradeManager.tradeBook.clear()
+    TradeManager.triggerBook.clear()
+    TradeManager.orderRegistry.clear()
+    TradeManager.strategyToInstanceMap = {}
+    TradeManager.registeredSymbols = set()
+    TradeManager.pendingTickListeners = []
+    TradeManager.dirtyTrades = {}
+    TradeManager.baskets = {}
+    TradeManager.basketFillSkew = LatencyStats('basketFillSkew')
+    TradeManager.deadlineScheduler = DeadlineScheduler()
+    TradeManager.pendingSquareOffs = []
+    TradeManager.squareOffReports = []
+    self.ticker = ReplayTicker()
+    self.orderManager = PaperOrderManager(self.ticker.onOrderUpdate, self.slippagePercentage, self.latencyMillis)
+    TradeManager.ticker = self.ticker
+    TradeManager.orderManager = self.orderManager
+    # Order requests are executed right away so that a replay gives the same result every time
+    TradeManager.orderGateway = OrderGateway(0, TradeManager.tradesLock)
+    # Orders are matched with ticks before they are dispatched to trade manager, same as broker would do
+    self.ticker.registerRawTicksListener(self.orderManager.onTicks)
+    self.ticker.registerListener(TradeManager.tickerListener)
+    self.ticker.registerOrderUpdateListener(TradeManager.orderUpdateListener)
+    self.ticker.startTicker()
+    Quotes.quoteProvider = self.getQuote
+
+  def loadStrategy(self, strategyName):
+    strategyModule = importlib.import_module('strategies.' + strategyName)
+    strategy = getattr(strategyModule, strategyName).getInstance()
+    if len(strategy.symbols) > 0 and type(strategy).onTick != BaseStrategy.onTick:
+      strategy.subscribeTicks(strategy.symbols)
+    return strategy
+
+  def getQuote(self, tradingSymbol, isFnO = False):
+    tick = self.symbolToLastTickMap.get(tradingSymbol)
+    if tick == None:
+      return None
+    quote = Quote(tradingSymbol)
+    quote.lastTradedPrice = tick.lastTradedPrice
+    quote.lastTradedQuantity = tick.lastTradedQuantity
+    quote.avgTradedPrice = tick.avgTradedPrice
+    quote.volume = tick.volume
+    quote.totalBuyQuantity = tick.totalBuyQuantity
+    quote.totalSellQuantity = tick.totalSellQuantity
+    quote.open = tick.open
+    quote.high = tick.high
+    quote.low = tick.low
+    quote.close = tick.close
+    quote.change = tick.change
+    return quote
+
+  def runCycle(self):
+    # Same as one iteration of BaseStrategy.run() and TradeManager.run() loops
+    self.numCycles += 1
+    for strategy in self.strategies:
+      if strategy.isEnabled() == False or Clock.now() < strategy.startTimestamp:
+        continue
+      try:
+        strategy.process()
+      except Exception as e:
+        logging.exception('ReplayEngine: Exception in %s process()', strategy.getName())
+    try:
+      with TradeManager.tradesLock:
+        TradeManager.trackAndUpdateAllTrades()
+    except Exception as e:
+      logging.exception('ReplayEngine: Exception while tracking trades')
+
+  def runDeadlines(self, untilTime):
+    # Fires the deadlines up to the given time, each one at its own time
+    untilEpoch = datetime.timestamp(untilTime)
+    nextDeadline = TradeManager.deadlineScheduler.getNextDeadline()
+    while nextDeadline != None and nextDeadline <= untilEpoch:
+      self.clock.setTime(datetime.fromtimestamp(nextDeadline))
+      TradeManager.deadlineScheduler.runDue(nextDeadline)
+      nextDeadline = TradeManager.deadlineScheduler.getNextDeadline()
+
+  def run(self, tickSource, strategyNames):
+    if Instruments.isLoaded() == False:
+      self.setInstruments(tickSource.getInstruments())
+    self.resetTradeManager()
+    self.strategies = []
+    for strategyName in strategyNames:
+      strategy = self.loadStrategy(strategyName)
+      if strategy.canTradeToday() == False:
+        logging.warn('ReplayEngine: %s cannot be traded on %s', strategy.getName(), Utils.getTodayDateStr())
+        continue
+      self.strategies.append(strategy)
+
+    marketEndTime = Utils.getMarketEndTime()
+    nextCycleTime = Clock.now()
+    symbolToLastTickMap = self.symbolToLastTickMap
+    start = time.perf_counter()
+    for (batchTime, ticks) in tickSource.getBatches():
+      while batchTime >= nextCycleTime and nextCycleTime <= marketEndTime:
+        self.runDeadlines(nextCycleTime)
+        self.clock.setTime(nextCycleTime)
+        self.runCycle()
+        nextCycleTime = nextCycleTime + timedelta(seconds=self.intervalSeconds)
+      self.runDeadlines(batchTime)
+      self.clock.setTime(batchTime)
+      for tick in ticks:
+        symbolToLastTickMap[tick.tradingSymbol] = tick
+      self.ticker.onNewTicks(ticks)
+      self.numTicks += len(ticks)
+    # Last cycle at market close
+    self.runDeadlines(marketEndTime)
+    self.clock.setTime(marketEndTime)
+    self.runCycle()
+    self.elapsedSeconds = time.perf_counter() - start
+    return self.getReport()
+
+  def getReport(self):
+    report = {
+      'date': Utils.getTodayDateStr(),
+      'ticks': self.numTicks,
+      'cycles': self.numCycles,
+      'seconds': round(self.elapsedSeconds, 3),
+      'ticksPerSecond': int(self.numTicks / self.elapsedSeconds) if self.elapsedSeconds > 0 else 0,
+      'orders': self.orderManager.getStats(),
+      'basketFillSkew': TradeManager.basketFillSkew.getStats(),
+      'squareOffs': TradeManager.squareOffReports,
+      'pnl': 0,
+      'strategies': {},
+      'trades': []
+    }
+    for trade in TradeManager.trades:
+      if trade.tradeState == TradeState.CREATED or trade.tradeState == TradeState.DISABLED:
+        continue
+      report['trades'].append({
+        'strategy': trade.strategy,
+        'symbol': trade.tradingSymbol,
+        'direction': trade.direction,
+        'qty': trade.filledQty,
+        'entry': trade.entry,
+        'exit': trade.exit,
+        'state': trade.tradeState,
+        'exitReason': trade.exitReason,
+        'pnl': trade.pnl
+      })
+      report['strategies'][trade.strategy] = Utils.roundOff(report['strategies'].get(trade.strategy, 0) + trade.pnl)
+      report['pnl'] = Utils.roundOff(report['pnl'] + trade.pnl)
+    return report
+
+def main():
+  parser = argparse.ArgumentParser(description='Replay a session of ticks through TradeManager and strategies')
+  parser.add_argument('--date', required=True, help='Session date in YYYY-MM-DD format')
+  parser.add_argument('--strategies', required=True, help='Comma separated strategy class names Ex: ShortStraddleBNF,BNFORB30Min')
+  parser.add_argument('--ticksDir', help='Directory of ticks recorded by TickRecorder. Synthetic ticks are generated if not given')
+  parser.add_argument('--instrumentsFile', help='Instruments json file. Instruments of the tick source are used if not given')
+  parser.add_argument('--seed', type=int, default=1, help='Seed of synthetic ticks')
+  parser.add_argument('--numStrikes', type=int, default=5, help='Number of strikes on each side of ATM for synthetic ticks')
+  parser.add_argument('--slippage', type=float, default=0, help='Slippage percentage on market order fills')
+  parser.add_argument('--latencyMillis', type=int, default=0, help='Delay after which placed orders get matched with ticks')
+  parser.add_argument('--verbose', action='store_true', help='Log at INFO level')
+  args = parser.parse_args()
+
+  logging.basicConfig(format='%(asctime)s %(message)s', level=logging.INFO if args.verbose else logging.WARNING)
+
+  engine = ReplayEngine(datetime.strptime(args.date, Utils.dateFormat), slippagePercentage=args.slippage, latencyMillis=args.latencyMillis)
+  if args.instrumentsFile != None:
+    with open(args.instrumentsFile, 'r') as isdFile:
+      engine.setInstruments(json.load(isdFile))
+  if args.ticksDir != None:
+    tickSource = RecordedTickSource(args.ticksDir)
+  else:
+    tickSource = SyntheticTickSource(numStrikes=args.numStrikes, seed=args.seed)
+  report = engine.run(tickSource, args.strategies.split(','))
+  if args.ticksDir != None:
+    tickSource.close()
+
+  for tr in report['trades']:
+    print('%-16s %-24s %-5s qty=%-5d entry=%-10.2f exit=%-10.2f %-10s %-18s pnl=%.2f' % (tr['strategy'], tr['symbol'],
+      tr['direction'], tr['qty'], tr['entry'], tr['exit'], tr['state'], tr['exitReason'], tr['pnl']))
+  for strategy, pnl in report['strategies'].items():
+    print('%s pnl = %.2f' % (strategy, pnl))
+  print('Total pnl = %.2f' % report['pnl'])
+  print('Orders: %s' % report['orders'])
+  print('Basket fill skew: %s' % report['basketFillSkew'])
+  for squareOff in report['squareOffs']:
+    print('%s flattened %d trades in %.3f seconds' % (squareOff['name'], squareOff['numTrades'], squareOff['seconds']))
+  print('Replayed %d ticks of %s in %.3f seconds, %d ticks/sec' % (report['ticks'], report['date'], report['seconds'], report['ticksPerSecond']))
+
+if __name__ == '__main__':
+  main()
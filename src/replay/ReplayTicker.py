@@ -0,0 +1,32 @@
+import logging
+
+from ticker.BaseTicker import BaseTicker
+from instruments.Instruments import Instruments
+from instruments.InstrumentRegistry import InstrumentRegistry
+
+class ReplayTicker(BaseTicker):
+  # Ticker without broker connection. Ticks are pushed by replay engine through onNewTicks()
+  # and order updates from the simulated order manager through onOrderUpdate().
+  def __init__(self):
+    super().__init__("replay")
+
+  def startTicker(self):
+    logging.info('ReplayTicker: started')
+
+  def stopTicker(self):
+    logging.info('ReplayTicker: stopping..')
+    self.stopTickDispatcher()
+
+  def registerSymbols(self, symbols):
+    # All replayed symbols are delivered anyway, only make sure they have instrument ids
+    for symbol in symbols:
+      instrumentToken = None
+      if Instruments.isLoaded():
+        try:
+          instrumentToken = Instruments.getInstrumentDataBySymbol(symbol)['instrument_token']
+        except KeyError:
+          pass
+      InstrumentRegistry.register(symbol, instrumentToken)
+
+  def unregisterSymbols(self, symbols):
+    pass
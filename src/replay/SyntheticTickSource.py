@@ -0,0 +1,139 @@
+import math
+import random
+from datetime import timedelta
+
+from models.TickData import TickData
+from utils.Utils import Utils
+
+class SyntheticTickSource:
+  # Generates a full session of ticks for index futures and their weekly options around the money.
+  # Future price is a random walk and option prices are Black-Scholes prices on it, so that option premiums
+  # decay through the day and move with the future like the real ones. Same seed gives the same session.
+  # Symbols are derived from the current (simulated) date, so the clock has to be set before creating this.
+  defaultUnderlyings = [
+    # (underlying, start price, strike gap, lot size)
+    ('BANKNIFTY', 36000, 100, 25),
+    ('NIFTY', 17000, 50, 50)
+  ]
+
+  def __init__(self, underlyings = None, numStrikes = 5, tickIntervalSeconds = 1, volatility = 0.15, seed = 1):
+    self.underlyings = underlyings if underlyings != None else SyntheticTickSource.defaultUnderlyings
+    self.numStrikes = numStrikes # strikes on each side of the starting ATM strike
+    self.tickIntervalSeconds = tickIntervalSeconds
+    self.volatility = volatility # annualized, used for both future random walk and option prices
+    self.seed = seed
+    self.instruments = [] # instruments in the format of broker instruments list
+    self.futures = [] # [symbol, price, lot size]
+    self.options = [] # [symbol, future index, strike, isCall, expiry datetime]
+    self.buildInstruments()
+
+  def buildInstruments(self):
+    token = 100000
+    for (underlying, startPrice, strikeGap, lotSize) in self.underlyings:
+      futureSymbol = Utils.prepareMonthlyExpiryFuturesSymbol(underlying)
+      # Same expiry as Utils.prepareMonthlyExpiryFuturesSymbol()
+      futureExpiry = Utils.getMonthlyExpiryDayDate()
+      if Utils.getMarketStartTime() > Utils.getMarketEndTime(futureExpiry):
+        futureExpiry = Utils.getMonthlyExpiryDayDate(Utils.getMarketStartTime() + timedelta(days=20))
+      token += 1
+      self.instruments.append(self.createInstrument(token, futureSymbol, underlying, 'FUT', futureExpiry, 0, lotSize))
+      self.futures.append([futureSymbol, startPrice, lotSize])
+      futureIndex = len(self.futures) - 1
+      # Same expiry as Utils.prepareWeeklyOptionsSymbol()
+      expiry = Utils.getWeeklyExpiryDayDate()
+      if Utils.getMarketStartTime() > Utils.getMarketEndTime(expiry):
+        expiry = Utils.getWeeklyExpiryDayDate(expiry + timedelta(days=6))
+      expiry = Utils.getMarketEndTime(expiry)
+      ATMStrike = Utils.getNearestStrikePrice(startPrice, strikeGap)
+      for i in range(-self.numStrikes, self.numStrikes + 1):
+        strike = ATMStrike + i * strikeGap
+        for optionType in ['CE', 'PE']:
+          optionSymbol = Utils.prepareWeeklyOptionsSymbol(underlying, strike, optionType)
+          token += 1
+          self.instruments.append(self.createInstrument(token, optionSymbol, underlying, optionType, expiry, strike, lotSize))
+          self.options.append([optionSymbol, futureIndex, strike, optionType == 'CE', expiry])
+
+  def createInstrument(self, token, tradingSymbol, underlying, instrumentType, expiry, strike, lotSize):
+    return {
+      'instrument_token': token * 256 + 2, # NFO segment
+      'exchange_token': token,
+      'tradingsymbol': tradingSymbol,
+      'name': underlying,
+      'last_price': 0,
+      'expiry': expiry.date(),
+      'strike': strike,
+      'tick_size': 0.05,
+      'lot_size': lotSize,
+      'instrument_type': instrumentType,
+      'segment': 'NFO-FUT' if instrumentType == 'FUT' else 'NFO-OPT',
+      'exchange': 'NFO'
+    }
+
+  def getInstruments(self):
+    return self.instruments
+
+  def getOptionPrice(self, futurePrice, strike, isCall, yearsToExpiry):
+    # Black-Scholes (Black-76) price with zero interest rate
+    if yearsToExpiry <= 0:
+      return max(futurePrice - strike, 0) if isCall else max(strike - futurePrice, 0)
+    sigmaT = self.volatility * math.sqrt(yearsToExpiry)
+    d1 = (math.log(futurePrice / strike) + 0.5 * sigmaT * sigmaT) / sigmaT
+    d2 = d1 - sigmaT
+    if isCall:
+      price = futurePrice * SyntheticTickSource.normalCDF(d1) - strike * SyntheticTickSource.normalCDF(d2)
+    else:
+      price = strike * SyntheticTickSource.normalCDF(-d2) - futurePrice * SyntheticTickSource.normalCDF(-d1)
+    return max(Utils.roundToNSEPrice(price), 0.05)
+
+  @staticmethod
+  def normalCDF(x):
+    return 0.5 * (1 + math.erf(x / math.sqrt(2)))
+
+  def getBatches(self):
+    # Yields (datetime, ticks) for every tick interval from market open to market close
+    rand = random.Random(self.seed)
+    marketStartTime = Utils.getMarketStartTime()
+    marketEndTime = Utils.getMarketEndTime()
+    numSteps = int((marketEndTime - marketStartTime).total_seconds() / self.tickIntervalSeconds)
+    secondsPerYear = 365 * 24 * 60 * 60
+    stepVolatility = self.volatility * math.sqrt(self.tickIntervalSeconds / secondsPerYear)
+    symbols = [f[0] for f in self.futures] + [o[0] for o in self.options]
+    ohlcv = {}
+    for symbol in symbols:
+      ohlcv[symbol] = [0, 0, 0, 0, 0] # open, high, low, close, volume
+    prices = [f[1] for f in self.futures]
+    for step in range(numSteps + 1):
+      now = marketStartTime + timedelta(seconds=step * self.tickIntervalSeconds)
+      ticks = []
+      for i in range(len(self.futures)):
+        if step > 0:
+          prices[i] = prices[i] * math.exp(stepVolatility * rand.gauss(0, 1))
+        ticks.append(self.createTick(self.futures[i][0], Utils.roundToNSEPrice(prices[i]), ohlcv, rand))
+      for (optionSymbol, futureIndex, strike, isCall, expiry) in self.options:
+        yearsToExpiry = (expiry - now).total_seconds() / secondsPerYear
+        ticks.append(self.createTick(optionSymbol, self.getOptionPrice(prices[futureIndex], strike, isCall, yearsToExpiry), ohlcv, rand))
+      yield (now, ticks)
+
+  def createTick(self, tradingSymbol, price, ohlcv, rand):
+    values = ohlcv[tradingSymbol]
+    if values[0] == 0:
+      # previous day close slightly away from the open
+      values[0] = values[1] = values[2] = price
+      values[3] = Utils.roundToNSEPrice(price * (1 + rand.uniform(-0.005, 0.005)))
+    values[1] = max(values[1], price)
+    values[2] = min(values[2], price)
+    lastTradedQuantity = rand.randint(1, 20) * 25
+    values[4] += lastTradedQuantity
+    tick = TickData(tradingSymbol)
+    tick.lastTradedPrice = price
+    tick.lastTradedQuantity = lastTradedQuantity
+    tick.avgTradedPrice = price
+    tick.volume = values[4]
+    tick.totalBuyQuantity = rand.randint(1000, 100000)
+    tick.totalSellQuantity = rand.randint(1000, 100000)
+    tick.open = values[0]
+    tick.high = values[1]
+    tick.low = values[2]
+    tick.close = values[3]
+    tick.change = (price - values[3]) * 100 / values[3]
+    return tick
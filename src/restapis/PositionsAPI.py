@@ -2,10 +2,13 @@ from flask.views import MethodView
 import json
 import logging
 from core.Controller import Controller
+from core.BrokerRateLimiter import BrokerRateLimiter
+from models.RequestPriority import RequestPriority
 
 class PositionsAPI(MethodView):
   def get(self):
     brokerHandle = Controller.getBrokerLogin().getBrokerHandle()
+    BrokerRateLimiter.acquire('default', RequestPriority.DATA)
     positions = brokerHandle.positions()
     logging.info('User positions => %s', positions)
     return json.dumps(positions)
@@ -1,11 +1,12 @@
 import logging
-from datetime import datetime
 
 from instruments.Instruments import Instruments
+from instruments.OptionLadder import OptionLadder
 from models.Direction import Direction
 from models.ProductType import ProductType
 from strategies.BaseStrategy import BaseStrategy
 from utils.Utils import Utils
+from utils.Clock import Clock
 from trademgmt.Trade import Trade
 from trademgmt.TradeManager import TradeManager
 
@@ -41,7 +42,7 @@ class BNFORB30Min(BaseStrategy):
     self.capitalPerSet = 100000 # Applicable if isFnO is True (1 set means 1CE/1PE or 2CE/2PE etc based on your strategy logic)
 
   def process(self):
-    now = datetime.now()
+    now = Clock.now()
     processEndTime = Utils.getTimeOfToDay(9, 50, 0)
     if now < self.startTimestamp:
       return
@@ -53,7 +54,11 @@ class BNFORB30Min(BaseStrategy):
     if len(self.trades) >= 2:
       return
 
-    symbol = Utils.prepareMonthlyExpiryFuturesSymbol('BANKNIFTY')
+    ladder = OptionLadder.getLadder('BANKNIFTY')
+    if ladder == None:
+      logging.error('%s: Could not get option ladder of BANKNIFTY', self.getName())
+      return
+    symbol = ladder.futureSymbol
     quote = self.getQuote(symbol)
     if quote == None:
         logging.error('%s: Could not get quote for %s', self.getName(), symbol)
@@ -103,3 +108,6 @@ class BNFORB30Min(BaseStrategy):
     elif trade.direction == Direction.SHORT and tick.lastTradedPrice < trade.requestedEntry:
       return True
     return False
+
+  def getTradeTrigger(self, trade):
+    return self.getBreakoutTrigger(trade)
@@ -1,12 +1,13 @@
 import logging
-import time
-from datetime import datetime
 
 from models.ProductType import ProductType
+from models.Direction import Direction
 from core.Quotes import Quotes
 from trademgmt.TradeManager import TradeManager
+from trademgmt.TriggerSide import TriggerSide
 
 from utils.Utils import Utils
+from utils.Clock import Clock
 
 class BaseStrategy:
   def __init__(self, name):
@@ -69,7 +70,7 @@ class BaseStrategy:
       logging.warn("%s: Not going to run strategy as market is closed.", self.getName())
       return
 
-    now = datetime.now()
+    now = Clock.now()
     if now < Utils.getMarketStartTime():
       Utils.waitTillMarketOpens(self.getName())
 
@@ -81,7 +82,14 @@ class BaseStrategy:
       waitSeconds = Utils.getEpoch(self.startTimestamp) - Utils.getEpoch(now)
       logging.info("%s: Waiting for %d seconds till startegy start timestamp reaches...", self.getName(), waitSeconds)
       if waitSeconds > 0:
-        time.sleep(waitSeconds)      
+        Clock.sleep(waitSeconds)
+
+    # No new trades after stopTimestamp and square off at squareOffTimestamp happen at those times
+    TradeManager.scheduleStrategyDeadlines(self)
+
+    # Strategies interested in ticks get only the ticks of their symbols in onTick()
+    if len(self.symbols) > 0 and type(self).onTick != BaseStrategy.onTick:
+      self.subscribeTicks(self.symbols)
 
     # Run in an loop and keep processing
     while True:
@@ -93,9 +101,9 @@ class BaseStrategy:
       self.process()
 
       # Sleep and wake up on every 30th second
-      now = datetime.now()
+      now = Clock.now()
       waitSeconds = 30 - (now.second % 30) 
-      time.sleep(waitSeconds)
+      Clock.sleep(waitSeconds)
 
   def shouldPlaceTrade(self, trade, tick):
     # Each strategy should call this function from its own shouldPlaceTrade() method before working on its own logic
@@ -105,7 +113,7 @@ class BaseStrategy:
       TradeManager.disableTrade(trade, 'InvalidQuantity')
       return False
 
-    now = datetime.now()
+    now = Clock.now()
     if now > self.stopTimestamp:
       TradeManager.disableTrade(trade, 'NoNewTradesCutOffTimeReached')
       return False
@@ -117,6 +125,27 @@ class BaseStrategy:
 
     return True
 
+  def onTick(self, tick):
+    # Optional: Override in derived class to receive ticks of the symbols subscribed via subscribeTicks().
+    # self.symbols are subscribed automatically when this is overridden.
+    pass
+
+  def subscribeTicks(self, symbols):
+    TradeManager.registerTickListener(self.onTick, symbols)
+
+  def getTradeTrigger(self, trade):
+    # Optional: Return (triggerPrice, TriggerSide) if the trade has to be triggered when the price crosses a level.
+    # Such trades are kept in TradeManager trigger book and shouldPlaceTrade() is called only when the level is crossed.
+    # Return None to have shouldPlaceTrade() called on every tick of the trade symbol.
+    return None
+
+  def getBreakoutTrigger(self, trade):
+    # Trigger of breakout trades: LONG above requested entry and SHORT below requested entry.
+    # Trigger book fires on the tick crossing the level, shouldPlaceTrade() is not called again till it is crossed again.
+    if trade.direction == Direction.LONG:
+      return (trade.requestedEntry, TriggerSide.ABOVE)
+    return (trade.requestedEntry, TriggerSide.BELOW)
+
   def addTradeToList(self, trade):
     if trade != None:
       self.trades.append(trade)
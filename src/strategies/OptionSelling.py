@@ -1,12 +1,14 @@
 import logging
-from datetime import datetime
 
 from instruments.Instruments import Instruments
+from instruments.OptionLadder import OptionLadder
 from models.Direction import Direction
 from models.ProductType import ProductType
 from strategies.BaseStrategy import BaseStrategy
 from utils.Utils import Utils
+from utils.Clock import Clock
 from trademgmt.Trade import Trade
+from trademgmt.TradeBasket import TradeBasket
 from trademgmt.TradeManager import TradeManager
 
 # Each strategy has to be derived from BaseStrategy
@@ -51,24 +53,38 @@ class OptionSelling(BaseStrategy):
     return False
 
   def process(self):
-    now = datetime.now()
+    now = Clock.now()
     if now < self.startTimestamp:
       return
     if len(self.trades) >= self.maxTradesPerDay:
       return
 
     # Get current market price of Nifty Future
-    futureSymbol = Utils.prepareMonthlyExpiryFuturesSymbol('NIFTY')
+    ladder = OptionLadder.getLadder('NIFTY')
+    if ladder == None:
+      logging.error('%s: Could not get option ladder of NIFTY', self.getName())
+      return
+    futureSymbol = ladder.futureSymbol
     quote = self.getQuote(futureSymbol)
     if quote == None:
       logging.error('%s: Could not get quote for %s', self.getName(), futureSymbol)
       return
 
-    ATMStrike = Utils.getNearestStrikePrice(quote.lastTradedPrice, 50)
+    optionChain = ladder.getOptionChain(ladder.weeklyExpiry)
+    if optionChain == None:
+      logging.error('%s: No options listed for NIFTY expiry %s', self.getName(), ladder.weeklyExpiry)
+      return
+    ATMStrike = optionChain.getNearestStrike(quote.lastTradedPrice) # nearest listed strike
     logging.info('%s: Nifty CMP = %f, ATMStrike = %d', self.getName(), quote.lastTradedPrice, ATMStrike)
 
-    ATMPlus50CESymbol = Utils.prepareWeeklyOptionsSymbol("NIFTY", ATMStrike + 50, 'CE')
-    ATMMinus50PESymbol = Utils.prepareWeeklyOptionsSymbol("NIFTY", ATMStrike - 50, 'PE')
+    # One listed strike above and below ATM (ATM + 50 and ATM - 50)
+    ATMPlus50Strike = optionChain.getStrikeAtOffset(ATMStrike, 1)
+    ATMMinus50Strike = optionChain.getStrikeAtOffset(ATMStrike, -1)
+    ATMPlus50CESymbol = optionChain.getSymbol(ATMPlus50Strike, 'CE')
+    ATMMinus50PESymbol = optionChain.getSymbol(ATMMinus50Strike, 'PE')
+    if ATMPlus50CESymbol == None or ATMMinus50PESymbol == None:
+      logging.error('%s: Options of strikes %s are not listed for expiry %s', self.getName(), (ATMPlus50Strike, ATMMinus50Strike), ladder.weeklyExpiry)
+      return
     logging.info('%s: ATMPlus50CE = %s, ATMMinus50PE = %s', self.getName(), ATMPlus50CESymbol, ATMMinus50PESymbol)
     # create trades
     self.generateTrades(ATMPlus50CESymbol, ATMMinus50PESymbol)
@@ -81,8 +97,12 @@ class OptionSelling(BaseStrategy):
       logging.error('%s: Could not get quotes for option symbols', self.getName())
       return
 
-    self.generateTrade(ATMPlus50CESymbol, numLots, quoteATMPlus50CESymbol.lastTradedPrice)
-    self.generateTrade(ATMMinus50PESymbol, numLots, quoteATMMinus50PESymbol.lastTradedPrice)
+    # CE and PE legs are entered together as one basket
+    basket = TradeBasket(self.getName())
+    basket.addLeg(self.generateTrade(ATMPlus50CESymbol, numLots, quoteATMPlus50CESymbol.lastTradedPrice))
+    basket.addLeg(self.generateTrade(ATMMinus50PESymbol, numLots, quoteATMMinus50PESymbol.lastTradedPrice))
+    # Hand over the basket to TradeManager
+    TradeManager.addNewBasket(basket)
     logging.info('%s: Trades generated.', self.getName())
 
   def generateTrade(self, optionSymbol, numLots, lastTradedPrice):
@@ -102,8 +122,7 @@ class OptionSelling(BaseStrategy):
     trade.target = 0 # setting to 0 as no target is applicable for this trade
 
     trade.intradaySquareOffTimestamp = Utils.getEpoch(self.squareOffTimestamp)
-    # Hand over the trade to TradeManager
-    TradeManager.addNewTrade(trade)
+    return trade
 
   def shouldPlaceTrade(self, trade, tick):
     # First call base class implementation and if it returns True then only proceed
@@ -110,3 +110,6 @@ class SampleStrategy(BaseStrategy):
     elif trade.direction == Direction.SHORT and tick.lastTradedPrice < trade.requestedEntry:
       return True
     return False
+
+  def getTradeTrigger(self, trade):
+    return self.getBreakoutTrigger(trade)
@@ -1,12 +1,14 @@
 import logging
-from datetime import datetime
 
 from instruments.Instruments import Instruments
+from instruments.OptionLadder import OptionLadder
 from models.Direction import Direction
 from models.ProductType import ProductType
 from strategies.BaseStrategy import BaseStrategy
 from utils.Utils import Utils
+from utils.Clock import Clock
 from trademgmt.Trade import Trade
+from trademgmt.TradeBasket import TradeBasket
 from trademgmt.TradeManager import TradeManager
 
 # Each strategy has to be derived from BaseStrategy
@@ -45,24 +47,35 @@ class ShortStraddleBNF(BaseStrategy):
     return True
 
   def process(self):
-    now = datetime.now()
+    now = Clock.now()
     if now < self.startTimestamp:
       return
     if len(self.trades) >= self.maxTradesPerDay:
       return
 
     # Get current market price of Nifty Future
-    futureSymbol = Utils.prepareMonthlyExpiryFuturesSymbol('BANKNIFTY')
+    ladder = OptionLadder.getLadder('BANKNIFTY')
+    if ladder == None:
+      logging.error('%s: Could not get option ladder of BANKNIFTY', self.getName())
+      return
+    futureSymbol = ladder.futureSymbol
     quote = self.getQuote(futureSymbol)
     if quote == None:
       logging.error('%s: Could not get quote for %s', self.getName(), futureSymbol)
       return
 
-    ATMStrike = Utils.getNearestStrikePrice(quote.lastTradedPrice, 100)
+    optionChain = ladder.getOptionChain(ladder.weeklyExpiry)
+    if optionChain == None:
+      logging.error('%s: No options listed for BANKNIFTY expiry %s', self.getName(), ladder.weeklyExpiry)
+      return
+    ATMStrike = optionChain.getNearestStrike(quote.lastTradedPrice) # nearest listed strike
     logging.info('%s: Nifty CMP = %f, ATMStrike = %d', self.getName(), quote.lastTradedPrice, ATMStrike)
 
-    ATMCESymbol = Utils.prepareWeeklyOptionsSymbol("BANKNIFTY", ATMStrike, 'CE')
-    ATMPESymbol = Utils.prepareWeeklyOptionsSymbol("BANKNIFTY", ATMStrike, 'PE')
+    ATMCESymbol = optionChain.getSymbol(ATMStrike, 'CE')
+    ATMPESymbol = optionChain.getSymbol(ATMStrike, 'PE')
+    if ATMCESymbol == None or ATMPESymbol == None:
+      logging.error('%s: ATM strike %d options are not listed for expiry %s', self.getName(), ATMStrike, ladder.weeklyExpiry)
+      return
     logging.info('%s: ATMCESymbol = %s, ATMPESymbol = %s', self.getName(), ATMCESymbol, ATMPESymbol)
     # create trades
     self.generateTrades(ATMCESymbol, ATMPESymbol)
@@ -75,8 +88,12 @@ class ShortStraddleBNF(BaseStrategy):
       logging.error('%s: Could not get quotes for option symbols', self.getName())
       return
 
-    self.generateTrade(ATMCESymbol, numLots, quoteATMCESymbol.lastTradedPrice)
-    self.generateTrade(ATMPESymbol, numLots, quoteATMPESymbol.lastTradedPrice)
+    # CE and PE legs are entered together as one basket
+    basket = TradeBasket(self.getName())
+    basket.addLeg(self.generateTrade(ATMCESymbol, numLots, quoteATMCESymbol.lastTradedPrice))
+    basket.addLeg(self.generateTrade(ATMPESymbol, numLots, quoteATMPESymbol.lastTradedPrice))
+    # Hand over the basket to TradeManager
+    TradeManager.addNewBasket(basket)
     logging.info('%s: Trades generated.', self.getName())
 
   def generateTrade(self, optionSymbol, numLots, lastTradedPrice):
@@ -96,8 +113,7 @@ class ShortStraddleBNF(BaseStrategy):
     trade.target = 0 # setting to 0 as no target is applicable for this trade
 
     trade.intradaySquareOffTimestamp = Utils.getEpoch(self.squareOffTimestamp)
-    # Hand over the trade to TradeManager
-    TradeManager.addNewTrade(trade)
+    return trade
 
   def shouldPlaceTrade(self, trade, tick):
     # First call base class implementation and if it returns True then only proceed
@@ -112,7 +128,7 @@ class ShortStraddleBNF(BaseStrategy):
     if trade.entry == 0:
       return 0
     lastTradedPrice = TradeManager.getLastTradedPrice(trade.tradingSymbol)
-    if lastTradedPrice == 0:
+    if lastTradedPrice == None:
       return 0
 
     trailSL = 0
@@ -1,13 +1,21 @@
 import logging
 
 from core.Controller import Controller
+from ticker.TickDispatcher import TickDispatcher
+from instruments.InstrumentRegistry import InstrumentRegistry
+from core.MarketDataTable import MarketDataTable
+from utils.Clock import Clock
 
 class BaseTicker:
   def __init__(self, broker):
     self.broker = broker
     self.brokerLogin = Controller.getBrokerLogin()
     self.ticker = None
-    self.tickListeners = []
+    self.rawTicksListeners = [] # listeners notified with every batch of ticks on broker websocket thread before dispatching
+    self.tickListeners = [] # listeners notified with ticks of all symbols
+    self.symbolToListenersMap = {} # listeners notified with ticks of specific symbols only
+    self.orderUpdateListeners = []
+    self.tickDispatcher = None # when set, ticks are processed on dispatcher threads instead of broker websocket thread
 
   def startTicker(self):
     pass
@@ -15,9 +23,56 @@ class BaseTicker:
   def stopTicker(self):
     pass
 
-  def registerListener(self, listener):
+  def startTickDispatcher(self, numConsumers = 1, maxPendingSymbols = 5000):
+    if self.tickDispatcher != None:
+      return
+    self.tickDispatcher = TickDispatcher(self.dispatchTick, numConsumers, maxPendingSymbols, self.dispatchOrderUpdate)
+    self.tickDispatcher.start()
+
+  def stopTickDispatcher(self):
+    if self.tickDispatcher != None:
+      self.tickDispatcher.stop()
+      self.tickDispatcher = None
+
+  def getTickDispatcherStats(self):
+    if self.tickDispatcher == None:
+      return None
+    return self.tickDispatcher.getStats()
+
+  def registerListener(self, listener, symbols = None):
     # All registered tick listeners will be notified on new ticks
-    self.tickListeners.append(listener)
+    # If symbols are given the listener will be notified only with the ticks of those symbols
+    # Lists are replaced instead of modified in place as ticks can be getting dispatched on other threads
+    if symbols == None:
+      self.tickListeners = self.tickListeners + [listener]
+      return
+    for symbol in symbols:
+      listeners = self.symbolToListenersMap.get(symbol, [])
+      if listener not in listeners:
+        self.symbolToListenersMap[symbol] = listeners + [listener]
+
+  def registerRawTicksListener(self, listener):
+    # Listener is called with the list of ticks as received, before conflation by dispatcher (Ex: tick recorder)
+    # It is called on broker websocket thread, so it must be quick and must not block
+    self.rawTicksListeners = self.rawTicksListeners + [listener]
+
+  def unregisterListener(self, listener, symbols = None):
+    if symbols == None:
+      self.tickListeners = [l for l in self.tickListeners if l != listener]
+      return
+    for symbol in symbols:
+      listeners = self.symbolToListenersMap.get(symbol)
+      if listeners == None:
+        continue
+      listeners = [l for l in listeners if l != listener]
+      if len(listeners) > 0:
+        self.symbolToListenersMap[symbol] = listeners
+      else:
+        del self.symbolToListenersMap[symbol]
+
+  def registerOrderUpdateListener(self, listener):
+    # All registered order update listeners will be notified with ordermgmt.OrderUpdate on order updates from broker
+    self.orderUpdateListeners.append(listener)
 
   def registerSymbols(self, symbols):
     pass
@@ -27,12 +82,39 @@ class BaseTicker:
 
   def onNewTicks(self, ticks):
     # logging.info('New ticks received %s', ticks)
+    # All the listeners of this batch see the same coarse time
+    Clock.refresh()
+    # Latest market data is updated right here so that it is current even if listeners lag behind
+    for tick in ticks:
+      if tick.instrumentId == None:
+        tick.instrumentId = InstrumentRegistry.register(tick.tradingSymbol)
+      MarketDataTable.update(tick)
+    for listener in self.rawTicksListeners:
+      try:
+        listener(ticks)
+      except Exception as e:
+        logging.error('BaseTicker: Exception from raw ticks listener callback function. Error => %s', str(e))
+    if self.tickDispatcher != None:
+      # Hand over to dispatcher so that broker websocket thread is not blocked by listeners
+      self.tickDispatcher.submit(ticks)
+      return
     for tick in ticks:
-      for listener in self.tickListeners:
-        try:
-          listener(tick)
-        except Exception as e:
-          logging.error('BaseTicker: Exception from listener callback function. Error => %s', str(e))
+      self.dispatchTick(tick)
+
+  def dispatchTick(self, tick):
+    for listener in self.tickListeners:
+      try:
+        listener(tick)
+      except Exception as e:
+        logging.error('BaseTicker: Exception from listener callback function. Error => %s', str(e))
+    symbolListeners = self.symbolToListenersMap.get(tick.tradingSymbol)
+    if symbolListeners == None:
+      return
+    for listener in symbolListeners:
+      try:
+        listener(tick)
+      except Exception as e:
+        logging.error('BaseTicker: Exception from %s listener callback function. Error => %s', tick.tradingSymbol, str(e))
 
   def onConnect(self):
     logging.info('Ticker connection successful.')
@@ -49,6 +131,17 @@ class BaseTicker:
   def onMaxReconnectsAttempt(self):
     logging.error('Ticker max auto reconnects attempted and giving up..')
 
-  def onOrderUpdate(self, data):
-    #logging.info('Ticker: order update %s', data)
-    pass
+  def onOrderUpdate(self, orderUpdate):
+    #logging.info('Ticker: order update %s', orderUpdate)
+    if self.tickDispatcher != None:
+      # Listeners take trades lock, so they are not called on broker websocket thread
+      self.tickDispatcher.submitOrderUpdate(orderUpdate)
+      return
+    self.dispatchOrderUpdate(orderUpdate)
+
+  def dispatchOrderUpdate(self, orderUpdate):
+    for listener in self.orderUpdateListeners:
+      try:
+        listener(orderUpdate)
+      except Exception as e:
+        logging.error('BaseTicker: Exception from order update listener callback function. Error => %s', str(e))
@@ -0,0 +1,130 @@
+import os
+import mmap
+import bisect
+
+class TickColumnFile:
+  # Memory mapped file holding ticks of one instrument in fixed width (8 bytes) columns.
+  # Layout: 64 bytes header (magic, capacity, count, numColumns) followed by one region of
+  # capacity * 8 bytes per column. Rows are appended in time order, so timestamp column is the time index.
+  # append() never resizes the file: rows appended while the file is full or getting grown (growing is set by the owner
+  # before calling grow() from another thread) are kept in memory and written by appendPendingRows() after the grow.
+  magic = b'TICKCOL1'
+  headerSize = 64
+  columns = [('timestamp', 'q'), ('token', 'q'), ('lastTradedPrice', 'd'), ('volume', 'q'),
+    ('open', 'd'), ('high', 'd'), ('low', 'd'), ('close', 'd'), ('totalBuyQuantity', 'q'), ('totalSellQuantity', 'q')]
+
+  def __init__(self, filepath, initialCapacity = 65536, readOnly = False):
+    self.filepath = filepath
+    self.readOnly = readOnly
+    self.mm = None
+    self.headerView = None
+    self.columnViews = []
+    self.growing = False
+    self.pendingRows = [] # (timestamp, token, tick) appended while the file was full or getting grown
+    if os.path.exists(filepath):
+      self.map(None)
+    elif readOnly == False:
+      with open(filepath, 'wb') as cFile:
+        cFile.truncate(TickColumnFile.headerSize + initialCapacity * 8 * len(TickColumnFile.columns))
+      self.map(initialCapacity)
+    else:
+      raise Exception('Tick column file ' + filepath + ' does not exist')
+
+  def map(self, newCapacity):
+    with open(self.filepath, 'rb' if self.readOnly else 'r+b') as cFile:
+      self.mm = mmap.mmap(cFile.fileno(), 0, access=mmap.ACCESS_READ if self.readOnly else mmap.ACCESS_WRITE)
+    self.headerView = memoryview(self.mm)[8:32].cast('q')
+    if newCapacity != None:
+      self.mm[0:8] = TickColumnFile.magic
+      self.headerView[0] = newCapacity
+      self.headerView[2] = len(TickColumnFile.columns)
+    elif self.mm[0:8] != TickColumnFile.magic:
+      raise Exception('Invalid tick column file ' + self.filepath)
+    self.capacity = self.headerView[0]
+    self.count = self.headerView[1]
+    self.columnViews = []
+    for i in range(len(TickColumnFile.columns)):
+      offset = TickColumnFile.headerSize + i * self.capacity * 8
+      self.columnViews.append(memoryview(self.mm)[offset:offset + self.capacity * 8].cast(TickColumnFile.columns[i][1]))
+
+  def unmap(self):
+    for columnView in self.columnViews:
+      columnView.release()
+    self.columnViews = []
+    self.headerView.release()
+    self.headerView = None
+    self.mm.close()
+    self.mm = None
+
+  def grow(self):
+    # Double the capacity and move each column region to its new offset. Columns are moved starting
+    # from the last one so that a column never overwrites another column which is not moved yet.
+    oldCapacity = self.capacity
+    newCapacity = oldCapacity * 2
+    self.unmap()
+    with open(self.filepath, 'r+b') as cFile:
+      cFile.truncate(TickColumnFile.headerSize + newCapacity * 8 * len(TickColumnFile.columns))
+    with open(self.filepath, 'r+b') as cFile:
+      mm = mmap.mmap(cFile.fileno(), 0)
+    for i in reversed(range(len(TickColumnFile.columns))):
+      oldOffset = TickColumnFile.headerSize + i * oldCapacity * 8
+      newOffset = TickColumnFile.headerSize + i * newCapacity * 8
+      mm.move(newOffset, oldOffset, self.count * 8)
+    mm.close()
+    self.map(newCapacity)
+    self.headerView[1] = self.count
+
+  def needsGrow(self):
+    # Grown when half full so that it does not get full before the next grow
+    return self.count * 2 >= self.capacity or len(self.pendingRows) > 0
+
+  def hasPendingRows(self):
+    return len(self.pendingRows) > 0
+
+  def appendPendingRows(self):
+    # Rows which still do not fit stay pending till the next grow
+    pendingRows = self.pendingRows
+    self.pendingRows = []
+    for (timestamp, token, tick) in pendingRows:
+      self.append(timestamp, token, tick)
+
+  def append(self, timestamp, token, tick):
+    index = self.count
+    if self.growing == True or index == self.capacity or len(self.pendingRows) > 0:
+      self.pendingRows.append((timestamp, token, tick))
+      return
+    c = self.columnViews
+    c[0][index] = timestamp
+    c[1][index] = token
+    c[2][index] = tick.lastTradedPrice
+    c[3][index] = int(tick.volume)
+    c[4][index] = tick.open
+    c[5][index] = tick.high
+    c[6][index] = tick.low
+    c[7][index] = tick.close
+    c[8][index] = int(tick.totalBuyQuantity)
+    c[9][index] = int(tick.totalSellQuantity)
+    self.count = index + 1
+    # count is updated last so that a reader never sees a partially written row
+    self.headerView[1] = self.count
+
+  def readRange(self, fromTimestamp = None, toTimestamp = None):
+    # Returns column name -> memoryview of the rows with fromTimestamp <= timestamp <= toTimestamp.
+    # Views point directly into the mapped file (no copy). Use numpy.frombuffer(view) to get numpy arrays.
+    timestamps = self.columnViews[0][0:self.count]
+    start = 0 if fromTimestamp == None else bisect.bisect_left(timestamps, fromTimestamp)
+    end = self.count if toTimestamp == None else bisect.bisect_right(timestamps, toTimestamp)
+    timestamps.release()
+    result = {}
+    for i in range(len(TickColumnFile.columns)):
+      result[TickColumnFile.columns[i][0]] = self.columnViews[i][start:end]
+    return result
+
+  def flush(self):
+    self.mm.flush()
+
+  def close(self):
+    if self.mm != None:
+      if self.readOnly == False:
+        self.mm.flush()
+      self.unmap()
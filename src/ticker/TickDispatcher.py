@@ -0,0 +1,139 @@
+import logging
+import threading
+from collections import deque
+
+class TickDispatcher:
+  # Decouples the broker websocket thread from tick processing. Ticks are buffered per instrument and a newer tick
+  # replaces an unprocessed older tick of the same instrument (conflation). Instruments are sharded across consumer threads
+  # so that ticks of an instrument are always processed in order by the same consumer.
+  # Order updates are neither conflated nor dropped, they are processed in order on a separate consumer.
+  def __init__(self, dispatchFunc, numConsumers = 1, maxPendingSymbols = 5000, dispatchOrderUpdateFunc = None):
+    self.dispatchFunc = dispatchFunc # called with each tick on consumer thread
+    self.dispatchOrderUpdateFunc = dispatchOrderUpdateFunc # called with each order update on order update consumer thread
+    self.numConsumers = numConsumers if numConsumers > 0 else 1
+    self.maxPendingPerConsumer = max(1, int(maxPendingSymbols / self.numConsumers))
+    self.pendingTicks = [] # per consumer: instrumentId -> latest unprocessed tick
+    self.pendingSymbols = [] # per consumer: instrumentIds in the order they have to be processed
+    self.conditions = []
+    # per consumer counters, updated under the lock of that consumer and summed up by getStats()
+    self.counters = []
+    for i in range(self.numConsumers):
+      self.pendingTicks.append({})
+      self.pendingSymbols.append(deque())
+      self.conditions.append(threading.Condition())
+      self.counters.append({'received': 0, 'dispatched': 0, 'conflated': 0, 'dropped': 0, 'maxQueueDepth': 0})
+    self.pendingOrderUpdates = deque()
+    self.orderUpdatesCondition = threading.Condition()
+    self.numOrderUpdates = 0
+    self.consumers = []
+    self.running = False
+
+  def start(self):
+    if self.running == True:
+      return
+    self.running = True
+    for i in range(self.numConsumers):
+      consumer = threading.Thread(target=self.consume, args=(i,), name='TickConsumer-' + str(i), daemon=True)
+      consumer.start()
+      self.consumers.append(consumer)
+    if self.dispatchOrderUpdateFunc != None:
+      consumer = threading.Thread(target=self.consumeOrderUpdates, name='OrderUpdateConsumer', daemon=True)
+      consumer.start()
+      self.consumers.append(consumer)
+    logging.info('TickDispatcher: Started %d consumers with max %d pending symbols each', self.numConsumers, self.maxPendingPerConsumer)
+
+  def stop(self):
+    self.running = False
+    for condition in self.conditions:
+      with condition:
+        condition.notify_all()
+    with self.orderUpdatesCondition:
+      self.orderUpdatesCondition.notify_all()
+    self.consumers = []
+
+  def submit(self, ticks):
+    # Called on websocket thread. Never blocks on tick processing.
+    for tick in ticks:
+      key = tick.instrumentId
+      index = key % self.numConsumers
+      pendingTicks = self.pendingTicks[index]
+      condition = self.conditions[index]
+      counters = self.counters[index]
+      with condition:
+        counters['received'] += 1
+        if key in pendingTicks:
+          # Older tick of this symbol not processed yet, only the latest one matters
+          pendingTicks[key] = tick
+          counters['conflated'] += 1
+          continue
+        if len(pendingTicks) >= self.maxPendingPerConsumer:
+          counters['dropped'] += 1
+          continue
+        pendingTicks[key] = tick
+        pendingSymbols = self.pendingSymbols[index]
+        pendingSymbols.append(key)
+        if len(pendingSymbols) > counters['maxQueueDepth']:
+          counters['maxQueueDepth'] = len(pendingSymbols)
+        condition.notify()
+
+  def consume(self, index):
+    pendingTicks = self.pendingTicks[index]
+    pendingSymbols = self.pendingSymbols[index]
+    condition = self.conditions[index]
+    counters = self.counters[index]
+    while True:
+      with condition:
+        while self.running == True and len(pendingSymbols) == 0:
+          condition.wait()
+        if self.running == False:
+          return
+        key = pendingSymbols.popleft()
+        tick = pendingTicks.pop(key)
+        counters['dispatched'] += 1
+      try:
+        self.dispatchFunc(tick)
+      except Exception as e:
+        logging.error('TickDispatcher: Exception while dispatching tick. Error => %s', str(e))
+
+  def submitOrderUpdate(self, orderUpdate):
+    # Called on websocket thread (or ticker thread for paper fills). Never blocks on order update processing.
+    with self.orderUpdatesCondition:
+      self.pendingOrderUpdates.append(orderUpdate)
+      self.numOrderUpdates += 1
+      self.orderUpdatesCondition.notify()
+
+  def consumeOrderUpdates(self):
+    pendingOrderUpdates = self.pendingOrderUpdates
+    condition = self.orderUpdatesCondition
+    while True:
+      with condition:
+        while self.running == True and len(pendingOrderUpdates) == 0:
+          condition.wait()
+        if self.running == False:
+          return
+        orderUpdate = pendingOrderUpdates.popleft()
+      try:
+        self.dispatchOrderUpdateFunc(orderUpdate)
+      except Exception as e:
+        logging.error('TickDispatcher: Exception while dispatching order update. Error => %s', str(e))
+
+  def getQueueDepth(self):
+    queueDepth = 0
+    for pendingSymbols in self.pendingSymbols:
+      queueDepth += len(pendingSymbols)
+    return queueDepth
+
+  def getStats(self):
+    stats = {'received': 0, 'dispatched': 0, 'conflated': 0, 'dropped': 0, 'queueDepth': 0, 'maxQueueDepth': 0}
+    for index in range(self.numConsumers):
+      with self.conditions[index]:
+        counters = self.counters[index]
+        for name in ['received', 'dispatched', 'conflated', 'dropped']:
+          stats[name] += counters[name]
+        stats['queueDepth'] += len(self.pendingSymbols[index])
+        # deepest queue of any one consumer
+        stats['maxQueueDepth'] = max(stats['maxQueueDepth'], counters['maxQueueDepth'])
+    with self.orderUpdatesCondition:
+      stats['orderUpdates'] = self.numOrderUpdates
+      stats['orderUpdatesQueueDepth'] = len(self.pendingOrderUpdates)
+    return stats
@@ -0,0 +1,20 @@
+class TickRange:
+  # Ticks of one instrument returned by ticker.TickRecorder.readRange(). Owns the read only ticker.TickColumnFile,
+  # columns is column name -> memoryview directly over the mapped file (no copy).
+  # The views are valid till close(). Buffers made from them (Ex: numpy.frombuffer(view)) must be dropped before
+  # close() as the mapping cannot be closed while they exist (mmap raises BufferError then).
+  def __init__(self, columnFile, columns):
+    self.columnFile = columnFile
+    self.columns = columns
+
+  def getNumTicks(self):
+    return len(self.columns['timestamp']) if self.columnFile != None else 0
+
+  def close(self):
+    if self.columnFile == None:
+      return
+    for column in self.columns.values():
+      column.release()
+    self.columns = {}
+    self.columnFile.close()
+    self.columnFile = None
@@ -0,0 +1,96 @@
+import os
+import logging
+import threading
+
+from instruments.InstrumentRegistry import InstrumentRegistry
+from ticker.TickColumnFile import TickColumnFile
+from ticker.TickRange import TickRange
+from utils.Clock import Clock
+
+class TickRecorder:
+  # Records every tick received by ticker into one ticker.TickColumnFile per instrument under the given day directory
+  # (<deployDir>/ticks/<date>/<tradingSymbol>.ticks). Registered as raw ticks listener of the ticker so that ticks
+  # are recorded before conflation and without going through the tick dispatcher.
+  # Files are never resized on the websocket thread: flush() (main thread) grows the files which are half full,
+  # and ticks of a file which is full or getting grown are kept in memory till the grow is done.
+  fileExtension = '.ticks'
+
+  def __init__(self, ticksDir, initialCapacity = 65536):
+    self.ticksDir = ticksDir
+    self.initialCapacity = initialCapacity
+    self.columnFiles = [] # instrumentId -> (TickColumnFile, token)
+    self.numTicksRecorded = 0
+    self.lock = threading.Lock() # ticks are recorded on websocket thread and flushed from main thread
+    if os.path.exists(ticksDir) == False:
+      logging.info('TickRecorder: Ticks Directory %s does not exist. Hence going to create.', ticksDir)
+      os.makedirs(ticksDir)
+
+  def openColumnFile(self, instrumentId):
+    if instrumentId >= len(self.columnFiles):
+      self.columnFiles.extend([None] * (instrumentId + 1 - len(self.columnFiles)))
+    tradingSymbol = InstrumentRegistry.getSymbol(instrumentId)
+    token = InstrumentRegistry.getToken(instrumentId)
+    filepath = os.path.join(self.ticksDir, tradingSymbol + TickRecorder.fileExtension)
+    columnFile = (TickColumnFile(filepath, self.initialCapacity), token if token != None else 0)
+    self.columnFiles[instrumentId] = columnFile
+    logging.info('TickRecorder: Recording ticks of %s to %s', tradingSymbol, filepath)
+    return columnFile
+
+  def onTicks(self, ticks):
+    timestamp = int(Clock.now().timestamp() * 1000)
+    with self.lock:
+      columnFiles = self.columnFiles
+      for tick in ticks:
+        instrumentId = tick.instrumentId
+        columnFile = columnFiles[instrumentId] if instrumentId < len(columnFiles) else None
+        if columnFile == None:
+          columnFile = self.openColumnFile(instrumentId)
+          columnFiles = self.columnFiles
+        columnFile[0].append(timestamp, columnFile[1], tick)
+      self.numTicksRecorded += len(ticks)
+
+  def flush(self):
+    with self.lock:
+      growingFiles = []
+      for columnFile in self.columnFiles:
+        if columnFile != None and columnFile[0].needsGrow():
+          columnFile[0].growing = True
+          growingFiles.append(columnFile[0])
+    # Grown without holding the lock so that recording of ticks is not held up by resizing the files
+    for columnFile in growingFiles:
+      columnFile.grow()
+    with self.lock:
+      for columnFile in growingFiles:
+        columnFile.growing = False
+        columnFile.appendPendingRows()
+      for columnFile in self.columnFiles:
+        if columnFile != None:
+          columnFile[0].flush()
+
+  def close(self):
+    with self.lock:
+      for columnFile in self.columnFiles:
+        if columnFile != None:
+          while columnFile[0].hasPendingRows():
+            columnFile[0].grow()
+            columnFile[0].appendPendingRows()
+          columnFile[0].close()
+      self.columnFiles = []
+    logging.info('TickRecorder: Closed after recording %d ticks', self.numTicksRecorded)
+
+  @staticmethod
+  def getRecordedSymbols(ticksDir):
+    symbols = []
+    for filename in os.listdir(ticksDir):
+      if filename.endswith(TickRecorder.fileExtension):
+        symbols.append(filename[0:-len(TickRecorder.fileExtension)])
+    return symbols
+
+  @staticmethod
+  def readRange(ticksDir, tradingSymbol, fromTimestamp = None, toTimestamp = None):
+    # Returns ticker.TickRange of the ticks of given symbol recorded between the given epoch milliseconds.
+    # Its columns are zero copy over the mapped file, Ex: numpy.frombuffer(tickRange.columns['lastTradedPrice'], dtype=numpy.float64)
+    # Caller has to close() it once done with the columns.
+    filepath = os.path.join(ticksDir, tradingSymbol + TickRecorder.fileExtension)
+    columnFile = TickColumnFile(filepath, readOnly=True)
+    return TickRange(columnFile, columnFile.readRange(fromTimestamp, toTimestamp))
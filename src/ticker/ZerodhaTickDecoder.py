@@ -0,0 +1,104 @@
+import struct
+
+from instruments.Instruments import Instruments
+from instruments.InstrumentRegistry import InstrumentRegistry
+from models.TickData import TickData
+
+class ZerodhaTickDecoder:
+  # Decodes Kite ticker binary frames directly into models.TickData, skipping the dicts that KiteTicker builds
+  # for every tick which are then converted to TickData again.
+  # Frame: 2 bytes number of packets, then each packet prefixed by its 2 bytes length. All values are big endian.
+  # Packet layouts by length:
+  #   8   LTP mode: token, last price
+  #   28  Index quote: token, last price, high, low, open, close, change
+  #   32  Index full: index quote + exchange timestamp
+  #   44  Quote mode: token, last price, last qty, avg price, volume, buy qty, sell qty, open, high, low, close
+  #   184 Full mode: quote + last trade time, oi, oi day high, oi day low, exchange timestamp and market depth
+  shortStruct = struct.Struct('>H')
+  ltpStruct = struct.Struct('>II')
+  indexQuoteStruct = struct.Struct('>IIIIII')
+  quoteStruct = struct.Struct('>IIIIIIIIIII')
+
+  # Segment (last byte of instrument token) specific price divisors
+  segmentCDS = 3
+  segmentBCD = 6
+
+  def __init__(self):
+    self.tokenToInstrumentMap = {} # token -> (instrumentId, tradingSymbol, priceDivisor)
+
+  def getInstrument(self, instrumentToken):
+    instrument = self.tokenToInstrumentMap.get(instrumentToken)
+    if instrument != None:
+      return instrument
+    instrumentId = InstrumentRegistry.getIdByToken(instrumentToken)
+    if instrumentId == None:
+      isd = Instruments.getInstrumentDataByToken(instrumentToken)
+      instrumentId = InstrumentRegistry.register(isd['tradingsymbol'], instrumentToken)
+    segment = instrumentToken & 0xff
+    divisor = 100.0
+    if segment == ZerodhaTickDecoder.segmentCDS:
+      divisor = 10000000.0
+    elif segment == ZerodhaTickDecoder.segmentBCD:
+      divisor = 10000.0
+    instrument = (instrumentId, InstrumentRegistry.getSymbol(instrumentId), divisor)
+    self.tokenToInstrumentMap[instrumentToken] = instrument
+    return instrument
+
+  def decode(self, payload):
+    # Returns list of TickData decoded from the given binary frame
+    ticks = []
+    if len(payload) < 4:
+      # heartbeat
+      return ticks
+    unpackShort = ZerodhaTickDecoder.shortStruct.unpack_from
+    numPackets = unpackShort(payload, 0)[0]
+    offset = 2
+    for i in range(numPackets):
+      packetLength = unpackShort(payload, offset)[0]
+      offset += 2
+      tick = self.decodePacket(payload, offset, packetLength)
+      if tick != None:
+        ticks.append(tick)
+      offset += packetLength
+    return ticks
+
+  def decodePacket(self, payload, offset, packetLength):
+    if packetLength == 44 or packetLength == 184:
+      (token, lastPrice, lastQty, avgPrice, volume, buyQty, sellQty, openPrice, highPrice, lowPrice, closePrice) \
+        = ZerodhaTickDecoder.quoteStruct.unpack_from(payload, offset)
+      instrumentId, tradingSymbol, divisor = self.getInstrument(token)
+      tick = TickData(tradingSymbol)
+      tick.instrumentId = instrumentId
+      tick.lastTradedPrice = lastPrice / divisor
+      tick.lastTradedQuantity = lastQty
+      tick.avgTradedPrice = avgPrice / divisor
+      tick.volume = volume
+      tick.totalBuyQuantity = buyQty
+      tick.totalSellQuantity = sellQty
+      tick.open = openPrice / divisor
+      tick.high = highPrice / divisor
+      tick.low = lowPrice / divisor
+      tick.close = closePrice / divisor
+    elif packetLength == 28 or packetLength == 32:
+      (token, lastPrice, highPrice, lowPrice, openPrice, closePrice) = ZerodhaTickDecoder.indexQuoteStruct.unpack_from(payload, offset)
+      instrumentId, tradingSymbol, divisor = self.getInstrument(token)
+      tick = TickData(tradingSymbol)
+      tick.instrumentId = instrumentId
+      tick.lastTradedPrice = lastPrice / divisor
+      tick.open = openPrice / divisor
+      tick.high = highPrice / divisor
+      tick.low = lowPrice / divisor
+      tick.close = closePrice / divisor
+    elif packetLength == 8:
+      (token, lastPrice) = ZerodhaTickDecoder.ltpStruct.unpack_from(payload, offset)
+      instrumentId, tradingSymbol, divisor = self.getInstrument(token)
+      tick = TickData(tradingSymbol)
+      tick.instrumentId = instrumentId
+      tick.lastTradedPrice = lastPrice / divisor
+      return tick
+    else:
+      return None
+    # Same as KiteTicker: change in percentage w.r.t previous close
+    if tick.close != 0:
+      tick.change = (tick.lastTradedPrice - tick.close) * 100 / tick.close
+    return tick
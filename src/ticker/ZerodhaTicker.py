@@ -3,13 +3,21 @@ import json
 
 from kiteconnect import KiteTicker
 
+from config.Config import getServerConfigValue
 from ticker.BaseTicker import BaseTicker
+from ticker.ZerodhaTickDecoder import ZerodhaTickDecoder
 from instruments.Instruments import Instruments
+from instruments.InstrumentRegistry import InstrumentRegistry
 from models.TickData import TickData
+from ordermgmt.ZerodhaOrderManager import ZerodhaOrderManager
 
 class ZerodhaTicker(BaseTicker):
   def __init__(self):
     super().__init__("zerodha")
+    self.tickDecoder = None # set in fast decode mode
+
+  def isFastTickDecodeEnabled(self):
+    return getServerConfigValue('fastTickDecode', False) == True
 
   def startTicker(self):
     brokerAppDetails = self.brokerLogin.getBrokerAppDetails()
@@ -24,7 +32,13 @@ class ZerodhaTicker(BaseTicker):
     ticker.on_error = self.on_error
     ticker.on_reconnect = self.on_reconnect
     ticker.on_noreconnect = self.on_noreconnect
-    ticker.on_ticks = self.on_ticks
+    if self.isFastTickDecodeEnabled():
+      # Decode binary frames ourselves instead of letting KiteTicker build dicts for every tick
+      self.tickDecoder = ZerodhaTickDecoder()
+      ticker.on_message = self.on_message
+      logging.info('ZerodhaTicker: Fast tick decode mode enabled')
+    else:
+      ticker.on_ticks = self.on_ticks
     ticker.on_order_update = self.on_order_update
 
     logging.info('ZerodhaTicker: Going to connect..')
@@ -34,13 +48,15 @@ class ZerodhaTicker(BaseTicker):
   def stopTicker(self):
     logging.info('ZerodhaTicker: stopping..')
     self.ticker.close(1000, "Manual close")
+    self.stopTickDispatcher()
 
   def registerSymbols(self, symbols):
     tokens = []
     for symbol in symbols:
       isd = Instruments.getInstrumentDataBySymbol(symbol)
       token = isd['instrument_token']
-      logging.info('ZerodhaTicker registerSymbol: %s token = %s', symbol, token)
+      instrumentId = InstrumentRegistry.register(symbol, token)
+      logging.info('ZerodhaTicker registerSymbol: %s token = %s, id = %d', symbol, token, instrumentId)
       tokens.append(token)
 
     logging.info('ZerodhaTicker Subscribing tokens %s', tokens)
@@ -61,9 +77,12 @@ class ZerodhaTicker(BaseTicker):
     # convert broker specific Ticks to our system specific Ticks (models.TickData) and pass to super class function
     ticks = []
     for bTick in brokerTicks:
-      isd = Instruments.getInstrumentDataByToken(bTick['instrument_token'])
-      tradingSymbol = isd['tradingsymbol']
-      tick = TickData(tradingSymbol)
+      instrumentId = InstrumentRegistry.getIdByToken(bTick['instrument_token'])
+      if instrumentId == None:
+        isd = Instruments.getInstrumentDataByToken(bTick['instrument_token'])
+        instrumentId = InstrumentRegistry.register(isd['tradingsymbol'], bTick['instrument_token'])
+      tick = TickData(InstrumentRegistry.idToSymbolList[instrumentId])
+      tick.instrumentId = instrumentId
       tick.lastTradedPrice = bTick['last_price']
       tick.lastTradedQuantity = bTick['last_quantity']
       tick.avgTradedPrice = bTick['average_price']
@@ -79,6 +98,14 @@ class ZerodhaTicker(BaseTicker):
       
     self.onNewTicks(ticks)
 
+  def on_message(self, ws, payload, isBinary):
+    # Raw frames in fast decode mode. Text messages (Ex: order updates) are still parsed by KiteTicker.
+    if isBinary == False or len(payload) <= 4:
+      return
+    ticks = self.tickDecoder.decode(payload)
+    if len(ticks) > 0:
+      self.onNewTicks(ticks)
+
   def on_connect(self, ws, response):
     self.onConnect()
 
@@ -95,4 +122,10 @@ class ZerodhaTicker(BaseTicker):
     self.onMaxReconnectsAttempt()
 
   def on_order_update(self, ws, data):
-    self.onOrderUpdate(data)
+    # convert broker specific order update to our system specific order update (ordermgmt.OrderUpdate)
+    try:
+      orderUpdate = ZerodhaOrderManager.convertToOrderUpdate(data)
+    except Exception as e:
+      logging.error('ZerodhaTicker: Failed to convert order update %s: Error => %s', data, str(e))
+      return
+    self.onOrderUpdate(orderUpdate)
@@ -0,0 +1,4 @@
+
+class BasketFailurePolicy:
+  EXIT_ALL = "EXIT_ALL" # when a leg fails, exit the legs already entered and do not enter the remaining ones
+  KEEP_OTHERS = "KEEP_OTHERS" # when a leg fails, the other legs continue as independent trades
@@ -36,6 +36,8 @@ class Trade:
     self.pnlPercentage = 0 # Profit Loss in percentage terms
     self.exit = 0 # Exit price of the trade
     self.exitReason = None # SL/Target/SquareOff/Any Other
+    self.basketID = None # Set when the trade is a leg of trademgmt.TradeBasket
+    self.basketFailurePolicy = None # failurePolicy of the basket, saved with the trade to rebuild the basket on restart
     
     self.entryOrder = None # Object of Type ordermgmt.Order
     self.slOrder = None # Object of Type ordermgmt.Order
@@ -0,0 +1,55 @@
+from trademgmt.BasketFailurePolicy import BasketFailurePolicy
+
+from utils.Utils import Utils
+
+class TradeBasket:
+  # Linked trades (legs) of a strategy which are entered together, Ex: CE and PE legs of a straddle.
+  # When any leg gets triggered, TradeManager sends the entry orders of all the legs at once and applies
+  # failurePolicy when the entry of a leg fails. Fill times of the legs give the leg to leg fill skew.
+  # Only basketID and failurePolicy are saved with the legs, TradeManager rebuilds the basket from them on restart.
+  def __init__(self, strategy, failurePolicy = BasketFailurePolicy.EXIT_ALL, basketID = None):
+    self.basketID = basketID if basketID != None else Utils.generateTradeID()
+    self.strategy = strategy
+    self.failurePolicy = failurePolicy
+    self.legs = [] # trademgmt.Trade objects
+    self.legToFilledAtMap = {} # tradeID -> epoch seconds at exchange when the entry order of the leg got completely filled
+    self.failedLegIDs = set()
+
+  def addLeg(self, trade):
+    trade.basketID = self.basketID
+    trade.basketFailurePolicy = self.failurePolicy
+    self.legs.append(trade)
+
+  def setLegFilled(self, trade, filledAt):
+    # Returns True when this makes the basket completely filled
+    if trade.tradeID in self.legToFilledAtMap:
+      return False
+    self.legToFilledAtMap[trade.tradeID] = filledAt
+    return self.isFilled()
+
+  def setLegFailed(self, trade):
+    # Returns False if the leg is already marked as failed
+    if trade.tradeID in self.failedLegIDs:
+      return False
+    self.failedLegIDs.add(trade.tradeID)
+    return True
+
+  def getNumFilledLegs(self):
+    return len(self.legToFilledAtMap)
+
+  def isFilled(self):
+    return len(self.legs) > 0 and len(self.legToFilledAtMap) == len(self.legs)
+
+  def isFailed(self):
+    return len(self.failedLegIDs) > 0
+
+  def getFillSkewSeconds(self):
+    # Time between the first and the last leg fills, None till all the legs are filled
+    if self.isFilled() == False:
+      return None
+    filledTimes = self.legToFilledAtMap.values()
+    return max(filledTimes) - min(filledTimes)
+
+  def __str__(self):
+    return "BasketID=" + str(self.basketID) + ", strategy=" + str(self.strategy) + ", legs=" + str(len(self.legs)) \
+      + ", filledLegs=" + str(self.getNumFilledLegs()) + ", failedLegs=" + str(len(self.failedLegIDs))
@@ -0,0 +1,68 @@
+import threading
+
+from trademgmt.TradeState import TradeState
+
+class TradeBook:
+  # Index of untriggered (CREATED) trades keyed by tradingSymbol -> (strategy, direction) -> [trades]
+  # so that the tick path only looks at trades of the ticking symbol instead of scanning all trades.
+  def __init__(self):
+    self.symbolToTradesMap = {}
+    self.lock = threading.RLock()
+
+  def addTrade(self, trade):
+    if trade == None or trade.tradeState != TradeState.CREATED:
+      return
+    with self.lock:
+      strategyTradesMap = self.symbolToTradesMap.setdefault(trade.tradingSymbol, {})
+      trades = strategyTradesMap.setdefault((trade.strategy, trade.direction), [])
+      if trade not in trades:
+        trades.append(trade)
+
+  def removeTrade(self, trade):
+    if trade == None:
+      return
+    with self.lock:
+      strategyTradesMap = self.symbolToTradesMap.get(trade.tradingSymbol)
+      if strategyTradesMap == None:
+        return
+      key = (trade.strategy, trade.direction)
+      trades = strategyTradesMap.get(key)
+      if trades == None:
+        return
+      if trade in trades:
+        trades.remove(trade)
+      if len(trades) == 0:
+        del strategyTradesMap[key]
+      if len(strategyTradesMap) == 0:
+        del self.symbolToTradesMap[trade.tradingSymbol]
+
+  def getUntriggeredTrade(self, tradingSymbol, strategy, direction):
+    with self.lock:
+      strategyTradesMap = self.symbolToTradesMap.get(tradingSymbol)
+      if strategyTradesMap == None:
+        return None
+      trades = strategyTradesMap.get((strategy, direction))
+      if trades == None:
+        return None
+      for trade in list(trades):
+        if trade.tradeState == TradeState.CREATED:
+          return trade
+        # State changed outside of TradeManager, drop it from the index
+        self.removeTrade(trade)
+      return None
+
+  def getStrategies(self, tradingSymbol):
+    # Returns the strategies having untriggered trades for the given symbol
+    with self.lock:
+      strategyTradesMap = self.symbolToTradesMap.get(tradingSymbol)
+      if strategyTradesMap == None:
+        return []
+      strategies = []
+      for (strategy, direction) in strategyTradesMap:
+        if strategy not in strategies:
+          strategies.append(strategy)
+      return strategies
+
+  def clear(self):
+    with self.lock:
+      self.symbolToTradesMap = {}
@@ -6,4 +6,5 @@ class TradeExitReason:
   SQUARE_OFF = "SQUARE OFF"
   SL_CANCELLED = "SL CANCELLED"
   TARGET_CANCELLED = "TARGET CANCELLED"
+  BASKET_LEG_FAILED = "BASKET LEG FAILED"
   
\ No newline at end of file
@@ -0,0 +1,76 @@
+import os
+import logging
+import json
+
+from trademgmt.TradeEncoder import TradeEncoder
+
+class TradeJournal:
+  # Append only journal of trade state changes. Each record is the compact json of one trade as of that change.
+  # Journal is periodically compacted into a snapshot (trades.json) and state is rebuilt as snapshot + journal tail.
+  def __init__(self, tradesDir):
+    self.snapshotFilepath = os.path.join(tradesDir, 'trades.json')
+    self.journalFilepath = os.path.join(tradesDir, 'trades.journal')
+    self.journalFile = None
+    self.numRecords = 0 # number of records appended to journal after the last snapshot
+
+  def append(self, trades):
+    if len(trades) == 0:
+      return
+    if self.journalFile == None:
+      self.journalFile = open(self.journalFilepath, 'a')
+    lines = []
+    for trade in trades:
+      lines.append(json.dumps(trade, cls=TradeEncoder, separators=(',', ':')))
+    self.journalFile.write('\n'.join(lines) + '\n')
+    self.journalFile.flush()
+    os.fsync(self.journalFile.fileno())
+    self.numRecords += len(trades)
+
+  def compact(self, trades):
+    # Write full snapshot atomically and then start a fresh journal
+    TradeJournal.writeSnapshot(self.snapshotFilepath, trades)
+    if self.journalFile != None:
+      self.journalFile.close()
+    self.journalFile = open(self.journalFilepath, 'w')
+    self.numRecords = 0
+    logging.info('TradeJournal: Compacted %d trades into snapshot %s', len(trades), self.snapshotFilepath)
+
+  def load(self):
+    # Returns json data of all trades rebuilt from snapshot and journal tail, in the order they were added
+    tradeIDToDataMap = {}
+    if os.path.exists(self.snapshotFilepath):
+      with open(self.snapshotFilepath, 'r') as sFile:
+        for tr in json.load(sFile):
+          tradeIDToDataMap[tr['tradeID']] = tr
+    self.numRecords = 0
+    if os.path.exists(self.journalFilepath):
+      with open(self.journalFilepath, 'r') as jFile:
+        for line in jFile:
+          line = line.strip()
+          if len(line) == 0:
+            continue
+          try:
+            tr = json.loads(line)
+          except ValueError:
+            # Last record can be partially written in case of a crash
+            logging.warn('TradeJournal: Ignoring corrupted record in journal %s', self.journalFilepath)
+            continue
+          tradeIDToDataMap[tr['tradeID']] = tr
+          self.numRecords += 1
+    logging.info('TradeJournal: Loaded %d trades from snapshot and %d journal records', len(tradeIDToDataMap), self.numRecords)
+    return list(tradeIDToDataMap.values())
+
+  def close(self):
+    if self.journalFile != None:
+      self.journalFile.close()
+      self.journalFile = None
+
+  @staticmethod
+  def writeSnapshot(filepath, trades):
+    # Write to a temp file and rename so that a crash in between does not leave a corrupted file
+    tempFilepath = filepath + '.tmp'
+    with open(tempFilepath, 'w') as tFile:
+      json.dump(trades, tFile, indent=2, cls=TradeEncoder)
+      tFile.flush()
+      os.fsync(tFile.fileno())
+    os.replace(tempFilepath, filepath)
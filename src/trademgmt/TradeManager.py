@@ -1,33 +1,75 @@
 import os
 import logging
-import time
 import json
+import threading
 from datetime import datetime
 
 from config.Config import getServerConfig
+from config.ConfigRegistry import ConfigRegistry
 from core.Controller import Controller
+from core.BrokerRateLimiter import BrokerRateLimiter
+from core.MarketDataTable import MarketDataTable
+from core.Quotes import Quotes
+from instruments.InstrumentRegistry import InstrumentRegistry
 from ticker.ZerodhaTicker import ZerodhaTicker
+from ticker.TickRecorder import TickRecorder
 from trademgmt.Trade import Trade
+from trademgmt.TradeBook import TradeBook
+from trademgmt.TriggerBook import TriggerBook
 from trademgmt.TradeState import TradeState
 from trademgmt.TradeExitReason import TradeExitReason
-from trademgmt.TradeEncoder import TradeEncoder
+from trademgmt.TradeJournal import TradeJournal
+from trademgmt.TradeBasket import TradeBasket
+from trademgmt.BasketFailurePolicy import BasketFailurePolicy
 from ordermgmt.ZerodhaOrderManager import ZerodhaOrderManager
+from ordermgmt.PaperOrderManager import PaperOrderManager
+from ordermgmt.OrderGateway import OrderGateway
 from ordermgmt.OrderInputParams import OrderInputParams
 from ordermgmt.OrderModifyParams import OrderModifyParams
 from ordermgmt.Order import Order
+from ordermgmt.OrderRegistry import OrderRegistry
 from models.OrderType import OrderType
+from models.TickData import TickData
 from models.OrderStatus import OrderStatus
 from models.Direction import Direction
+from models.RequestPriority import RequestPriority
 
 from utils.Utils import Utils
+from utils.Clock import Clock
+from utils.LatencyStats import LatencyStats
+from utils.DeadlineScheduler import DeadlineScheduler
 
 class TradeManager:
   ticker = None
+  tickRecorder = None # set when tick recording is enabled
   trades = [] # to store all the trades
+  tradeBook = TradeBook() # index of untriggered trades by symbol, strategy and direction
+  triggerBook = TriggerBook() # untriggered trades of strategies which declare a trigger price
   strategyToInstanceMap = {}
-  symbolToCMPMap = {}
   intradayTradesDir = None
-  registeredSymbols = []
+  registeredSymbols = set()
+  pendingTickListeners = [] # (listener, symbols) registered before ticker got started
+  orderRegistry = OrderRegistry() # orderId indexed orders of all trades
+  tradesLock = threading.RLock() # serializes trade tracking between order update stream and main thread
+  orderReconcileIntervalSeconds = 120 # broker order book is polled only as a reconciliation pass as order updates come from ticker
+  lastOrderReconcileEpoch = 0
+  tradeJournal = None # set when trades journal is enabled, otherwise full trades.json is written on each save
+  compactJournalAfterRecords = 500
+  dirtyTrades = {} # tradeID -> trade of the trades changed since last save
+  dirtyTradesLock = threading.Lock()
+  orderManager = None # created once on first use, or set to a simulated order manager (Ex: ordermgmt.PaperOrderManager when paper trading)
+  orderManagerLock = threading.Lock()
+  # Order requests are sent by gateway workers and trades are updated on acknowledgement while holding tradesLock.
+  # Executes requests on the calling thread till run() starts the workers (and in replay).
+  orderGateway = OrderGateway(0, tradesLock)
+  baskets = {} # basketID -> trademgmt.TradeBasket
+  basketFillSkew = LatencyStats('basketFillSkew') # time between the first and the last leg fills of a basket
+  # Square off of trades and strategy cut off times fire at their deadlines instead of being checked on every cycle
+  deadlineScheduler = DeadlineScheduler()
+  pendingSquareOffs = [] # square offs fired but not yet flat: {name, reason, startedAt (datetime), lastAttemptEpoch, trades}
+  squareOffReports = [] # {name, numTrades, seconds} of the completed square offs
+  squareOffRetrySeconds = 30 # trades still active this long after square off are squared off again
+  prewarmSecondsBeforeOpen = 10 # broker connections are opened this many seconds before market opens
 
   @staticmethod
   def run():
@@ -39,16 +81,25 @@ class TradeManager:
       logging.info("Cannot start TradeManager as Market is closed for the day.")
       return
 
+    # Open the broker connections just before market opens so that first orders do not pay for connection setup
+    serverConfig = getServerConfig()
+    if serverConfig.get('paperTrading', {}).get('enabled', False) == False:
+      TradeManager.prewarmBeforeMarketOpen()
+
     Utils.waitTillMarketOpens("TradeManager")
 
     # check and create trades directory for today`s date
-    serverConfig = getServerConfig()
     tradesDir = os.path.join(serverConfig['deployDir'], 'trades')
     TradeManager.intradayTradesDir =  os.path.join(tradesDir, Utils.getTodayDateStr())
     if os.path.exists(TradeManager.intradayTradesDir) == False:
       logging.info('TradeManager: Intraday Trades Directory %s does not exist. Hence going to create.', TradeManager.intradayTradesDir)
       os.makedirs(TradeManager.intradayTradesDir)
 
+    journalConfig = serverConfig.get('tradesJournal', {})
+    if journalConfig.get('enabled', False) == True:
+      TradeManager.tradeJournal = TradeJournal(TradeManager.intradayTradesDir)
+      TradeManager.compactJournalAfterRecords = journalConfig.get('compactAfterRecords', TradeManager.compactJournalAfterRecords)
+
     # start ticker service
     brokerName = Controller.getBrokerName()
     if brokerName == "zerodha":
@@ -56,143 +107,423 @@ class TradeManager:
     #elif brokerName == "fyers" # not implemented
     # ticker = FyersTicker()
 
+    tickDispatcherConfig = serverConfig.get('tickDispatcher', {})
+    if tickDispatcherConfig.get('enabled', True) == True:
+      # Process ticks on separate threads so that order placement from tick listener does not block the websocket thread
+      TradeManager.ticker.startTickDispatcher(tickDispatcherConfig.get('numConsumers', 1), tickDispatcherConfig.get('maxPendingSymbols', 5000))
+    paperTradingConfig = serverConfig.get('paperTrading', {})
+    if paperTradingConfig.get('enabled', False) == True:
+      # Orders are matched locally against ticks instead of sending them to broker
+      TradeManager.orderManager = PaperOrderManager(TradeManager.ticker.onOrderUpdate,
+        paperTradingConfig.get('slippagePercentage', 0), paperTradingConfig.get('latencyMillis', 0))
+      TradeManager.ticker.registerRawTicksListener(TradeManager.orderManager.onTicks)
+      logging.info('TradeManager: Paper trading enabled')
+    orderGatewayConfig = serverConfig.get('orderGateway', {})
+    if orderGatewayConfig.get('numWorkers', 4) > 0:
+      TradeManager.orderGateway = OrderGateway(orderGatewayConfig.get('numWorkers', 4), TradeManager.tradesLock)
+
+    tickRecorderConfig = serverConfig.get('tickRecorder', {})
+    if tickRecorderConfig.get('enabled', False) == True:
+      ticksDir = os.path.join(serverConfig['deployDir'], 'ticks', Utils.getTodayDateStr())
+      TradeManager.tickRecorder = TickRecorder(ticksDir, tickRecorderConfig.get('initialCapacity', 65536))
+      TradeManager.ticker.registerRawTicksListener(TradeManager.tickRecorder.onTicks)
     TradeManager.ticker.startTicker()
     TradeManager.ticker.registerListener(TradeManager.tickerListener)
+    TradeManager.ticker.registerOrderUpdateListener(TradeManager.orderUpdateListener)
 
     # sleep for 2 seconds for ticker connection establishment
-    time.sleep(2)
+    Clock.sleep(2)
+
+    # Register the symbol specific tick listeners (Ex: strategies) which came before ticker got started
+    with TradeManager.tradesLock:
+      for (listener, symbols) in TradeManager.pendingTickListeners:
+        TradeManager.registerTickListener(listener, symbols)
+      TradeManager.pendingTickListeners = []
 
     # Load all trades from json files to app memory
     TradeManager.loadAllTradesFromFile()
+    TradeManager.deadlineScheduler.start()
+
+    TradeManager.orderReconcileIntervalSeconds = serverConfig.get('orderReconcileIntervalSeconds', TradeManager.orderReconcileIntervalSeconds)
+    # Settings which can be changed while running get applied when server config is modified
+    ConfigRegistry.subscribe('server', TradeManager.onServerConfigChanged)
 
     # track and update trades in a loop
     while True:
       if Utils.isMarketClosedForTheDay():
         logging.info('TradeManager: Stopping TradeManager as market closed.')
+        TradeManager.deadlineScheduler.stop()
+        TradeManager.orderGateway.stop()
+        TradeManager.saveAllTradesToFile()
+        if TradeManager.tradeJournal != None:
+          TradeManager.tradeJournal.compact(TradeManager.trades)
+          TradeManager.tradeJournal.close()
+        if TradeManager.tickRecorder != None:
+          TradeManager.tickRecorder.close()
         break
 
       try:
-        # Fetch all order details from broker and update orders in each trade
-        TradeManager.fetchAndUpdateAllTradeOrders()
-        # track each trade and take necessary action
-        TradeManager.trackAndUpdateAllTrades()
+        with TradeManager.tradesLock:
+          # Order updates are received from ticker as and when they happen,
+          # fetch all order details from broker only periodically to reconcile any missed updates
+          nowEpoch = Utils.getEpoch()
+          if nowEpoch - TradeManager.lastOrderReconcileEpoch >= TradeManager.orderReconcileIntervalSeconds:
+            TradeManager.fetchAndUpdateAllTradeOrders()
+            TradeManager.lastOrderReconcileEpoch = nowEpoch
+          # track each trade and take necessary action
+          TradeManager.trackAndUpdateAllTrades()
       except Exception as e:
         logging.exception("Exception in TradeManager Main thread")
 
       # save updated data to json file
-      TradeManager.saveAllTradesToFile()
+      try:
+        TradeManager.saveAllTradesToFile()
+      except Exception as e:
+        logging.exception('TradeManager: Failed to save trades, will retry on next cycle')
+
+      if TradeManager.tickRecorder != None:
+        TradeManager.tickRecorder.flush()
+
+      # Reload modified config files so that their subscribers get notified
+      ConfigRegistry.checkForChanges()
+
+      tickDispatcherStats = TradeManager.ticker.getTickDispatcherStats()
+      if tickDispatcherStats != None:
+        logging.info('TradeManager: Tick dispatcher stats %s', tickDispatcherStats)
+      logging.info('TradeManager: Order gateway stats %s', TradeManager.orderGateway.getStats())
+      logging.info('TradeManager: Broker rate limiter stats %s', BrokerRateLimiter.getStats())
+      logging.info('TradeManager: Deadline scheduler stats %s', TradeManager.deadlineScheduler.getStats())
+      if len(TradeManager.baskets) > 0:
+        logging.info('TradeManager: Basket fill skew stats %s', TradeManager.basketFillSkew.getStats())
+      orderManager = TradeManager.getOrderManager()
+      orderManager.keepWarm()
+      orderManagerStats = orderManager.getStats()
+      if orderManagerStats != None:
+        logging.info('TradeManager: Order manager stats %s', orderManagerStats)
       
       # sleep for 30 seconds and then continue
-      time.sleep(30)
+      Clock.sleep(30)
       logging.info('TradeManager: Main thread woke up..')
 
+  @staticmethod
+  def prewarmBeforeMarketOpen():
+    # Connections opened long before market opens would be idle till then, so wait till a few seconds before open
+    waitSeconds = Utils.getEpoch(Utils.getMarketStartTime()) - Utils.getEpoch() - TradeManager.prewarmSecondsBeforeOpen
+    if waitSeconds > 0:
+      logging.info('TradeManager: Waiting for %d seconds to prewarm broker connections before market opens', waitSeconds)
+      Clock.sleep(waitSeconds)
+    try:
+      TradeManager.getOrderManager().prewarm()
+    except Exception as e:
+      logging.exception('TradeManager: Failed to prewarm broker connections')
+
+  @staticmethod
+  def onServerConfigChanged(serverConfig):
+    TradeManager.orderReconcileIntervalSeconds = serverConfig.get('orderReconcileIntervalSeconds', TradeManager.orderReconcileIntervalSeconds)
+    TradeManager.compactJournalAfterRecords = serverConfig.get('tradesJournal', {}).get('compactAfterRecords', TradeManager.compactJournalAfterRecords)
+    logging.info('TradeManager: Applied modified server config, orderReconcileIntervalSeconds = %s, compactJournalAfterRecords = %s',
+      TradeManager.orderReconcileIntervalSeconds, TradeManager.compactJournalAfterRecords)
+    BrokerRateLimiter.applyConfig()
+
   @staticmethod
   def registerStrategy(strategyInstance):
     TradeManager.strategyToInstanceMap[strategyInstance.getName()] = strategyInstance
 
+  @staticmethod
+  def registerSymbols(symbols):
+    # Subscribes the symbols with ticker if not subscribed already
+    newSymbols = []
+    for symbol in symbols:
+      if symbol not in TradeManager.registeredSymbols and symbol not in newSymbols:
+        newSymbols.append(symbol)
+    if len(newSymbols) == 0:
+      return
+    TradeManager.ticker.registerSymbols(newSymbols)
+    TradeManager.registeredSymbols.update(newSymbols)
+
+  @staticmethod
+  def registerTickListener(listener, symbols):
+    # listener gets called only with the ticks of the given symbols
+    with TradeManager.tradesLock:
+      if TradeManager.ticker == None:
+        TradeManager.pendingTickListeners.append((listener, symbols))
+        return
+      TradeManager.ticker.registerListener(listener, symbols)
+      TradeManager.registerSymbols(symbols)
+
   @staticmethod
   def loadAllTradesFromFile():
     tradesFilepath = os.path.join(TradeManager.intradayTradesDir, 'trades.json')
-    if os.path.exists(tradesFilepath) == False:
-      logging.warn('TradeManager: loadAllTradesFromFile() Trades Filepath %s does not exist', tradesFilepath)
-      return
+    if TradeManager.tradeJournal != None:
+      # Rebuild trades from the last snapshot and the journal records appended after it
+      tradesData = TradeManager.tradeJournal.load()
+    else:
+      if os.path.exists(tradesFilepath) == False:
+        logging.warn('TradeManager: loadAllTradesFromFile() Trades Filepath %s does not exist', tradesFilepath)
+        return
+      tFile = open(tradesFilepath, 'r')
+      tradesData = json.loads(tFile.read())
     TradeManager.trades = []
-    tFile = open(tradesFilepath, 'r')
-    tradesData = json.loads(tFile.read())
+    TradeManager.tradeBook.clear()
+    TradeManager.triggerBook.clear()
+    TradeManager.orderRegistry.clear()
+    TradeManager.baskets = {}
     for tr in tradesData:
       trade = TradeManager.convertJSONToTrade(tr)
       logging.info('loadAllTradesFromFile trade => %s', trade)
       TradeManager.trades.append(trade)
-      if trade.tradingSymbol not in TradeManager.registeredSymbols:
-        # Algo register symbols with ticker
-        TradeManager.ticker.registerSymbols([trade.tradingSymbol])
-        TradeManager.registeredSymbols.append(trade.tradingSymbol)
-    logging.info('TradeManager: Successfully loaded %d trades from json file %s', len(TradeManager.trades), tradesFilepath)
+      TradeManager.addUntriggeredTrade(trade)
+      TradeManager.registerOrder(trade.entryOrder, trade)
+      TradeManager.registerOrder(trade.slOrder, trade)
+      TradeManager.registerOrder(trade.targetOrder, trade)
+      # Algo register symbols with ticker
+      TradeManager.registerSymbols([trade.tradingSymbol])
+      TradeManager.scheduleTradeDeadlines(trade)
+    TradeManager.rebuildBaskets()
+    # Nothing changed yet after loading
+    with TradeManager.dirtyTradesLock:
+      TradeManager.dirtyTrades = {}
+    if TradeManager.tradeJournal != None:
+      # Start with a fresh snapshot so that new records are not appended after a partially written record
+      TradeManager.tradeJournal.compact(TradeManager.trades)
+    logging.info('TradeManager: Successfully loaded %d trades from %s', len(TradeManager.trades), TradeManager.intradayTradesDir)
+
+  @staticmethod
+  def rebuildBaskets():
+    # Baskets are kept only in memory, legs of loaded trades are grouped back by their basketID along with
+    # the fills and failures seen before restart. Failure policy is applied by the tracking from here on.
+    for trade in TradeManager.trades:
+      if trade.basketID == None:
+        continue
+      basket = TradeManager.baskets.get(trade.basketID)
+      if basket == None:
+        failurePolicy = trade.basketFailurePolicy if trade.basketFailurePolicy != None else BasketFailurePolicy.EXIT_ALL
+        basket = TradeBasket(trade.strategy, failurePolicy, trade.basketID)
+        TradeManager.baskets[basket.basketID] = basket
+      basket.addLeg(trade)
+      if trade.filledQty > 0 and trade.filledQty >= trade.qty and trade.entryOrder != None:
+        basket.setLegFilled(trade, TradeManager.getFilledAt(trade.entryOrder))
+      if (trade.tradeState == TradeState.CANCELLED or trade.tradeState == TradeState.DISABLED) \
+        and trade.exitReason != TradeExitReason.BASKET_LEG_FAILED:
+        # Entry of this leg failed or it was never entered
+        basket.setLegFailed(trade)
+    if len(TradeManager.baskets) > 0:
+      logging.info('TradeManager: Rebuilt %d baskets from loaded trades', len(TradeManager.baskets))
+
+  @staticmethod
+  def getFilledAt(order):
+    # Exchange time of the last update of the order, time of observing it when broker did not send one
+    return order.lastOrderUpdateTimestamp if order.lastOrderUpdateTimestamp != None else Utils.getEpoch()
 
   @staticmethod
   def saveAllTradesToFile():
-    tradesFilepath = os.path.join(TradeManager.intradayTradesDir, 'trades.json')
-    with open(tradesFilepath, 'w') as tFile:
-      json.dump(TradeManager.trades, tFile, indent=2, cls=TradeEncoder)
-    logging.info('TradeManager: Saved %d trades to file %s', len(TradeManager.trades), tradesFilepath)
+    with TradeManager.dirtyTradesLock:
+      dirtyTrades = list(TradeManager.dirtyTrades.values())
+      TradeManager.dirtyTrades = {}
+    if len(dirtyTrades) == 0:
+      # Nothing changed since last save
+      return
+    try:
+      if TradeManager.tradeJournal != None:
+        # Append only the changed trades and compact the journal into snapshot once in a while
+        TradeManager.tradeJournal.append(dirtyTrades)
+        logging.info('TradeManager: Appended %d changed trades to journal', len(dirtyTrades))
+        if TradeManager.tradeJournal.numRecords >= TradeManager.compactJournalAfterRecords:
+          TradeManager.tradeJournal.compact(TradeManager.trades)
+        return
+      tradesFilepath = os.path.join(TradeManager.intradayTradesDir, 'trades.json')
+      TradeJournal.writeSnapshot(tradesFilepath, TradeManager.trades)
+      logging.info('TradeManager: Saved %d trades to file %s', len(TradeManager.trades), tradesFilepath)
+    except Exception as e:
+      # Changes are written again on the next save
+      with TradeManager.dirtyTradesLock:
+        for trade in dirtyTrades:
+          TradeManager.dirtyTrades.setdefault(trade.tradeID, trade)
+      raise
 
   @staticmethod
-  def addNewTrade(trade):
+  def markTradeDirty(trade):
+    # Trades marked here are written to journal/file on the next save
     if trade == None:
       return
+    with TradeManager.dirtyTradesLock:
+      TradeManager.dirtyTrades[trade.tradeID] = trade
+
+  @staticmethod
+  def addNewTrade(trade):
+    # Returns True if the trade is added, False if it is None or the same trade exists already
+    if trade == None:
+      return False
     logging.info('TradeManager: addNewTrade called for %s', trade)
-    for tr in TradeManager.trades:
-      if tr.equals(trade):
-        logging.warn('TradeManager: Trade already exists so not adding again. %s', trade)
-        return
+    if TradeManager.getExistingTrade(trade) != None:
+      logging.warn('TradeManager: Trade already exists so not adding again. %s', trade)
+      return False
     # Add the new trade to the list
     TradeManager.trades.append(trade)
+    TradeManager.addUntriggeredTrade(trade)
+    TradeManager.markTradeDirty(trade)
     logging.info('TradeManager: trade %s added successfully to the list', trade.tradeID)
     # Register the symbol with ticker so that we will start getting ticks for this symbol
-    if trade.tradingSymbol not in TradeManager.registeredSymbols:
-      TradeManager.ticker.registerSymbols([trade.tradingSymbol])
-      TradeManager.registeredSymbols.append(trade.tradingSymbol)
+    TradeManager.registerSymbols([trade.tradingSymbol])
     # Also add the trade to strategy trades list
-    strategyInstance = TradeManager.strategyToInstanceMap[trade.strategy]
+    strategyInstance = TradeManager.strategyToInstanceMap.get(trade.strategy)
     if strategyInstance != None:
       strategyInstance.addTradeToList(trade)
+      TradeManager.scheduleStrategyDeadlines(strategyInstance)
+    TradeManager.scheduleTradeDeadlines(trade)
+    return True
+
+  @staticmethod
+  def getExistingTrade(trade):
+    for tr in TradeManager.trades:
+      if tr.equals(trade):
+        return tr
+    return None
+
+  @staticmethod
+  def addNewBasket(basket):
+    # Legs are added as trades and get entered together when any one of them is triggered.
+    # Returns True if the basket is added. The whole basket is rejected if any of its legs exists already, as
+    # entering the others without it would leave a partial position. Held under trades lock so that a leg
+    # does not get triggered by ticks before all the legs are added.
+    if basket == None or len(basket.legs) == 0:
+      return False
+    logging.info('TradeManager: addNewBasket called for %s', basket)
+    with TradeManager.tradesLock:
+      for index in range(len(basket.legs)):
+        leg = basket.legs[index]
+        isDuplicate = TradeManager.getExistingTrade(leg) != None
+        for otherLeg in basket.legs[0:index]:
+          if otherLeg.equals(leg):
+            isDuplicate = True
+        if isDuplicate:
+          logging.warn('TradeManager: Basket %s rejected as its leg already exists. %s', basket.basketID, leg)
+          return False
+      TradeManager.baskets[basket.basketID] = basket
+      for leg in basket.legs:
+        if TradeManager.addNewTrade(leg) == False:
+          # Not expected after the above check, the leg is not part of the basket then
+          basket.legs = [l for l in basket.legs if l is not leg]
+      return True
+
+  @staticmethod
+  def getBasket(trade):
+    if trade.basketID == None:
+      return None
+    return TradeManager.baskets.get(trade.basketID)
 
   @staticmethod
   def disableTrade(trade, reason):
     if trade != None:
       logging.info('TradeManager: Going to disable trade ID %s with the reason %s', trade.tradeID, reason)
       trade.tradeState = TradeState.DISABLED
+      TradeManager.removeUntriggeredTrade(trade)
+      TradeManager.markTradeDirty(trade)
+
+  @staticmethod
+  def addUntriggeredTrade(trade):
+    if trade.tradeState != TradeState.CREATED:
+      return
+    # Trades of strategies declaring a trigger price go to trigger book and are evaluated only when the price crosses the trigger
+    strategyInstance = TradeManager.strategyToInstanceMap.get(trade.strategy)
+    trigger = strategyInstance.getTradeTrigger(trade) if strategyInstance != None else None
+    if trigger != None:
+      triggerPrice, side = trigger
+      TradeManager.triggerBook.addTrade(trade, triggerPrice, side)
+    else:
+      TradeManager.tradeBook.addTrade(trade)
+
+  @staticmethod
+  def removeUntriggeredTrade(trade):
+    TradeManager.tradeBook.removeTrade(trade)
+    TradeManager.triggerBook.removeTrade(trade)
 
   @staticmethod
   def tickerListener(tick):
     # logging.info('tickerLister: new tick received for %s = %f', tick.tradingSymbol, tick.lastTradedPrice);
-    TradeManager.symbolToCMPMap[tick.tradingSymbol] = tick.lastTradedPrice # Store the latest tick in map
-    # On each new tick, get a created trade and call its strategy whether to place trade or not
-    for strategy in TradeManager.strategyToInstanceMap:
-      longTrade = TradeManager.getUntriggeredTrade(tick.tradingSymbol, strategy, Direction.LONG)
-      shortTrade = TradeManager.getUntriggeredTrade(tick.tradingSymbol, strategy, Direction.SHORT)
-      if longTrade == None and shortTrade == None:
-        continue
-      strategyInstance = TradeManager.strategyToInstanceMap[strategy]
-      if longTrade != None:
-        if strategyInstance.shouldPlaceTrade(longTrade, tick):
-          # place the longTrade
-          isSuccess = TradeManager.executeTrade(longTrade)
-          if isSuccess == True:
-            # set longTrade state to ACTIVE
-            longTrade.tradeState = TradeState.ACTIVE
-            longTrade.startTimestamp = Utils.getEpoch()
+    # Ticks are processed on tick dispatcher threads, trades are checked and executed holding tradesLock so that a trade
+    # getting disabled or squared off meanwhile (Ex: strategy stop deadline) is not executed
+    with TradeManager.tradesLock:
+      # Latest tick is stored in MarketDataTable by the ticker itself
+      # Trades in trigger book reach the strategy only when the tick crosses their trigger price
+      for trade in TradeManager.triggerBook.getTriggeredTrades(tick.tradingSymbol, tick.lastTradedPrice):
+        if trade.tradeState != TradeState.CREATED:
+          TradeManager.triggerBook.removeTrade(trade)
+          continue
+        strategyInstance = TradeManager.strategyToInstanceMap.get(trade.strategy)
+        if strategyInstance == None:
+          # Trade loaded from file of a strategy not running today
+          continue
+        TradeManager.checkAndExecuteTrade(strategyInstance, trade, tick)
+
+      # On each new tick, get a created trade and call its strategy whether to place trade or not
+      # Only the strategies having untriggered trades for this symbol are looked at
+      for strategy in TradeManager.tradeBook.getStrategies(tick.tradingSymbol):
+        longTrade = TradeManager.getUntriggeredTrade(tick.tradingSymbol, strategy, Direction.LONG)
+        shortTrade = TradeManager.getUntriggeredTrade(tick.tradingSymbol, strategy, Direction.SHORT)
+        if longTrade == None and shortTrade == None:
+          continue
+        strategyInstance = TradeManager.strategyToInstanceMap.get(strategy)
+        if strategyInstance == None:
+          continue
+        if longTrade != None:
+          if TradeManager.checkAndExecuteTrade(strategyInstance, longTrade, tick) == True:
             continue
       
-      if shortTrade != None:
-        if strategyInstance.shouldPlaceTrade(shortTrade, tick):
-          # place the shortTrade
-          isSuccess = TradeManager.executeTrade(shortTrade)
-          if isSuccess == True:
-            # set shortTrade state to ACTIVE
-            shortTrade.tradeState = TradeState.ACTIVE
-            shortTrade.startTimestamp = Utils.getEpoch()
-  
+        if shortTrade != None:
+          TradeManager.checkAndExecuteTrade(strategyInstance, shortTrade, tick)
+
   @staticmethod
-  def getUntriggeredTrade(tradingSymbol, strategy, direction):
-    trade = None
-    for tr in TradeManager.trades:
-      if tr.tradeState == TradeState.DISABLED:
-        continue
-      if tr.tradeState != TradeState.CREATED:
-        continue
-      if tr.tradingSymbol != tradingSymbol:
-        continue
-      if tr.strategy != strategy:
+  def checkAndExecuteTrade(strategyInstance, trade, tick):
+    # Asks the strategy whether to place the trade and sends its entry order.
+    # Returns True if the entry order is sent, trade becomes ACTIVE when the order is placed.
+    if strategyInstance.shouldPlaceTrade(trade, tick) == False:
+      return False
+    basket = TradeManager.getBasket(trade)
+    if basket != None:
+      return TradeManager.executeBasket(basket, strategyInstance, trade)
+    return TradeManager.executeTrade(trade)
+
+  @staticmethod
+  def executeBasket(basket, strategyInstance, triggeredLeg):
+    # Entry orders of all the legs are sent at once instead of waiting for the ticks of the other legs.
+    # The strategy is asked about every other leg with the latest price of its own symbol first, and no leg is sent
+    # unless all of them pass, so that the strategy checks (Ex: max trades per day, cut off time) apply to each leg.
+    logging.info('TradeManager: Execute basket called for %s', basket)
+    for leg in basket.legs:
+      if leg is triggeredLeg:
         continue
-      if tr.direction != direction:
+      if leg.tradeState == TradeState.DISABLED:
+        logging.warn('TradeManager: Not executing basket %s as its leg %s is disabled', basket.basketID, leg.tradeID)
+        return False
+      if leg.tradeState != TradeState.CREATED:
         continue
-      trade = tr
-      break
-    return trade
+      lastTradedPrice = TradeManager.getLastTradedPrice(leg.tradingSymbol)
+      if lastTradedPrice == None:
+        logging.info('TradeManager: Not executing basket %s yet as no tick is received for leg %s', basket.basketID, leg.tradingSymbol)
+        return False
+      legTick = TickData(leg.tradingSymbol)
+      legTick.instrumentId = InstrumentRegistry.getIdBySymbol(leg.tradingSymbol)
+      legTick.lastTradedPrice = lastTradedPrice
+      if strategyInstance.shouldPlaceTrade(leg, legTick) == False:
+        logging.info('TradeManager: Not executing basket %s as strategy did not place its leg %s', basket.basketID, leg.tradeID)
+        return False
+    isSent = False
+    for leg in basket.legs:
+      if leg.tradeState == TradeState.CREATED and TradeManager.executeTrade(leg) == True:
+        isSent = True
+    return isSent
+  
+  @staticmethod
+  def getUntriggeredTrade(tradingSymbol, strategy, direction):
+    return TradeManager.tradeBook.getUntriggeredTrade(tradingSymbol, strategy, direction)
 
   @staticmethod
   def executeTrade(trade):
+    if trade.tradeState != TradeState.CREATED:
+      # Disabled after the strategy decided to place it
+      logging.warn('TradeManager: Not executing trade %s as it is in %s state', trade.tradeID, trade.tradeState)
+      return False
     logging.info('TradeManager: Execute trade called for %s', trade)
     trade.initialStopLoss = trade.stopLoss
     # Create order input params object and place order
@@ -204,39 +535,94 @@ class TradeManager:
     oip.qty = trade.qty
     if trade.isFutures == True or trade.isOptions == True:
       oip.isFnO = True
-    try:
-      trade.entryOrder = TradeManager.getOrderManager().placeOrder(oip)
-    except Exception as e:
-      logging.error('TradeManager: Execute trade failed for tradeID %s: Error => %s', trade.tradeID, str(e))
-      return False
-
-    logging.info('TradeManager: Execute trade successful for %s and entryOrder %s', trade, trade.entryOrder)
-    return True
+    # Not given to strategy again while the entry order is in flight, given back if the order fails
+    TradeManager.removeUntriggeredTrade(trade)
+    def onEntryOrderPlaced(order, error):
+      basket = TradeManager.getBasket(trade)
+      if error != None:
+        logging.error('TradeManager: Execute trade failed for tradeID %s: Error => %s', trade.tradeID, str(error))
+        if basket != None:
+          TradeManager.disableTrade(trade, 'Entry order failed')
+          TradeManager.onBasketLegFailed(basket, trade)
+        else:
+          TradeManager.addUntriggeredTrade(trade)
+        return
+      # Set to ACTIVE even if the trade got disabled meanwhile as the position has to be tracked now
+      trade.entryOrder = order
+      trade.tradeState = TradeState.ACTIVE
+      trade.startTimestamp = Utils.getEpoch()
+      TradeManager.registerOrder(trade.entryOrder, trade)
+      logging.info('TradeManager: Execute trade successful for %s and entryOrder %s', trade, trade.entryOrder)
+      if basket != None and basket.isFailed() and basket.failurePolicy == BasketFailurePolicy.EXIT_ALL:
+        # Another leg failed while this one was in flight
+        TradeManager.exitBasketLeg(trade)
+      elif TradeManager.isSquareOffDue(trade):
+        # Square off deadline fired while the entry order was in flight
+        TradeManager.squareOffTrades('LateSquareOff', [trade])
+    return TradeManager.orderGateway.submit(('entry', trade.tradeID),
+      lambda: TradeManager.getOrderManager().placeOrder(oip), onEntryOrderPlaced, RequestPriority.ENTRY)
 
   @staticmethod
   def fetchAndUpdateAllTradeOrders():
-    allOrders = []
-    for trade in TradeManager.trades:
-      if trade.entryOrder != None:
-        allOrders.append(trade.entryOrder)
-      if trade.slOrder != None:
-        allOrders.append(trade.slOrder)
-      if trade.targetOrder != None:
-        allOrders.append(trade.targetOrder)
+    # Reconcile all orders with broker order book and track the trades of only the changed orders
+    changedOrders = TradeManager.getOrderManager().fetchAndUpdateAllOrderDetails(TradeManager.orderRegistry.getOrdersMap())
+    changedTrades = []
+    for order in changedOrders:
+      trade = TradeManager.orderRegistry.getTrade(order.orderId)
+      if trade != None and trade not in changedTrades:
+        changedTrades.append(trade)
+    for trade in changedTrades:
+      TradeManager.markTradeDirty(trade)
+      TradeManager.trackTrade(trade)
+
+  @staticmethod
+  def registerOrder(order, trade):
+    if order == None:
+      return
+    orderUpdate = TradeManager.orderRegistry.registerOrder(order, trade)
+    TradeManager.markTradeDirty(trade)
+    if orderUpdate != None:
+      # Update for this order arrived before it got registered
+      TradeManager.orderUpdateListener(orderUpdate)
 
-    TradeManager.getOrderManager().fetchAndUpdateAllOrderDetails(allOrders)
+  @staticmethod
+  def orderUpdateListener(orderUpdate):
+    # Called by ticker on order updates from broker. Updates the order and tracks its trade right away
+    # instead of waiting for the next order book fetch.
+    with TradeManager.tradesLock:
+      order = TradeManager.orderRegistry.getOrder(orderUpdate.orderId)
+      if order == None:
+        # Either not an algo order or update received before the order got registered
+        TradeManager.orderRegistry.addUnmatchedUpdate(orderUpdate)
+        return
+      if order.applyUpdate(orderUpdate) == False:
+        return
+      logging.info('TradeManager: Order update received for %s', order)
+      trade = TradeManager.orderRegistry.getTrade(orderUpdate.orderId)
+      TradeManager.markTradeDirty(trade)
+      TradeManager.trackTrade(trade)
+
+  @staticmethod
+  def trackTrade(trade):
+    if trade == None or trade.tradeState != TradeState.ACTIVE:
+      return
+    TradeManager.trackEntryOrder(trade)
+    TradeManager.trackSLOrder(trade)
+    TradeManager.trackTargetOrder(trade)
 
   @staticmethod
   def trackAndUpdateAllTrades():
+    lateSquareOffTrades = []
     for trade in TradeManager.trades:
       if trade.tradeState == TradeState.ACTIVE:
         TradeManager.trackEntryOrder(trade)
         TradeManager.trackSLOrder(trade)
         TradeManager.trackTargetOrder(trade)
-        if trade.intradaySquareOffTimestamp != None:
-          nowEpoch = Utils.getEpoch()
-          if nowEpoch >= trade.intradaySquareOffTimestamp:
-            TradeManager.squareOffTrade(trade, TradeExitReason.SQUARE_OFF)
+        if TradeManager.isSquareOffDue(trade):
+          lateSquareOffTrades.append(trade)
+    # Fallback for the trades which became active after their square off deadline fired
+    TradeManager.squareOffTrades('LateSquareOff', lateSquareOffTrades)
+    TradeManager.retryPendingSquareOffs()
 
   @staticmethod
   def trackEntryOrder(trade):
@@ -246,15 +632,68 @@ class TradeManager:
     if trade.entryOrder == None:
       return
 
+    prevState = (trade.tradeState, trade.filledQty, trade.entry, trade.cmp)
     if trade.entryOrder.orderStatus == OrderStatus.CANCELLED or trade.entryOrder.orderStatus == OrderStatus.REJECTED:
       trade.tradeState = TradeState.CANCELLED
+      TradeManager.onTradeClosed(trade)
 
     trade.filledQty = trade.entryOrder.filledQty
     if trade.filledQty > 0:
       trade.entry = trade.entryOrder.averagePrice
     # Update the current market price and calculate pnl
-    trade.cmp = TradeManager.symbolToCMPMap[trade.tradingSymbol]
+    lastTradedPrice = TradeManager.getLastTradedPrice(trade.tradingSymbol)
+    if lastTradedPrice != None:
+      trade.cmp = lastTradedPrice
     Utils.calculateTradePnl(trade)
+    if prevState != (trade.tradeState, trade.filledQty, trade.entry, trade.cmp):
+      TradeManager.markTradeDirty(trade)
+    if trade.basketID != None:
+      TradeManager.trackBasketLeg(trade)
+
+  @staticmethod
+  def trackBasketLeg(trade):
+    basket = TradeManager.getBasket(trade)
+    if basket == None:
+      return
+    if trade.tradeState == TradeState.CANCELLED:
+      if trade.exitReason != TradeExitReason.BASKET_LEG_FAILED:
+        TradeManager.onBasketLegFailed(basket, trade)
+    elif trade.filledQty > 0 and trade.filledQty >= trade.qty:
+      if basket.setLegFilled(trade, TradeManager.getFilledAt(trade.entryOrder)) == True:
+        fillSkewSeconds = basket.getFillSkewSeconds()
+        TradeManager.basketFillSkew.record(fillSkewSeconds)
+        logging.info('TradeManager: All legs filled for %s with fill skew of %.3f seconds', basket, fillSkewSeconds)
+      if basket.isFailed() and basket.failurePolicy == BasketFailurePolicy.EXIT_ALL and trade.exitReason == None:
+        # Entry got filled after another leg failed
+        TradeManager.exitBasketLeg(trade)
+
+  @staticmethod
+  def onBasketLegFailed(basket, trade):
+    if basket.setLegFailed(trade) == False:
+      return
+    logging.error('TradeManager: Leg tradeID %s of %s failed, applying %s policy', trade.tradeID, basket, basket.failurePolicy)
+    if basket.failurePolicy != BasketFailurePolicy.EXIT_ALL:
+      return
+    for leg in basket.legs:
+      if leg == trade:
+        continue
+      if leg.tradeState == TradeState.CREATED:
+        # Leg with entry order in flight gets exited when the order is placed
+        TradeManager.disableTrade(leg, 'Basket leg ' + trade.tradeID + ' failed')
+      elif leg.tradeState == TradeState.ACTIVE:
+        TradeManager.exitBasketLeg(leg)
+
+  @staticmethod
+  def exitBasketLeg(trade):
+    if trade.tradeState != TradeState.ACTIVE:
+      return
+    if trade.filledQty > 0:
+      TradeManager.squareOffTrade(trade, TradeExitReason.BASKET_LEG_FAILED)
+      return
+    # Nothing to square off yet, the leg gets squared off if its entry order fills before it is cancelled
+    trade.exitReason = TradeExitReason.BASKET_LEG_FAILED
+    TradeManager.markTradeDirty(trade)
+    TradeManager.cancelEntryOrder(trade)
 
   @staticmethod
   def trackSLOrder(trade):
@@ -277,7 +716,9 @@ class TradeManager:
       elif trade.slOrder.orderStatus == OrderStatus.CANCELLED:
         # SL order cancelled outside of algo (manually or by broker or by exchange)
         logging.error('SL order %s for tradeID %s cancelled outside of Algo. Setting the trade as completed with exit price as current market price.', trade.slOrder.orderId, trade.tradeID)
-        exit = TradeManager.symbolToCMPMap[trade.tradingSymbol]
+        exit = TradeManager.getExitPrice(trade)
+        if exit == None:
+          return
         TradeManager.setTradeToCompleted(trade, exit, TradeExitReason.SL_CANCELLED)
         # Cancel target order if exists
         TradeManager.cancelTargetOrder(trade)
@@ -288,7 +729,7 @@ class TradeManager:
   @staticmethod
   def checkAndUpdateTrailSL(trade):
     # Trail the SL if applicable for the trade
-    strategyInstance = TradeManager.strategyToInstanceMap[trade.strategy]
+    strategyInstance = TradeManager.strategyToInstanceMap.get(trade.strategy)
     if strategyInstance == None:
       return
 
@@ -302,13 +743,17 @@ class TradeManager:
     if updateSL == True:
       omp = OrderModifyParams()
       omp.newTriggerPrice = newTrailSL
-      try:
-        oldSL = trade.stopLoss
-        TradeManager.getOrderManager().modifyOrder(trade.slOrder, omp)
-        logging.info('TradeManager: Trail SL: Successfully modified stopLoss from %f to %f for tradeID %s', oldSL, newTrailSL, trade.tradeID)
+      slOrder = trade.slOrder
+      def onSLOrderModified(result, error):
+        if error != None:
+          logging.error('TradeManager: Failed to modify SL order for tradeID %s orderId %s: Error => %s', trade.tradeID, slOrder.orderId, str(error))
+          return
+        logging.info('TradeManager: Trail SL: Successfully modified stopLoss from %f to %f for tradeID %s', trade.stopLoss, newTrailSL, trade.tradeID)
         trade.stopLoss = newTrailSL # IMPORTANT: Dont forget to update this on successful modification
-      except Exception as e:
-        logging.error('TradeManager: Failed to modify SL order for tradeID %s orderId %s: Error => %s', trade.tradeID, trade.slOrder.orderId, str(e))
+        TradeManager.markTradeDirty(trade)
+      # Next trail is sent by a later tracking cycle if this one is still in flight
+      TradeManager.orderGateway.submit(('trailSL', trade.tradeID),
+        lambda: TradeManager.getOrderManager().modifyOrder(slOrder, omp), onSLOrderModified, RequestPriority.EXIT)
 
   @staticmethod
   def trackTargetOrder(trade):
@@ -330,7 +775,9 @@ class TradeManager:
       elif trade.targetOrder.orderStatus == OrderStatus.CANCELLED:
         # Target order cancelled outside of algo (manually or by broker or by exchange)
         logging.error('Target order %s for tradeID %s cancelled outside of Algo. Setting the trade as completed with exit price as current market price.', trade.targetOrder.orderId, trade.tradeID)
-        exit = TradeManager.symbolToCMPMap[trade.tradingSymbol]
+        exit = TradeManager.getExitPrice(trade)
+        if exit == None:
+          return
         TradeManager.setTradeToCompleted(trade, exit, TradeExitReason.TARGET_CANCELLED)
         # Cancel SL order
         TradeManager.cancelSLOrder(trade)
@@ -341,17 +788,23 @@ class TradeManager:
     oip.direction = Direction.SHORT if trade.direction == Direction.LONG else Direction.LONG 
     oip.productType = trade.productType
     oip.orderType = OrderType.SL_MARKET
+    oip.isExit = True
     oip.triggerPrice = trade.stopLoss
     oip.qty = trade.qty
     if trade.isFutures == True or trade.isOptions == True:
       oip.isFnO = True
-    try:
-      trade.slOrder = TradeManager.getOrderManager().placeOrder(oip)
-    except Exception as e:
-      logging.error('TradeManager: Failed to place SL order for tradeID %s: Error => %s', trade.tradeID, str(e))
-      return False
-    logging.info('TradeManager: Successfully placed SL order %s for tradeID %s', trade.slOrder.orderId, trade.tradeID)
-    return True
+    def onSLOrderPlaced(order, error):
+      if error != None:
+        logging.error('TradeManager: Failed to place SL order for tradeID %s: Error => %s', trade.tradeID, str(error))
+        return
+      trade.slOrder = order
+      TradeManager.registerOrder(trade.slOrder, trade)
+      logging.info('TradeManager: Successfully placed SL order %s for tradeID %s', trade.slOrder.orderId, trade.tradeID)
+      if trade.tradeState != TradeState.ACTIVE:
+        # Trade exited while the order was in flight
+        TradeManager.cancelSLOrder(trade)
+    return TradeManager.orderGateway.submit(('sl', trade.tradeID),
+      lambda: TradeManager.getOrderManager().placeOrder(oip), onSLOrderPlaced, RequestPriority.EXIT)
 
   @staticmethod
   def placeTargetOrder(trade, isMarketOrder = False):
@@ -360,16 +813,23 @@ class TradeManager:
     oip.productType = trade.productType
     oip.orderType = OrderType.MARKET if isMarketOrder == True else OrderType.LIMIT
     oip.price = 0 if isMarketOrder == True else trade.target
+    oip.isExit = True
     oip.qty = trade.qty
     if trade.isFutures == True or trade.isOptions == True:
       oip.isFnO = True
-    try:
-      trade.targetOrder = TradeManager.getOrderManager().placeOrder(oip)
-    except Exception as e:
-      logging.error('TradeManager: Failed to place Target order for tradeID %s: Error => %s', trade.tradeID, str(e))
-      return False
-    logging.info('TradeManager: Successfully placed Target order %s for tradeID %s', trade.targetOrder.orderId, trade.tradeID)
-    return True
+    def onTargetOrderPlaced(order, error):
+      if error != None:
+        logging.error('TradeManager: Failed to place Target order for tradeID %s: Error => %s', trade.tradeID, str(error))
+        return
+      trade.targetOrder = order
+      TradeManager.registerOrder(trade.targetOrder, trade)
+      logging.info('TradeManager: Successfully placed Target order %s for tradeID %s', trade.targetOrder.orderId, trade.tradeID)
+      if trade.tradeState != TradeState.ACTIVE:
+        # Trade exited while the order was in flight
+        TradeManager.cancelTargetOrder(trade)
+    # While a LIMIT target order is in flight a square off MARKET order is dropped, next cycle modifies the placed order to MARKET
+    return TradeManager.orderGateway.submit(('target', trade.tradeID),
+      lambda: TradeManager.getOrderManager().placeOrder(oip), onTargetOrderPlaced, RequestPriority.EXIT)
 
   @staticmethod
   def cancelEntryOrder(trade):
@@ -377,11 +837,7 @@ class TradeManager:
       return
     if trade.entryOrder.orderStatus == OrderStatus.CANCELLED:
       return
-    try:
-      TradeManager.getOrderManager().cancelOrder(trade.entryOrder)
-    except Exception as e:
-      logging.error('TradeManager: Failed to cancel Entry order %s for tradeID %s: Error => %s', trade.entryOrder.orderId, trade.tradeID, str(e))
-    logging.info('TradeManager: Successfully cancelled Entry order %s for tradeID %s', trade.entryOrder.orderId, trade.tradeID)
+    TradeManager.cancelOrder(trade, trade.entryOrder, 'Entry')
 
   @staticmethod
   def cancelSLOrder(trade):
@@ -389,11 +845,7 @@ class TradeManager:
       return
     if trade.slOrder.orderStatus == OrderStatus.CANCELLED:
       return
-    try:
-      TradeManager.getOrderManager().cancelOrder(trade.slOrder)
-    except Exception as e:
-      logging.error('TradeManager: Failed to cancel SL order %s for tradeID %s: Error => %s', trade.slOrder.orderId, trade.tradeID, str(e))
-    logging.info('TradeManager: Successfully cancelled SL order %s for tradeID %s', trade.slOrder.orderId, trade.tradeID)
+    TradeManager.cancelOrder(trade, trade.slOrder, 'SL')
 
   @staticmethod
   def cancelTargetOrder(trade):
@@ -401,11 +853,17 @@ class TradeManager:
       return
     if trade.targetOrder.orderStatus == OrderStatus.CANCELLED:
       return
-    try:
-      TradeManager.getOrderManager().cancelOrder(trade.targetOrder)
-    except Exception as e:
-      logging.error('TradeManager: Failed to cancel Target order %s for tradeID %s: Error => %s', trade.targetOrder.orderId, trade.tradeID, str(e))
-    logging.info('TradeManager: Successfully cancelled Target order %s for tradeID %s', trade.targetOrder.orderId, trade.tradeID)
+    TradeManager.cancelOrder(trade, trade.targetOrder, 'Target')
+
+  @staticmethod
+  def cancelOrder(trade, order, orderName):
+    def onOrderCancelled(result, error):
+      if error != None:
+        logging.error('TradeManager: Failed to cancel %s order %s for tradeID %s: Error => %s', orderName, order.orderId, trade.tradeID, str(error))
+        return
+      logging.info('TradeManager: Successfully cancelled %s order %s for tradeID %s', orderName, order.orderId, trade.tradeID)
+    TradeManager.orderGateway.submit(('cancel', order.orderId),
+      lambda: TradeManager.getOrderManager().cancelOrder(order), onOrderCancelled, RequestPriority.EXIT)
 
   @staticmethod
   def setTradeToCompleted(trade, exit, exitReason = None):
@@ -414,6 +872,8 @@ class TradeManager:
     trade.exitReason = exitReason if trade.exitReason == None else trade.exitReason
     trade.endTimestamp = Utils.getEpoch()
     trade = Utils.calculateTradePnl(trade)
+    TradeManager.markTradeDirty(trade)
+    TradeManager.onTradeClosed(trade)
     logging.info('TradeManager: setTradeToCompleted strategy = %s, symbol = %s, qty = %d, entry = %f, exit = %f, pnl = %f, exit reason = %s', trade.strategy, trade.tradingSymbol, trade.filledQty, trade.entry, trade.exit, trade.pnl, trade.exitReason)
 
   @staticmethod
@@ -423,6 +883,7 @@ class TradeManager:
       return
 
     trade.exitReason = reason
+    TradeManager.markTradeDirty(trade)
     if trade.entryOrder != None:
       if trade.entryOrder.orderStatus == OrderStatus.OPEN:
         # Cancel entry order if it is still open (not filled or partially filled case)
@@ -434,20 +895,132 @@ class TradeManager:
     if trade.targetOrder != None:
       # Change target order type to MARKET to exit position immediately
       logging.info('TradeManager: changing target order %s to MARKET to exit position for tradeID %s', trade.targetOrder.orderId, trade.tradeID)
-      TradeManager.getOrderManager().modifyOrderToMarket(trade.targetOrder)
+      targetOrder = trade.targetOrder
+      def onTargetOrderModified(result, error):
+        if error != None:
+          logging.error('TradeManager: Failed to change target order %s to MARKET for tradeID %s: Error => %s', targetOrder.orderId, trade.tradeID, str(error))
+      TradeManager.orderGateway.submit(('toMarket', targetOrder.orderId),
+        lambda: TradeManager.getOrderManager().modifyOrderToMarket(targetOrder), onTargetOrderModified, RequestPriority.EXIT)
     else:
       # Place new target order to exit position
       logging.info('TradeManager: placing new target order to exit position for tradeID %s', trade.tradeID)
       TradeManager.placeTargetOrder(trade, True)
 
+  @staticmethod
+  def scheduleTradeDeadlines(trade):
+    if trade.intradaySquareOffTimestamp == None:
+      return
+    if trade.tradeState != TradeState.CREATED and trade.tradeState != TradeState.ACTIVE:
+      return
+    TradeManager.scheduleSquareOff(trade.intradaySquareOffTimestamp)
+
+  @staticmethod
+  def scheduleStrategyDeadlines(strategyInstance):
+    strategy = strategyInstance.getName()
+    if strategyInstance.stopTimestamp != None:
+      TradeManager.deadlineScheduler.schedule(Utils.getEpoch(strategyInstance.stopTimestamp), ('stop', strategy),
+        lambda: TradeManager.onStrategyStopDeadline(strategy))
+    if strategyInstance.squareOffTimestamp != None:
+      TradeManager.scheduleSquareOff(Utils.getEpoch(strategyInstance.squareOffTimestamp))
+
+  @staticmethod
+  def scheduleSquareOff(squareOffEpoch):
+    # Trades and strategies having the same square off time are squared off together by one deadline
+    TradeManager.deadlineScheduler.schedule(squareOffEpoch, ('squareOff', squareOffEpoch),
+      lambda: TradeManager.onSquareOffDeadline(squareOffEpoch))
+
+  @staticmethod
+  def onSquareOffDeadline(squareOffEpoch):
+    # Squares off the active trades due by their own square off time or by the square off time of their strategy
+    with TradeManager.tradesLock:
+      trades = []
+      for trade in TradeManager.trades:
+        if trade.tradeState != TradeState.ACTIVE:
+          continue
+        strategyInstance = TradeManager.strategyToInstanceMap.get(trade.strategy)
+        strategySquareOffTimestamp = strategyInstance.squareOffTimestamp if strategyInstance != None else None
+        if (trade.intradaySquareOffTimestamp != None and trade.intradaySquareOffTimestamp <= squareOffEpoch) \
+          or (strategySquareOffTimestamp != None and Utils.getEpoch(strategySquareOffTimestamp) <= squareOffEpoch):
+          trades.append(trade)
+      TradeManager.squareOffTrades('SquareOff@' + datetime.fromtimestamp(squareOffEpoch).strftime('%H:%M:%S'), trades)
+
+  @staticmethod
+  def isSquareOffDue(trade):
+    # True if an active trade not being exited yet is past its own or its strategy square off time
+    if trade.tradeState != TradeState.ACTIVE or trade.exitReason != None:
+      return False
+    nowEpoch = Utils.getEpoch()
+    if trade.intradaySquareOffTimestamp != None and trade.intradaySquareOffTimestamp <= nowEpoch:
+      return True
+    strategyInstance = TradeManager.strategyToInstanceMap.get(trade.strategy)
+    if strategyInstance != None and strategyInstance.squareOffTimestamp != None:
+      return Utils.getEpoch(strategyInstance.squareOffTimestamp) <= nowEpoch
+    return False
+
+  @staticmethod
+  def onStrategyStopDeadline(strategy):
+    # No new trades after stop timestamp, untriggered trades are disabled right away instead of on their next tick
+    with TradeManager.tradesLock:
+      for trade in TradeManager.getAllTradesByStrategy(strategy):
+        if trade.tradeState == TradeState.CREATED and TradeManager.orderGateway.isInFlight(('entry', trade.tradeID)) == False:
+          TradeManager.disableTrade(trade, 'NoNewTradesCutOffTimeReached')
+
+  @staticmethod
+  def squareOffTrades(name, trades, reason = TradeExitReason.SQUARE_OFF):
+    # Exit orders of all the trades are sent through order gateway at once, time taken till all of them are
+    # closed is reported once the last one closes
+    if len(trades) == 0:
+      return
+    logging.info('TradeManager: %s squaring off %d trades', name, len(trades))
+    squareOff = {'name': name, 'reason': reason, 'startedAt': Clock.now(), 'lastAttemptEpoch': Utils.getEpoch(), 'trades': trades}
+    TradeManager.pendingSquareOffs.append(squareOff)
+    for trade in trades:
+      TradeManager.squareOffTrade(trade, reason)
+    TradeManager.checkSquareOffCompleted(squareOff)
+
+  @staticmethod
+  def onTradeClosed(trade):
+    for squareOff in list(TradeManager.pendingSquareOffs):
+      if trade in squareOff['trades']:
+        TradeManager.checkSquareOffCompleted(squareOff)
+
+  @staticmethod
+  def checkSquareOffCompleted(squareOff):
+    for trade in squareOff['trades']:
+      if trade.tradeState == TradeState.ACTIVE:
+        return
+    if squareOff not in TradeManager.pendingSquareOffs:
+      return
+    TradeManager.pendingSquareOffs.remove(squareOff)
+    seconds = (Clock.now() - squareOff['startedAt']).total_seconds()
+    report = {'name': squareOff['name'], 'numTrades': len(squareOff['trades']), 'seconds': seconds}
+    TradeManager.squareOffReports.append(report)
+    logging.info('TradeManager: %s flattened %d trades in %.3f seconds', report['name'], report['numTrades'], seconds)
+
+  @staticmethod
+  def retryPendingSquareOffs():
+    # Exit orders can fail or get dropped (Ex: while a target order is in flight), send them again periodically
+    nowEpoch = Utils.getEpoch()
+    for squareOff in list(TradeManager.pendingSquareOffs):
+      if nowEpoch - squareOff['lastAttemptEpoch'] < TradeManager.squareOffRetrySeconds:
+        continue
+      squareOff['lastAttemptEpoch'] = nowEpoch
+      for trade in squareOff['trades']:
+        if trade.tradeState == TradeState.ACTIVE:
+          logging.warn('TradeManager: %s retrying square off of tradeID %s', squareOff['name'], trade.tradeID)
+          TradeManager.squareOffTrade(trade, squareOff['reason'])
+
   @staticmethod
   def getOrderManager():
-    orderManager = None
-    brokerName = Controller.getBrokerName()
-    if brokerName == "zerodha":
-      orderManager = ZerodhaOrderManager()
-    #elif brokerName == "fyers": # Not implemented
-    return orderManager
+    if TradeManager.orderManager != None:
+      return TradeManager.orderManager
+    with TradeManager.orderManagerLock:
+      if TradeManager.orderManager == None:
+        brokerName = Controller.getBrokerName()
+        if brokerName == "zerodha":
+          TradeManager.orderManager = ZerodhaOrderManager()
+        #elif brokerName == "fyers": # Not implemented
+    return TradeManager.orderManager
 
   @staticmethod
   def getNumberOfTradesPlacedByStrategy(strategy):
@@ -456,7 +1029,9 @@ class TradeManager:
       if trade.strategy != strategy:
         continue
       if trade.tradeState == TradeState.CREATED or trade.tradeState == TradeState.DISABLED:
-        continue
+        # Trade with entry order in flight becomes ACTIVE once the order is placed
+        if TradeManager.orderGateway.isInFlight(('entry', trade.tradeID)) == False:
+          continue
       # consider active/completed/cancelled trades as trades placed
       count += 1
     return count
@@ -498,6 +1073,8 @@ class TradeManager:
     trade.pnlPercentage = jsonData['pnlPercentage']
     trade.exit = jsonData['exit']
     trade.exitReason = jsonData['exitReason']
+    trade.basketID = jsonData.get('basketID') # not present in the files saved before baskets
+    trade.basketFailurePolicy = jsonData.get('basketFailurePolicy')
     trade.exchange = jsonData['exchange']
     trade.entryOrder = TradeManager.convertJSONToOrder(jsonData['entryOrder'])
     trade.slOrder = TradeManager.convertJSONToOrder(jsonData['slOrder'])
@@ -528,4 +1105,23 @@ class TradeManager:
 
   @staticmethod
   def getLastTradedPrice(tradingSymbol):
-    return TradeManager.symbolToCMPMap[tradingSymbol]
+    # Returns None if no tick is received yet for the symbol
+    instrumentId = InstrumentRegistry.getIdBySymbol(tradingSymbol)
+    if instrumentId == None:
+      return None
+    lastTradedPrice = MarketDataTable.getLastTradedPrice(instrumentId)
+    return lastTradedPrice if lastTradedPrice > 0 else None
+
+  @staticmethod
+  def getExitPrice(trade):
+    # Price to complete the trade with when it got exited outside of algo. Falls back to broker quote
+    # when no tick is received for the symbol. Returns None if that fails too, trade is completed on a later cycle then.
+    lastTradedPrice = TradeManager.getLastTradedPrice(trade.tradingSymbol)
+    if lastTradedPrice != None:
+      return lastTradedPrice
+    try:
+      quote = Quotes.getQuote(trade.tradingSymbol, trade.isFutures == True or trade.isOptions == True)
+      return quote.lastTradedPrice
+    except Exception as e:
+      logging.error('TradeManager: Failed to get exit price of tradeID %s: Error => %s', trade.tradeID, str(e))
+      return None
@@ -0,0 +1,97 @@
+import bisect
+import threading
+
+from trademgmt.TriggerSide import TriggerSide
+
+class TriggerBook:
+  # Sorted price levels of untriggered trades per symbol and side. On a tick only the levels
+  # crossed by the last traded price since the previous tick of the symbol are picked up via bisect,
+  # so ticks which do not cross any level never reach strategy code.
+  def __init__(self):
+    self.symbolToLevelsMap = {} # tradingSymbol -> { side -> [prices, trades] } with prices sorted ascending
+    self.tradeIDToLevelMap = {} # tradeID -> (tradingSymbol, side, price)
+    self.symbolToLastPriceMap = {} # tradingSymbol -> last traded price of the previous tick
+    self.symbolToNewTradesMap = {} # tradingSymbol -> [(trade, side, price)] added since the previous tick
+    self.lock = threading.RLock()
+
+  def addTrade(self, trade, triggerPrice, side):
+    if trade == None:
+      return
+    with self.lock:
+      if trade.tradeID in self.tradeIDToLevelMap:
+        return
+      sideToLevelsMap = self.symbolToLevelsMap.setdefault(trade.tradingSymbol, {})
+      levels = sideToLevelsMap.setdefault(side, [[], []])
+      prices, trades = levels
+      # insert after the levels with the same price to keep the order in which trades are added
+      index = bisect.bisect_right(prices, triggerPrice)
+      prices.insert(index, triggerPrice)
+      trades.insert(index, trade)
+      self.tradeIDToLevelMap[trade.tradeID] = (trade.tradingSymbol, side, triggerPrice)
+      # Price may already be beyond the level of a new trade (Ex: re-added after its order failed), such a trade
+      # is checked once against the next tick
+      self.symbolToNewTradesMap.setdefault(trade.tradingSymbol, []).append((trade, side, triggerPrice))
+
+  def removeTrade(self, trade):
+    if trade == None:
+      return
+    with self.lock:
+      level = self.tradeIDToLevelMap.pop(trade.tradeID, None)
+      if level == None:
+        return
+      tradingSymbol, side, triggerPrice = level
+      sideToLevelsMap = self.symbolToLevelsMap[tradingSymbol]
+      prices, trades = sideToLevelsMap[side]
+      index = bisect.bisect_left(prices, triggerPrice)
+      while index < len(prices) and prices[index] == triggerPrice:
+        if trades[index] is trade:
+          del prices[index]
+          del trades[index]
+          break
+        index += 1
+      if len(prices) == 0:
+        del sideToLevelsMap[side]
+      if len(sideToLevelsMap) == 0:
+        del self.symbolToLevelsMap[tradingSymbol]
+
+  def hasTrade(self, trade):
+    return trade != None and trade.tradeID in self.tradeIDToLevelMap
+
+  def getTriggeredTrades(self, tradingSymbol, lastTradedPrice):
+    # Returns the trades whose trigger levels are crossed since the previous tick of the symbol:
+    # ABOVE levels with prevLTP <= level < LTP and BELOW levels with LTP < level <= prevLTP, plus the newly added trades
+    # whose level the price is beyond. On the first tick of a symbol all the levels the price is beyond are returned. A trade declined by its strategy is not returned again till the price crosses its level again.
+    with self.lock:
+      prevLastTradedPrice = self.symbolToLastPriceMap.get(tradingSymbol)
+      self.symbolToLastPriceMap[tradingSymbol] = lastTradedPrice
+      newTrades = self.symbolToNewTradesMap.pop(tradingSymbol, None)
+      sideToLevelsMap = self.symbolToLevelsMap.get(tradingSymbol)
+      if sideToLevelsMap == None:
+        return []
+      triggeredTrades = []
+      levels = sideToLevelsMap.get(TriggerSide.ABOVE)
+      if levels != None:
+        end = bisect.bisect_left(levels[0], lastTradedPrice)
+        start = 0 if prevLastTradedPrice == None else bisect.bisect_left(levels[0], prevLastTradedPrice)
+        if start < end:
+          triggeredTrades.extend(levels[1][start:end])
+      levels = sideToLevelsMap.get(TriggerSide.BELOW)
+      if levels != None:
+        start = bisect.bisect_right(levels[0], lastTradedPrice)
+        end = len(levels[0]) if prevLastTradedPrice == None else bisect.bisect_right(levels[0], prevLastTradedPrice)
+        if start < end:
+          triggeredTrades.extend(levels[1][start:end])
+      if newTrades != None:
+        for (trade, side, triggerPrice) in newTrades:
+          if trade.tradeID not in self.tradeIDToLevelMap or trade in triggeredTrades:
+            continue
+          if (side == TriggerSide.ABOVE and lastTradedPrice > triggerPrice) or (side == TriggerSide.BELOW and lastTradedPrice < triggerPrice):
+            triggeredTrades.append(trade)
+      return triggeredTrades
+
+  def clear(self):
+    with self.lock:
+      self.symbolToLevelsMap = {}
+      self.tradeIDToLevelMap = {}
+      self.symbolToLastPriceMap = {}
+      self.symbolToNewTradesMap = {}
@@ -0,0 +1,4 @@
+
+class TriggerSide:
+  ABOVE = "ABOVE" # triggers when last traded price goes above the trigger price
+  BELOW = "BELOW" # triggers when last traded price goes below the trigger price
@@ -0,0 +1,24 @@
+from utils.RealClock import RealClock
+
+class Clock:
+  # Source of the current time for the algo. Every time dependent code path gets the time and sleeps through this.
+  # Defaults to utils.RealClock. Replays and tests set a utils.SimulatedClock here so that strategies and
+  # trade manager see the simulated time and sleeps complete immediately.
+  source = RealClock()
+
+  @staticmethod
+  def setSource(source):
+    Clock.source = source
+
+  @staticmethod
+  def now():
+    return Clock.source.now()
+
+  @staticmethod
+  def sleep(seconds):
+    Clock.source.sleep(seconds)
+
+  @staticmethod
+  def refresh():
+    # Called by ticker once per tick batch
+    Clock.source.refresh()
@@ -0,0 +1,97 @@
+import heapq
+import logging
+import threading
+from datetime import datetime
+
+from utils.Clock import Clock
+from utils.LatencyStats import LatencyStats
+
+class DeadlineScheduler:
+  # Runs actions at their deadlines (epoch seconds as per utils.Clock). Deadlines are kept in a heap so only the nearest
+  # one is looked at, instead of checking every pending item periodically. Each deadline has a key and scheduling
+  # a key which is already scheduled is ignored. start() runs the due actions on a thread sleeping till the nearest
+  # deadline, replay calls runDue() itself as it moves the simulated clock.
+  def __init__(self):
+    self.heap = [] # (deadline, sequence, key, action)
+    self.scheduledKeys = set()
+    self.sequence = 0
+    self.condition = threading.Condition()
+    self.running = False
+    self.thread = None
+    self.firingDelay = LatencyStats('firingDelay') # from deadline till its action is called
+
+  def schedule(self, deadline, key, action):
+    # Returns False if the key is already scheduled
+    with self.condition:
+      if key in self.scheduledKeys:
+        return False
+      self.scheduledKeys.add(key)
+      self.sequence += 1
+      heapq.heappush(self.heap, (deadline, self.sequence, key, action))
+      # Thread may be sleeping till a later deadline
+      self.condition.notify()
+      return True
+
+  def isScheduled(self, key):
+    with self.condition:
+      return key in self.scheduledKeys
+
+  def getNextDeadline(self):
+    with self.condition:
+      return self.heap[0][0] if len(self.heap) > 0 else None
+
+  def runDue(self, nowEpoch = None):
+    # Calls the actions of all the deadlines up to nowEpoch in deadline order. Returns the number of actions called.
+    if nowEpoch == None:
+      nowEpoch = DeadlineScheduler.getNowEpoch()
+    numCalled = 0
+    while True:
+      with self.condition:
+        if len(self.heap) == 0 or self.heap[0][0] > nowEpoch:
+          break
+        deadline, sequence, key, action = heapq.heappop(self.heap)
+        self.scheduledKeys.discard(key)
+      self.firingDelay.record(max(0, DeadlineScheduler.getNowEpoch() - deadline))
+      try:
+        action()
+      except Exception as e:
+        logging.exception('DeadlineScheduler: Exception in action of %s', key)
+      numCalled += 1
+    return numCalled
+
+  def start(self):
+    with self.condition:
+      if self.running == True:
+        return
+      self.running = True
+    self.thread = threading.Thread(target=self.run, name='DeadlineScheduler', daemon=True)
+    self.thread.start()
+
+  def stop(self):
+    with self.condition:
+      self.running = False
+      self.condition.notify()
+    if self.thread != None:
+      self.thread.join()
+      self.thread = None
+
+  def run(self):
+    while True:
+      with self.condition:
+        if self.running == False:
+          return
+        waitSeconds = self.heap[0][0] - DeadlineScheduler.getNowEpoch() if len(self.heap) > 0 else None
+        if waitSeconds == None or waitSeconds > 0:
+          # Woken up early when an earlier deadline is scheduled
+          self.condition.wait(waitSeconds)
+          continue
+      self.runDue()
+
+  def getStats(self):
+    with self.condition:
+      numScheduled = len(self.heap)
+    return {'scheduled': numScheduled, 'firingDelay': self.firingDelay.getStats()}
+
+  @staticmethod
+  def getNowEpoch():
+    return datetime.timestamp(Clock.now())
@@ -0,0 +1,54 @@
+import threading
+import time
+from array import array
+
+class LatencyStats:
+  # Collects latency samples and reports count, mean, percentiles and max in microseconds.
+  # Only the last maxSamples samples are kept for percentiles.
+  def __init__(self, name, maxSamples = 100000):
+    self.name = name
+    self.maxSamples = maxSamples
+    self.samples = array('d')
+    self.count = 0
+    self.totalMicros = 0
+    self.maxMicros = 0
+    self.lock = threading.Lock()
+
+  def record(self, seconds):
+    micros = seconds * 1000000
+    with self.lock:
+      if len(self.samples) < self.maxSamples:
+        self.samples.append(micros)
+      else:
+        self.samples[self.count % self.maxSamples] = micros
+      self.count += 1
+      self.totalMicros += micros
+      if micros > self.maxMicros:
+        self.maxMicros = micros
+
+  def recordSince(self, startPerfCounter):
+    # startPerfCounter is the value of time.perf_counter() when the measured operation started
+    self.record(time.perf_counter() - startPerfCounter)
+
+  def getStats(self):
+    with self.lock:
+      samples = sorted(self.samples)
+      count = self.count
+      totalMicros = self.totalMicros
+      maxMicros = self.maxMicros
+    if count == 0:
+      return {'name': self.name, 'count': 0}
+    return {
+      'name': self.name,
+      'count': count,
+      'meanMicros': round(totalMicros / count, 1),
+      'p50Micros': round(LatencyStats.percentile(samples, 50), 1),
+      'p90Micros': round(LatencyStats.percentile(samples, 90), 1),
+      'p99Micros': round(LatencyStats.percentile(samples, 99), 1),
+      'maxMicros': round(maxMicros, 1)
+    }
+
+  @staticmethod
+  def percentile(sortedSamples, percent):
+    index = min(len(sortedSamples) - 1, int(len(sortedSamples) * percent / 100))
+    return sortedSamples[index]
@@ -0,0 +1,23 @@
+import time
+from datetime import datetime
+
+class RealClock:
+  # Wall clock with a coarse cache. Ticker refreshes it once per tick batch so that all the listeners of the batch
+  # share one datetime object, and it refreshes itself when the cached value is older than granularitySeconds.
+  def __init__(self, granularitySeconds = 0.05):
+    self.granularitySeconds = granularitySeconds
+    self.cachedNow = None
+    self.refreshedAt = 0 # time.monotonic() of last refresh
+
+  def refresh(self):
+    # cached time is set before refresh time so that other threads never see a refresh time without cached time
+    self.cachedNow = datetime.now()
+    self.refreshedAt = time.monotonic()
+
+  def now(self):
+    if time.monotonic() - self.refreshedAt >= self.granularitySeconds:
+      self.refresh()
+    return self.cachedNow
+
+  def sleep(self, seconds):
+    time.sleep(seconds)
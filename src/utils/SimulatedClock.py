@@ -0,0 +1,25 @@
+from datetime import timedelta
+
+class SimulatedClock:
+  # Clock whose time is moved forward explicitly (Ex: to the timestamp of the tick being replayed).
+  # Sleeping fast forwards the time instead of waiting.
+  def __init__(self, startTime):
+    self.currentTime = startTime
+
+  def now(self):
+    return self.currentTime
+
+  def setTime(self, datetimeObj):
+    # Time never goes back
+    if datetimeObj > self.currentTime:
+      self.currentTime = datetimeObj
+
+  def advance(self, seconds):
+    self.currentTime = self.currentTime + timedelta(seconds=seconds)
+
+  def sleep(self, seconds):
+    if seconds > 0:
+      self.advance(seconds)
+
+  def refresh(self):
+    pass
@@ -0,0 +1,64 @@
+import threading
+import time
+from collections import deque
+
+class TokenBucket:
+  # Allows ratePerSecond calls per second on average with bursts of up to burst calls. acquire() blocks the caller
+  # till a token is available. Waiters are kept in lanes: waiters of a lower lane go first and waiters of the same
+  # lane go in their arrival order.
+  def __init__(self, name, ratePerSecond, burst, numLanes):
+    self.name = name
+    self.ratePerSecond = ratePerSecond
+    self.burst = burst
+    self.tokens = burst
+    self.updatedAt = time.monotonic()
+    self.laneWaiters = [deque() for i in range(numLanes)]
+    self.numWaiting = 0
+    self.condition = threading.Condition()
+
+  def setRate(self, ratePerSecond, burst):
+    with self.condition:
+      self.refill()
+      self.ratePerSecond = ratePerSecond
+      self.burst = burst
+      self.tokens = min(self.tokens, burst)
+      self.condition.notify_all()
+
+  def refill(self):
+    now = time.monotonic()
+    self.tokens = min(self.burst, self.tokens + (now - self.updatedAt) * self.ratePerSecond)
+    self.updatedAt = now
+
+  def isNext(self, waiter):
+    for waiters in self.laneWaiters:
+      if len(waiters) > 0:
+        return waiters[0] is waiter
+    return False
+
+  def acquire(self, lane):
+    # Returns the number of seconds the caller waited
+    with self.condition:
+      self.refill()
+      if self.numWaiting == 0 and self.tokens >= 1:
+        self.tokens -= 1
+        return 0
+      start = time.monotonic()
+      waiter = object()
+      self.laneWaiters[lane].append(waiter)
+      self.numWaiting += 1
+      try:
+        while True:
+          self.refill()
+          if self.tokens >= 1 and self.isNext(waiter):
+            self.tokens -= 1
+            return time.monotonic() - start
+          # Woken up by notify when the waiter ahead gets its token, or on timeout when the next token is due
+          self.condition.wait(max(0.001, (1 - self.tokens) / self.ratePerSecond))
+      finally:
+        self.laneWaiters[lane].remove(waiter)
+        self.numWaiting -= 1
+        self.condition.notify_all()
+
+  def getNumWaiting(self):
+    with self.condition:
+      return self.numWaiting
@@ -0,0 +1,105 @@
+import logging
+import calendar
+import threading
+from datetime import datetime, date, timedelta
+
+from config.Config import getHolidays
+from config.ConfigRegistry import ConfigRegistry
+from utils.YearCalendar import YearCalendar
+
+class TradingCalendar:
+  # Holidays loaded once and per year precomputed trading days, weekly and monthly expiries so that
+  # holiday/expiry queries are dictionary/list lookups without any file I/O.
+  # Years are computed again when config.ConfigRegistry reloads the modified holidays file, which is checked by
+  # its background check (ConfigRegistry.checkForChanges()) and not on queries.
+  holidays = None # set of holiday dates (weekends not included)
+  yearToCalendarMap = {} # year -> YearCalendar
+  lock = threading.Lock()
+
+  @staticmethod
+  def load():
+    with TradingCalendar.lock:
+      if TradingCalendar.holidays != None:
+        return
+      ConfigRegistry.subscribe('holidays', TradingCalendar.onHolidaysChanged)
+      TradingCalendar.setHolidays(getHolidays())
+
+  @staticmethod
+  def onHolidaysChanged(holidaysList):
+    with TradingCalendar.lock:
+      TradingCalendar.setHolidays(holidaysList)
+
+  @staticmethod
+  def setHolidays(holidaysList):
+    holidays = set()
+    for dateStr in holidaysList:
+      holidays.add(datetime.strptime(dateStr, '%Y-%m-%d').date())
+    # Years get precomputed again with the new holidays. Holidays are replaced before the years map
+    # so that a year built concurrently with old holidays can only end up in the old map.
+    TradingCalendar.holidays = holidays
+    TradingCalendar.yearToCalendarMap = {}
+    logging.info('TradingCalendar: Loaded %d holidays', len(holidays))
+
+  @staticmethod
+  def getYearCalendar(year):
+    if TradingCalendar.holidays == None:
+      TradingCalendar.load()
+    yearToCalendarMap = TradingCalendar.yearToCalendarMap
+    yearCalendar = yearToCalendarMap.get(year)
+    if yearCalendar == None:
+      yearCalendar = TradingCalendar.buildYearCalendar(year, TradingCalendar.holidays)
+      yearToCalendarMap[year] = yearCalendar
+    return yearCalendar
+
+  @staticmethod
+  def buildYearCalendar(year, holidays):
+    def isHoliday(d):
+      return d.weekday() >= 5 or d in holidays
+
+    firstDay = date(year, 1, 1)
+    numDays = 366 if calendar.isleap(year) else 365
+    isHolidayList = []
+    weeklyExpiryList = []
+    tradingDays = []
+    for i in range(numDays):
+      d = firstDay + timedelta(days=i)
+      isHolidayList.append(isHoliday(d))
+      if isHolidayList[i] == False:
+        tradingDays.append(d)
+      # Thursday of the week (Friday to Sunday map to the Thursday before) moved back to the previous trading day if holiday
+      expiryDay = d + timedelta(days=3 - d.weekday())
+      while isHoliday(expiryDay):
+        expiryDay = expiryDay - timedelta(days=1)
+      weeklyExpiryList.append(datetime(expiryDay.year, expiryDay.month, expiryDay.day))
+
+    monthlyExpiryList = [None]
+    for month in range(1, 13):
+      # Last Thursday of the month moved back to the previous trading day if holiday
+      expiryDay = date(year, month, calendar.monthrange(year, month)[1])
+      while expiryDay.weekday() != 3:
+        expiryDay = expiryDay - timedelta(days=1)
+      while isHoliday(expiryDay):
+        expiryDay = expiryDay - timedelta(days=1)
+      monthlyExpiryList.append(datetime(expiryDay.year, expiryDay.month, expiryDay.day))
+
+    return YearCalendar(firstDay.toordinal(), isHolidayList, tradingDays, weeklyExpiryList, monthlyExpiryList)
+
+  @staticmethod
+  def isHoliday(dateObj):
+    yearCalendar = TradingCalendar.getYearCalendar(dateObj.year)
+    return yearCalendar.isHolidayList[dateObj.toordinal() - yearCalendar.firstDayOrdinal]
+
+  @staticmethod
+  def getWeeklyExpiryDay(dateObj):
+    # Returns expiry as datetime at 00:00
+    yearCalendar = TradingCalendar.getYearCalendar(dateObj.year)
+    return yearCalendar.weeklyExpiryList[dateObj.toordinal() - yearCalendar.firstDayOrdinal]
+
+  @staticmethod
+  def getMonthlyExpiryDay(dateObj):
+    # Returns expiry as datetime at 00:00
+    return TradingCalendar.getYearCalendar(dateObj.year).monthlyExpiryList[dateObj.month]
+
+  @staticmethod
+  def getTradingDays(year):
+    return TradingCalendar.getYearCalendar(year).tradingDays
@@ -1,13 +1,13 @@
 import math
 import uuid
-import time
 import logging
 import calendar
 from datetime import datetime, timedelta
 
-from config.Config import getHolidays
 from models.Direction import Direction
 from trademgmt.TradeState import TradeState
+from utils.Clock import Clock
+from utils.TradingCalendar import TradingCalendar
 
 class Utils:
   dateFormat = "%Y-%m-%d"
@@ -28,7 +28,7 @@ class Utils:
   def isMarketOpen():
     if Utils.isTodayHoliday():
       return False
-    now = datetime.now()
+    now = Clock.now()
     marketStartTime = Utils.getMarketStartTime()
     marketEndTime = Utils.getMarketEndTime()
     return now >= marketStartTime and now <= marketEndTime
@@ -39,24 +39,24 @@ class Utils:
     # Please note this will not return true if current time is < marketStartTime on a trading day
     if Utils.isTodayHoliday():
       return True
-    now = datetime.now()
+    now = Clock.now()
     marketEndTime = Utils.getMarketEndTime()
     return now > marketEndTime
 
   @staticmethod
   def waitTillMarketOpens(context):
-    nowEpoch = Utils.getEpoch(datetime.now())
+    nowEpoch = Utils.getEpoch(Clock.now())
     marketStartTimeEpoch = Utils.getEpoch(Utils.getMarketStartTime())
     waitSeconds = marketStartTimeEpoch - nowEpoch
     if waitSeconds > 0:
       logging.info("%s: Waiting for %d seconds till market opens...", context, waitSeconds)
-      time.sleep(waitSeconds)
+      Clock.sleep(waitSeconds)
 
   @staticmethod
   def getEpoch(datetimeObj = None):
     # This method converts given datetimeObj to epoch seconds
     if datetimeObj == None:
-      datetimeObj = datetime.now()
+      datetimeObj = Clock.now()
     epochSeconds = datetime.timestamp(datetimeObj)
     return int(epochSeconds) # converting double to long
 
@@ -71,17 +71,17 @@ class Utils:
   @staticmethod
   def getTimeOfDay(hours, minutes, seconds, dateTimeObj = None):
     if dateTimeObj == None:
-      dateTimeObj = datetime.now()
+      dateTimeObj = Clock.now()
     dateTimeObj = dateTimeObj.replace(hour=hours, minute=minutes, second=seconds, microsecond=0)
     return dateTimeObj
 
   @staticmethod
   def getTimeOfToDay(hours, minutes, seconds):
-    return Utils.getTimeOfDay(hours, minutes, seconds, datetime.now())
+    return Utils.getTimeOfDay(hours, minutes, seconds, Clock.now())
 
   @staticmethod
   def getTodayDateStr():
-    return Utils.convertToDateStr(datetime.now())
+    return Utils.convertToDateStr(Clock.now())
 
   @staticmethod
   def convertToDateStr(datetimeObj):
@@ -89,20 +89,12 @@ class Utils:
 
   @staticmethod
   def isHoliday(datetimeObj):
-    dayOfWeek = calendar.day_name[datetimeObj.weekday()]
-    if dayOfWeek == 'Saturday' or dayOfWeek == 'Sunday':
-      return True
-
-    dateStr = Utils.convertToDateStr(datetimeObj)
-    holidays = getHolidays()
-    if (dateStr in holidays):
-      return True
-    else:
-      return False
+    # Weekends and holidays from config, looked up in the precomputed trading calendar
+    return TradingCalendar.isHoliday(datetimeObj)
 
   @staticmethod
   def isTodayHoliday():
-    return Utils.isHoliday(datetime.now())
+    return Utils.isHoliday(Clock.now())
     
   @staticmethod
   def generateTradeID():
@@ -131,7 +123,7 @@ class Utils:
   def prepareMonthlyExpiryFuturesSymbol(inputSymbol):
     expiryDateTime = Utils.getMonthlyExpiryDayDate()
     expiryDateMarketEndTime = Utils.getMarketEndTime(expiryDateTime)
-    now = datetime.now()
+    now = Clock.now()
     if now > expiryDateMarketEndTime:
       # increasing today date by 20 days to get some day in next month passing to getMonthlyExpiryDayDate()
       expiryDateTime = Utils.getMonthlyExpiryDayDate(now + timedelta(days=20))
@@ -181,34 +173,16 @@ class Utils:
   @staticmethod
   def getMonthlyExpiryDayDate(datetimeObj = None):
     if datetimeObj == None:
-      datetimeObj = datetime.now()
-    year = datetimeObj.year
-    month = datetimeObj.month
-    lastDay = calendar.monthrange(year, month)[1] # 2nd entry is the last day of the month
-    datetimeExpiryDay = datetime(year, month, lastDay)
-    while calendar.day_name[datetimeExpiryDay.weekday()] != 'Thursday':
-      datetimeExpiryDay = datetimeExpiryDay - timedelta(days=1)
-    while Utils.isHoliday(datetimeExpiryDay) == True:
-      datetimeExpiryDay = datetimeExpiryDay - timedelta(days=1)
-
-    datetimeExpiryDay = Utils.getTimeOfDay(0, 0, 0, datetimeExpiryDay)
-    return datetimeExpiryDay
+      datetimeObj = Clock.now()
+    # Last Thursday of the month or the trading day before it if holiday
+    return TradingCalendar.getMonthlyExpiryDay(datetimeObj)
 
   @staticmethod
   def getWeeklyExpiryDayDate(dateTimeObj = None):
     if dateTimeObj == None:
-      dateTimeObj = datetime.now()
-    daysToAdd = 0
-    if dateTimeObj.weekday() >= 3:
-      daysToAdd = -1 * (dateTimeObj.weekday() - 3)
-    else:
-      daysToAdd = 3 - dateTimeObj.weekday()
-    datetimeExpiryDay = dateTimeObj + timedelta(days=daysToAdd)
-    while Utils.isHoliday(datetimeExpiryDay) == True:
-      datetimeExpiryDay = datetimeExpiryDay - timedelta(days=1)
-
-    datetimeExpiryDay = Utils.getTimeOfDay(0, 0, 0, datetimeExpiryDay)
-    return datetimeExpiryDay
+      dateTimeObj = Clock.now()
+    # Thursday of the week (Thursday before for Friday to Sunday) or the trading day before it if holiday
+    return TradingCalendar.getWeeklyExpiryDay(dateTimeObj)
 
   @staticmethod
   def isTodayWeeklyExpiryDay():
@@ -0,0 +1,8 @@
+class YearCalendar:
+  # Precomputed calendar of one year, built by utils.TradingCalendar
+  def __init__(self, firstDayOrdinal, isHolidayList, tradingDays, weeklyExpiryList, monthlyExpiryList):
+    self.firstDayOrdinal = firstDayOrdinal
+    self.isHolidayList = isHolidayList # indexed by day of the year (0 based)
+    self.tradingDays = tradingDays
+    self.weeklyExpiryList = weeklyExpiryList # indexed by day of the year (0 based)
+    self.monthlyExpiryList = monthlyExpiryList # indexed by month